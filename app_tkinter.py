@@ -6,18 +6,19 @@ import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, Menu, colorchooser
 import threading
+import time
 import queue
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
+from matplotlib.patches import Polygon
 from mpl_toolkits.mplot3d import Axes3D
 import matplotlib
 matplotlib.use('TkAgg')
 from datetime import datetime
 import pathlib
-import re
 import logging
 from collections import Counter
 
@@ -39,199 +40,19 @@ except ImportError:
     print("Библиотека numpy-stl не установлена. Экспорт в STL не будет работать.")
     print("Установите её: pip install numpy-stl")
 
-# Импорты для DXF обработки
-import ezdxf
-from scipy.interpolate import interp1d, CubicSpline
-from scipy.integrate import simpson, trapezoid
-import math
-from collections import defaultdict
-
-# ============================================================================
-# КЛАССИФИКАЦИЯ ЦЕТЛИНА (научная шкала)
-# ============================================================================
-
-TSETLIN_CLASSIFICATION_L = [
-    {
-        'group': 'I',
-        'start_l': 0.024,
-        'center_l': 0.035,
-        'end_l': 0.049,
-        'quality_name': 'Супермалый-2',
-        'mobility_class': '1 – «супермалые» (менее 0,097 л)',
-        'description': 'Сосуды для хранения ароматических веществ'
-    },
-    {
-        'group': 'II',
-        'start_l': 0.049,
-        'center_l': 0.071,
-        'end_l': 0.097,
-        'quality_name': 'Супермалый-1',
-        'mobility_class': '1 – «супермалые» (менее 0,097 л)',
-        'description': 'Сосуды для хранения ароматических веществ'
-    },
-    {
-        'group': 'III',
-        'start_l': 0.097,
-        'center_l': 0.137,
-        'end_l': 0.194,
-        'quality_name': 'Очень очень малый',
-        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
-        'description': 'Легко перемещаются одним взрослым человеком'
-    },
-    {
-        'group': 'IV',
-        'start_l': 0.194,
-        'center_l': 0.274,
-        'end_l': 0.389,
-        'quality_name': 'Очень малый',
-        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
-        'description': 'Легко перемещаются одним взрослым человеком'
-    },
-    {
-        'group': 'V',
-        'start_l': 0.389,
-        'center_l': 0.552,
-        'end_l': 0.782,
-        'quality_name': 'Малый',
-        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
-        'description': 'Легко перемещаются одним взрослым человеком'
-    },
-    {
-        'group': 'VI',
-        'start_l': 0.782,
-        'center_l': 1.105,
-        'end_l': 1.565,
-        'quality_name': 'Мало-средний',
-        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
-        'description': 'Легко перемещаются одним взрослым человеком'
-    },
-    {
-        'group': 'VII',
-        'start_l': 1.565,
-        'center_l': 2.210,
-        'end_l': 3.125,
-        'quality_name': 'Средний-1',
-        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
-        'description': 'Легко перемещаются одним взрослым человеком'
-    },
-    {
-        'group': 'VIII',
-        'start_l': 3.125,
-        'center_l': 4.420,
-        'end_l': 6.250,
-        'quality_name': 'Средний-2',
-        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
-        'description': 'Легко перемещаются одним взрослым человеком'
-    },
-    {
-        'group': 'IX',
-        'start_l': 6.250,
-        'center_l': 8.840,
-        'end_l': 12.500,
-        'quality_name': 'Средний-3',
-        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
-        'description': 'Легко перемещаются одним взрослым человеком'
-    },
-    {
-        'group': 'X',
-        'start_l': 12.500,
-        'center_l': 17.680,
-        'end_l': 25.000,
-        'quality_name': 'Средний-4',
-        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
-        'description': 'Легко перемещаются одним взрослым человеком'
-    },
-    {
-        'group': 'XI',
-        'start_l': 25.000,
-        'center_l': 35.360,
-        'end_l': 50.0,
-        'quality_name': 'Больше-средний',
-        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
-        'description': 'Легко перемещаются одним взрослым человеком'
-    },
-    {
-        'group': 'XII',
-        'start_l': 50.0,
-        'center_l': 70.7,
-        'end_l': 100.0,
-        'quality_name': 'Большой',
-        'mobility_class': '3 – «ограниченно-мобильные» (50,0 л – 200,0 л)',
-        'description': 'Требуют усилий минимум двух человек'
-    },
-    {
-        'group': 'XIII',
-        'start_l': 100.0,
-        'center_l': 141.4,
-        'end_l': 200.0,
-        'quality_name': 'Очень большой',
-        'mobility_class': '3 – «ограниченно-мобильные» (50,0 л – 200,0 л)',
-        'description': 'Требуют усилий минимум двух человек'
-    },
-    {
-        'group': 'XIV',
-        'start_l': 200.0,
-        'center_l': 282.9,
-        'end_l': 400.0,
-        'quality_name': 'Очень очень большой',
-        'mobility_class': '4 – «мало-мобильные» (200,0 л – 800,0 л)',
-        'description': 'Перемещались крайне редко, только пустыми'
-    },
-    {
-        'group': 'XV',
-        'start_l': 400.0,
-        'center_l': 565.8,
-        'end_l': 800.0,
-        'quality_name': 'Гигантский',
-        'mobility_class': '4 – «мало-мобильные» (200,0 л – 800,0 л)',
-        'description': 'Перемещались крайне редко, только пустыми'
-    },
-    {
-        'group': 'XVI',
-        'start_l': 800.0,
-        'center_l': 1131.5,
-        'end_l': 1600.0,
-        'quality_name': 'Супер-1',
-        'mobility_class': '5 – «условно-мобильные» (800,0 л – 3200,0 л)',
-        'description': 'Перемещаются только в незаполненном виде'
-    },
-    {
-        'group': 'XVII',
-        'start_l': 1600.0,
-        'center_l': 2263.0,
-        'end_l': 3200.0,
-        'quality_name': 'Супер-2',
-        'mobility_class': '5 – «условно-мобильные» (800,0 л – 3200,0 л)',
-        'description': 'Перемещаются только в незаполненном виде'
-    },
-    {
-        'group': 'XVIII',
-        'start_l': 3200.0,
-        'center_l': 4526.0,
-        'end_l': 6400.0,
-        'quality_name': 'Сверх-1',
-        'mobility_class': '6 – «стационарные» (3200,0 л – 25000,0 л)',
-        'description': 'В принципе не предполагают перемещения'
-    },
-    {
-        'group': 'XIX',
-        'start_l': 6400.0,
-        'center_l': 9052.0,
-        'end_l': 12800.0,
-        'quality_name': 'Сверх-2',
-        'mobility_class': '6 – «стационарные» (3200,0 л – 25000,0 л)',
-        'description': 'В принципе не предполагают перемещения'
-    },
-    {
-        'group': 'XX',
-        'start_l': 12800.0,
-        'center_l': 18104.0,
-        'end_l': 25000.0,
-        'quality_name': 'Сверх-3',
-        'mobility_class': '6 – «стационарные» (3200,0 л – 25000,0 л)',
-        'description': 'В принципе не предполагают перемещения'
-    }
-]
+from volume_calc import (CorrectVolumeCalculator, VolumeCache, ADAPTIVE_REL_TOL, volume_uncertainty,
+                         UNCERTAINTY_SAMPLES, UNCERTAINTY_RADIUS_SIGMA, UNCERTAINTY_AXIS_SIGMA,
+                         UNCERTAINTY_PERCENTILES)
+from tsetlin import (TSETLIN_CLASSIFICATION_L, classify_volume, classification_index, load_scheme,
+                     membership_probabilities, STABILITY_THRESHOLD)
+from dxf_profile import (build_profile, get_entity_index,
+                         extraction_params, flatten_tolerance, READ_MODES, PROFILE_WALLS,
+                         RESAMPLE_MODES, RESAMPLE_TOLERANCE, RESAMPLE_MAX_POINTS, PROFILE_SCALE,
+                         PROFILE_POINTS, CHORD_TOLERANCE)
+from ingest import ParallelIngestor, default_worker_count
+from profile_cache import ProfileCache, DEFAULT_CACHE_MB
+from watch import FolderWatcher, watch_loop, DEFAULT_SETTLE_S, DEFAULT_POLL_S
+from results_model import ResultsModel, TEXT, NUMBER
 
 # ============================================================================
 # ЦВЕТОВАЯ СХЕМА В СОВРЕМЕННОМ СТИЛЕ
@@ -292,276 +113,6 @@ class ProfileGroup:
             'total_volume': sum(volumes) if volumes else 0
         }
 
-# ============================================================================
-# КОРРЕКТНЫЙ РАСЧЁТ ОБЪЁМА (ИСПРАВЛЕННЫЙ)
-# ============================================================================
-
-class CorrectVolumeCalculator:
-    """Исправленный калькулятор объёма с разными методами"""
-    
-    def __init__(self, y_coords, r_coords):
-        self.y = np.asarray(y_coords, dtype=np.float64)
-        self.r = np.asarray(r_coords, dtype=np.float64)
-        
-        # Убираем нулевые и отрицательные радиусы
-        self.r = np.maximum(self.r, 0.001)
-        
-        # Сортируем по высоте
-        sort_idx = np.argsort(self.y)
-        self.y = self.y[sort_idx]
-        self.r = self.r[sort_idx]
-        
-        # Убираем дубликаты высот
-        unique_y, unique_idx = np.unique(self.y, return_index=True)
-        self.y = unique_y
-        self.r = self.r[unique_idx]
-        
-        # Проверяем данные
-        if len(self.y) < 2:
-            raise ValueError("Слишком мало точек для расчета объема")
-        
-        # Убедимся, что высота начинается с 0
-        if self.y[0] > 0.01:
-            self.y = np.insert(self.y, 0, 0.0)
-            self.r = np.insert(self.r, 0, self.r[0])
-        
-        # Инициализируем интерполяторы
-        self._init_interpolators()
-        
-        # Диагностика
-        print(f"\nИнициализация калькулятора:")
-        print(f"  Количество точек: {len(self.y)}")
-        print(f"  Высота: от {self.y[0]:.2f} до {self.y[-1]:.2f} см")
-        print(f"  Радиус: от {self.r[0]:.2f} до {self.r[-1]:.2f} см")
-    
-    def _init_interpolators(self):
-        """Инициализация интерполяторов с проверкой"""
-        try:
-            # Для сплайна нужно минимум 4 точки
-            if len(self.y) >= 4:
-                self.spline = CubicSpline(self.y, self.r, bc_type='natural')
-                print("  Используется кубический сплайн")
-            else:
-                self.spline = interp1d(self.y, self.r, kind='cubic', 
-                                     fill_value='extrapolate', bounds_error=False)
-                print("  Используется кубическая интерполяция (мало точек)")
-        except Exception as e:
-            print(f"  Ошибка создания сплайна: {e}")
-            print("  Используется линейная интерполяция")
-            self.spline = interp1d(self.y, self.r, kind='linear', 
-                                 fill_value='extrapolate', bounds_error=False)
-        
-        # Линейный интерполятор для некоторых методов
-        self.linear = interp1d(self.y, self.r, kind='linear', 
-                             fill_value='extrapolate', bounds_error=False)
-    
-    def method_disks(self, y_max=None):
-        """
-        Метод дисков - интегрирование площадей кругов
-        Использует исходные точки без интерполяции
-        """
-        if y_max is None:
-            y_max = self.y[-1]
-        
-        # Находим индекс последней точки до y_max
-        mask = self.y <= y_max
-        y_slice = self.y[mask]
-        r_slice = self.r[mask]
-        
-        if len(y_slice) < 2:
-            return 0.0
-        
-        # Если y_max не совпадает с последней точкой, добавляем её
-        if y_max > y_slice[-1] and y_max < self.y[-1]:
-            # Интерполируем радиус для y_max
-            r_max = float(self.linear(y_max))
-            y_slice = np.append(y_slice, y_max)
-            r_slice = np.append(r_slice, r_max)
-        
-        # Площади дисков
-        areas = np.pi * r_slice**2
-        
-        # Интегрирование методом трапеций по исходным точкам
-        return trapezoid(areas, y_slice)
-    
-    def method_frustums(self, y_max=None):
-        """
-        Метод усеченных конусов
-        Объем между двумя сечениями: V = π/3 * h * (r1² + r1*r2 + r2²)
-        """
-        if y_max is None:
-            y_max = self.y[-1]
-        
-        # Находим индекс последней точки до y_max
-        mask = self.y <= y_max
-        y_slice = self.y[mask]
-        r_slice = self.r[mask]
-        
-        if len(y_slice) < 2:
-            return 0.0
-        
-        # Если y_max не совпадает с последней точкой
-        if y_max > y_slice[-1]:
-            r_max = float(self.linear(y_max))
-            y_slice = np.append(y_slice, y_max)
-            r_slice = np.append(r_slice, r_max)
-        
-        volume = 0.0
-        for i in range(len(y_slice) - 1):
-            h = y_slice[i + 1] - y_slice[i]
-            if h <= 0:
-                continue
-            
-            r1 = r_slice[i]
-            r2 = r_slice[i + 1]
-            volume += (np.pi / 3.0) * h * (r1**2 + r1 * r2 + r2**2)
-        
-        return volume
-    
-    def method_trapezoidal(self, y_max=None, n_points=2000):
-        """
-        Метод трапеций с интерполяцией
-        Большое количество точек для точности
-        """
-        if y_max is None:
-            y_max = self.y[-1]
-        
-        # Создаем равномерную сетку с большим количеством точек
-        y_fine = np.linspace(0, y_max, n_points)
-        r_fine = self.spline(y_fine)
-        r_fine = np.maximum(r_fine, 0.0)  # Защита от отрицательных радиусов
-        
-        # Площади сечений
-        areas = np.pi * r_fine**2
-        
-        # Интегрирование методом трапеций
-        return trapezoid(areas, y_fine)
-    
-    def method_simpson(self, y_max=None, n_points=501):
-        """
-        Метод Симпсона (парабол)
-        Нечетное количество точек для точности
-        """
-        if y_max is None:
-            y_max = self.y[-1]
-        
-        # Для метода Симпсона желательно нечетное число точек
-        if n_points % 2 == 0:
-            n_points += 1
-        
-        y_fine = np.linspace(0, y_max, n_points)
-        r_fine = self.spline(y_fine)
-        r_fine = np.maximum(r_fine, 0.0)
-        
-        # Площади сечений
-        areas = np.pi * r_fine**2
-        
-        # Интегрирование методом Симпсона
-        return simpson(areas, y_fine)
-    
-    def method_spline_integral(self, y_max=None, n_points=1001):
-        """
-        Интеграл сплайна с аналитическим интегрированием
-        Самый точный метод для гладких профилей
-        """
-        if y_max is None:
-            y_max = self.y[-1]
-        
-        # Для точности используем много точек
-        y_fine = np.linspace(0, y_max, n_points)
-        r_fine = self.spline(y_fine)
-        r_fine = np.maximum(r_fine, 0.0)
-        
-        # Площади сечений
-        areas = np.pi * r_fine**2
-        
-        # Используем метод Симпсона для максимальной точности
-        return simpson(areas, y_fine)
-    
-    def calculate_all_methods(self, y_max=None):
-        """
-        Вычисление объема всеми методами с диагностикой
-        """
-        if y_max is None:
-            y_max = self.y[-1]
-        
-        print(f"\nРАСЧЕТ ОБЪЕМА ДО ВЫСОТЫ {y_max:.2f} см:")
-        print("-" * 60)
-        
-        methods = {
-            'disks': ('Метод дисков (исходные точки)', self.method_disks),
-            'frustums': ('Метод усеченных конусов', self.method_frustums),
-            'trapezoidal': ('Метод трапеций (2000 точек)', 
-                          lambda y: self.method_trapezoidal(y, 2000)),
-            'simpson': ('Метод Симпсона (501 точка)', 
-                       lambda y: self.method_simpson(y, 501)),
-            'spline': ('Интеграл сплайна (1001 точка, рекоменд.)', 
-                      lambda y: self.method_spline_integral(y, 1001))
-        }
-        
-        results = {}
-        
-        # Сначала вычисляем все объемы
-        for name, (description, method) in methods.items():
-            try:
-                results[name] = method(y_max)
-            except Exception as e:
-                results[name] = None
-                print(f"❌ Ошибка в методе '{description}': {e}")
-        
-        # Выводим результаты
-        for name, (description, _) in methods.items():
-            if results[name] is not None:
-                print(f"✅ {description}:")
-                print(f"   Объем: {results[name]/1000:.6f} л")
-                print(f"   Объем: {results[name]:.2f} см³")
-        
-        # Сравниваем с эталонным методом (сплайн)
-        if results['spline'] is not None:
-            print(f"\n📊 СРАВНЕНИЕ С МЕТОДОМ СПЛАЙНА:")
-            print("-" * 40)
-            
-            for name in ['disks', 'frustums', 'trapezoidal', 'simpson']:
-                if results[name] is not None:
-                    diff = results[name] - results['spline']
-                    diff_percent = (diff / results['spline']) * 100
-                    diff_abs = abs(diff_percent)
-                    
-                    if diff_abs < 0.1:
-                        status = "✓ Очень близко"
-                    elif diff_abs < 1.0:
-                        status = "✓ Близко"
-                    elif diff_abs < 5.0:
-                        status = "⚠ Приемлемо"
-                    else:
-                        status = "⚠ Заметная разница"
-                    
-                    print(f"{methods[name][0]}:")
-                    print(f"  Разница: {diff:+.2f} см³ ({diff_percent:+.3f}%)")
-                    print(f"  Статус: {status}")
-        
-        return results
-    
-    def calculate_volume(self, method_name, y_max=None):
-        """Вычисление объема указанным методом с FIX для методов"""
-        if y_max is None:
-            y_max = self.y[-1]
-        
-        # ВАЖНОЕ ИСПРАВЛЕНИЕ: Используем правильные методы
-        if method_name == 'disks':
-            return self.method_disks(y_max)
-        elif method_name == 'frustums':
-            return self.method_frustums(y_max)
-        elif method_name == 'trapezoidal':
-            return self.method_trapezoidal(y_max, n_points=2000)
-        elif method_name == 'simpson':
-            return self.method_simpson(y_max, n_points=501)
-        elif method_name == 'spline':
-            return self.method_spline_integral(y_max, n_points=1001)
-        else:
-            # По умолчанию используем метод дисков
-            return self.method_disks(y_max)
-
 # ============================================================================
 # КЛАСС ДЛЯ КАСТОМНОЙ ПАНЕЛИ ИНСТРУМЕНТОВ
 # ============================================================================
@@ -598,6 +149,194 @@ class CustomNavigationToolbar:
             except Exception as e:
                 messagebox.showerror("Ошибка", f"Не удалось сохранить: {str(e)}")
 
+class VirtualTable:
+    """
+    Виртуальная таблица: Treeview с фиксированным числом строк, в которые
+    выводится видимое окно ResultsModel. Прокрутка меняет только значения
+    этих строк; сортировка (щелчок по заголовку) и фильтр выполняются моделью.
+    Выделение запоминается по ключам строк и сохраняется при прокрутке.
+    """
+    
+    def __init__(self, parent, model, widths=None, height=20):
+        self.model = model
+        self.offset = 0
+        self.selected_keys = set()
+        self._items = []
+        self._keys = []
+        self._values = {}
+        self._rendering = False
+        
+        self.tree = ttk.Treeview(parent, columns=model.columns, show='headings', height=height)
+        self.vsb = ttk.Scrollbar(parent, orient="vertical", command=self.on_scrollbar)
+        hsb = ttk.Scrollbar(parent, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=hsb.set)
+        
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        hsb.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        self.tree.bind('<Configure>', lambda e: self.refresh())
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.tree.bind('<Prior>', lambda e: self.scroll(-self.page_size()))
+        self.tree.bind('<Next>', lambda e: self.scroll(self.page_size()))
+        self.tree.bind('<<TreeviewSelect>>', self.on_select)
+        self.configure_columns(list(zip(model.columns, widths or [100] * len(model.columns))))
+    
+    def configure_columns(self, columns):
+        """Столбцы [(имя, ширина)] (модель должна иметь те же столбцы)"""
+        self.tree['columns'] = [col for col, _ in columns]
+        for col, width in columns:
+            self.tree.heading(col, command=lambda c=col: self.sort(c))
+            self.tree.column(col, width=width)
+        self._values.clear()
+        self.update_headings()
+    
+    def update_headings(self):
+        for col in self.model.columns:
+            mark = ''
+            if col == self.model.sort_column:
+                mark = ' ▲' if self.model.sort_ascending else ' ▼'
+            self.tree.heading(col, text=col + mark)
+    
+    def page_size(self):
+        """Число строк, помещающихся в видимой области"""
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return int(self.tree.cget('height'))
+        return max(1, (height - row_height) // row_height)
+    
+    def sort(self, column):
+        self.model.sort_by(column)
+        self.update_headings()
+        self.refresh()
+    
+    def set_filter(self, text):
+        self.model.set_filter(text)
+        self.offset = 0
+        self.refresh()
+    
+    def scroll(self, rows):
+        self.offset += int(rows)
+        self.refresh()
+        return 'break'
+    
+    def on_scrollbar(self, action, value, unit=None):
+        total = len(self.model)
+        if action == 'moveto':
+            self.offset = int(round(float(value) * total))
+        elif action == 'scroll':
+            step = self.page_size() if unit == 'pages' else 1
+            self.offset += int(value) * step
+        self.refresh()
+    
+    def on_select(self, event=None):
+        if self._rendering:
+            return
+        shown = dict(zip(self._items, self._keys))
+        selection = set(self.tree.selection())
+        for item, key in shown.items():
+            if item in selection:
+                self.selected_keys.add(key)
+            else:
+                self.selected_keys.discard(key)
+    
+    def refresh(self):
+        """Вывод видимого окна модели в строки Treeview"""
+        total = len(self.model)
+        count = self.page_size()
+        self.offset = max(0, min(self.offset, total - count))
+        rows = self.model.rows(self.offset, self.offset + count)
+        
+        self._rendering = True
+        try:
+            while len(self._items) < len(rows):
+                self._items.append(self.tree.insert('', 'end', values=()))
+            while len(self._items) > len(rows):
+                item = self._items.pop()
+                self._values.pop(item, None)
+                self.tree.delete(item)
+            
+            self._keys = [key for key, _ in rows]
+            for item, (key, values) in zip(self._items, rows):
+                if self._values.get(item) != values:
+                    self._values[item] = values
+                    self.tree.item(item, values=values)
+            self.tree.selection_set([item for item, key in zip(self._items, self._keys)
+                                     if key in self.selected_keys])
+        finally:
+            self._rendering = False
+        
+        if total:
+            self.vsb.set(self.offset / total, min(1.0, (self.offset + count) / total))
+        else:
+            self.vsb.set(0.0, 1.0)
+    
+    def selected_rows(self):
+        """Значения выделенных строк (в том числе вне видимой области) в порядке таблицы"""
+        rows = []
+        for key in [key for key in self.selected_keys if key in self.model]:
+            position = self.model.position(key)
+            if position is not None:
+                rows.append((position, self.model.rows(position, position + 1)[0][1]))
+        return [values for _, values in sorted(rows)]
+
+class RefreshScheduler:
+    """
+    Отложенное обновление представлений: обработчики только помечают
+    представления устаревшими (mark), а перерисовка выполняется один раз
+    в ближайшем цикле простоя Tk (after_idle), сколько бы пометок ни пришло.
+    Представления выполняются в порядке регистрации; для каждого ведутся
+    счётчики запросов, выполнений и затраченного времени.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.views = {}
+        self.dirty = set()
+        self.pending = False
+        self.counters = {}
+
+    def register(self, name, callback):
+        self.views[name] = callback
+        self.counters[name] = {'requests': 0, 'runs': 0, 'total_s': 0.0, 'last_s': 0.0, 'max_s': 0.0}
+
+    def mark(self, *names):
+        """Пометить представления устаревшими и запланировать обновление"""
+        for name in names:
+            if name in self.views:
+                self.dirty.add(name)
+                self.counters[name]['requests'] += 1
+        if self.dirty and not self.pending:
+            self.pending = True
+            self.root.after_idle(self.flush)
+
+    def flush(self):
+        """Выполнить все помеченные представления (каждое не более одного раза)"""
+        self.pending = False
+        for name, callback in self.views.items():
+            if name not in self.dirty:
+                continue
+            # Снимаем пометку до вызова: представление может пометить другие
+            self.dirty.discard(name)
+            started = time.perf_counter()
+            try:
+                callback()
+            except Exception as e:
+                print(f"Ошибка обновления представления '{name}': {e}")
+            elapsed = time.perf_counter() - started
+            counter = self.counters[name]
+            counter['runs'] += 1
+            counter['total_s'] += elapsed
+            counter['last_s'] = elapsed
+            counter['max_s'] = max(counter['max_s'], elapsed)
+
+    def stats(self):
+        """Счётчики по представлениям: запросы, выполнения, время (с)"""
+        return {name: dict(counter) for name, counter in self.counters.items()}
+
 # ============================================================================
 # ГЛАВНЫЙ КЛАСС ПРИЛОЖЕНИЯ
 # ============================================================================
@@ -619,9 +358,15 @@ class BobrinskyAnalyzer:
         self.current_profile = None
         self.current_group = None
         self.volume_calculator = None
+        # Общий кэш объёмов и калькуляторов (см. profile_volumes)
+        self.volume_cache = VolumeCache()
         
         # Состояние раскрытия групп
         self.expanded_groups = set()
+        # Строки дерева групп (см. update_tree)
+        self.tree_group_items = {}
+        self.tree_file_items = {}
+        self.tree_texts = {}
         
         # 3D данные для экспорта
         self.X_surface = None
@@ -635,7 +380,33 @@ class BobrinskyAnalyzer:
             'max_profile_points': 500,  # Максимальное количество точек (для 3D)
             '3d_segments': 30,  # Количество сегментов в 3D-модели
             'enable_3d_optimization': True,  # Включить оптимизацию 3D
+            'ingest_workers': default_worker_count(),  # Процессов для обработки DXF
+            'ingest_batch_size': 25,  # Профилей в одном пакете обновления GUI
+            'profile_cache_enabled': True,  # Кэш извлечённых профилей на диске
+            'profile_cache_mb': DEFAULT_CACHE_MB,  # Лимит размера кэша (МБ)
+            'dxf_read_mode': 'auto',  # Чтение DXF: auto / full / stream (потоковое)
+            'extract_layers': None,  # Слои профиля (None - все слои)
+            'extract_region': None,  # Область профиля (xmin, ymin, xmax, ymax) в единицах чертежа
+            'profile_wall': 'outer',  # Стенка профиля: outer (наружная) / inner (внутренняя)
+            'profile_scale': PROFILE_SCALE,  # Единицы чертежа -> см
+            'profile_points': PROFILE_POINTS,  # Точек равномерного ресэмплинга
+            'chord_tolerance': CHORD_TOLERANCE,  # Допуск аппроксимации дуг и сплайнов, см
+            'resample_mode': 'adaptive',  # Ресэмплинг профиля: adaptive (по кривизне) / uniform
+            'resample_tolerance': RESAMPLE_TOLERANCE,  # Допуск адаптивного ресэмплинга, см
+            'resample_max_points': RESAMPLE_MAX_POINTS,  # Предел точек адаптивного профиля
+            'adaptive_rel_tol': ADAPTIVE_REL_TOL,  # Относительный допуск адаптивного метода объёма
+            'uncertainty_samples': UNCERTAINTY_SAMPLES,  # Реализаций Монте-Карло на сосуд
+            'uncertainty_radius_sigma': UNCERTAINTY_RADIUS_SIGMA,  # Ошибка линии чертежа, см
+            'uncertainty_axis_sigma': UNCERTAINTY_AXIS_SIGMA,  # Ошибка положения оси, см
+            'uncertainty_seed': 0,  # Начальное значение генератора (воспроизводимость)
+            'watch_folder': None,  # Папка наблюдения за новыми DXF
+            'watch_group': "Наблюдение",  # Группа для файлов из папки наблюдения
+            'watch_settle_s': DEFAULT_SETTLE_S,  # Файл не меняется столько секунд -> готов
+            'watch_interval_s': DEFAULT_POLL_S,  # Период опроса папки
         }
+        self.profile_cache = None
+        self.folder_watcher = None
+        self.watch_stop_event = None
         
         # Параметры 3D-визуализации
         self.alpha_3d_var = tk.DoubleVar(value=0.8)
@@ -649,14 +420,26 @@ class BobrinskyAnalyzer:
         
         # Классификация Цетлина
         self.tsetlin_classification = TSETLIN_CLASSIFICATION_L
+        # Дополнительные схемы классификации, загруженные из файлов (JSON/CSV)
+        self.classification_schemes = []
         
         # Очередь для обработки
         self.processing_queue = queue.Queue()
+        self.display_first_processed = False
         
         # КРИТИЧЕСКАЯ ОШИБКА: В исходном коде метод по умолчанию был 'spline',
         # но он переопределялся в разных местах. Фиксируем это:
         self.method_var = tk.StringVar(value="spline")
         
+        # Отложенное обновление представлений (см. RefreshScheduler)
+        self.refresh = RefreshScheduler(self.root)
+        self.refresh.register('tree', self.update_tree)
+        self.refresh.register('table', self.update_results_table)
+        self.refresh.register('charts', self.update_results_charts)
+        self.refresh.register('card', lambda: self.create_modern_results_display(self.results_container))
+        self.refresh.register('profile', self.update_profile_plot)
+        self.refresh.register('3d', self.update_3d_plot)
+        
         # Создание интерфейса
         self.create_interface()
         
@@ -679,60 +462,11 @@ class BobrinskyAnalyzer:
     
     def get_tsetlin_classification(self, volume_cm3):
         """Определение качественной группы объема по классификации Цетлина"""
-        volume_l = volume_cm3 / 1000.0
-        
-        for class_data in self.tsetlin_classification:
-            if class_data['start_l'] <= volume_l <= class_data['end_l']:
-                # Проверяем, находится ли объем в диапазоне строгого качества
-                # (ближе к центру, чем к краям интервала)
-                center = class_data['center_l']
-                start = class_data['start_l']
-                end = class_data['end_l']
-                interval_length = end - start
-                distance_to_center = abs(volume_l - center)
-                
-                # Если расстояние до центра меньше 25% интервала, считаем строгим качеством
-                is_strict_quality = distance_to_center < (interval_length * 0.25)
-                
-                return {
-                    'group': class_data['group'],
-                    'group_name': class_data['quality_name'],
-                    'volume_l': volume_l,
-                    'center_l': center,
-                    'start_l': start,
-                    'end_l': end,
-                    'is_strict_quality': is_strict_quality,
-                    'mobility_class': class_data['mobility_class'],
-                    'description': class_data['description']
-                }
-        
-        # Если объем вне диапазонов (очень маленький или очень большой)
-        if volume_l < self.tsetlin_classification[0]['start_l']:
-            class_data = self.tsetlin_classification[0]
-            return {
-                'group': class_data['group'],
-                'group_name': f"{class_data['quality_name']} (ниже диапазона)",
-                'volume_l': volume_l,
-                'center_l': class_data['center_l'],
-                'start_l': class_data['start_l'],
-                'end_l': class_data['end_l'],
-                'is_strict_quality': False,
-                'mobility_class': class_data['mobility_class'],
-                'description': class_data['description']
-            }
-        else:  # volume_l > self.tsetlin_classification[-1]['end_l']
-            class_data = self.tsetlin_classification[-1]
-            return {
-                'group': class_data['group'],
-                'group_name': f"{class_data['quality_name']} (выше диапазона)",
-                'volume_l': volume_l,
-                'center_l': class_data['center_l'],
-                'start_l': class_data['start_l'],
-                'end_l': class_data['end_l'],
-                'is_strict_quality': False,
-                'mobility_class': class_data['mobility_class'],
-                'description': class_data['description']
-            }
+        return classify_volume(volume_cm3, self.tsetlin_classification)
+    
+    def get_tsetlin_classifications(self, volumes_cm3):
+        """Классификация Цетлина для списка объёмов одним пакетом (searchsorted)"""
+        return classification_index(self.tsetlin_classification).results(volumes_cm3)
     
     def set_axes_equal(self, ax):
         """Исправленная функция: Устанавливает равный масштаб для осей x, y, z"""
@@ -900,7 +634,7 @@ class BobrinskyAnalyzer:
                     self.profiles[file_path] = None
                     added_count += 1
         
-        self.update_tree()
+        self.refresh.mark('tree')
         if added_count > 0:
             self.status_var.set(f"Добавлено {added_count} файлов в группу '{group_name}'")
     
@@ -1040,7 +774,9 @@ class BobrinskyAnalyzer:
             ("📊 Экспорт Excel", self.export_excel, MODERN_PALETTE['success']),
             ("🔄 Обновить", self.update_plots, MODERN_PALETTE['secondary']),
             ("⚡ Производительность", self.show_performance_settings, MODERN_PALETTE['accent']),
+            ("👁 Наблюдение", self.show_watch_settings, MODERN_PALETTE['secondary']),
             ("🔬 Цетлин", self.show_tsetlin_info, '#8e44ad'),
+            ("📐 Схемы", self.show_classification_schemes, '#8e44ad'),
             ("❓ Справка", self.show_help, MODERN_PALETTE['primary_light']),
             ("🧪 Тест объемов", self.test_volume_calculation, '#9b59b6')  # Новая кнопка
         ]
@@ -1093,6 +829,7 @@ class BobrinskyAnalyzer:
         self.tree_menu.add_command(label="Сортировать по имени", command=self.sort_groups_by_name)
         self.tree_menu.add_command(label="Переместить в другую группу", command=self.move_to_group)
         self.tree_menu.add_command(label="Удалить выбранное", command=self.delete_selected)
+        self.tree_menu.add_command(label="Слои и область...", command=self.open_layer_filter_dialog)
         self.tree_menu.add_separator()
         self.tree_menu.add_command(label="Обновить дерево", command=self.update_tree)
         self.tree.bind('<Button-3>', self.show_tree_menu)
@@ -1191,6 +928,10 @@ class BobrinskyAnalyzer:
         self.canvas_profile.mpl_connect('button_release_event', self.on_profile_release)
         
         self.dragging_level = False
+        # Линия уровня, маркеры и заливка (см. set_level_artists) и фон для blit
+        self.level_artists = None
+        self.level_background = None
+        self.drag_volume_table = None
     
     def setup_volume_panel_in_profile(self, parent):
         """Панель управления объемом в подвкладке 'Профиль'"""
@@ -1231,30 +972,61 @@ class BobrinskyAnalyzer:
     
     def setup_results_table(self, parent):
         """Таблица результатов анализа (из старой вкладки 'Результаты')"""
-        columns = ['Профиль', 'Группа', 'Объём (л)', 'Объём (см³)', 'Высота', 'Диаметр', 'Метод', 'Группа Цетлина']
+        # (столбец, ширина, тип, формат чисел)
+        self.results_base_columns = [
+            ('Профиль', 180, TEXT, None),
+            ('Группа', 100, TEXT, None),
+            ('Объём (л)', 80, NUMBER, '{:.3f}'),
+            ('Объём (см³)', 90, NUMBER, '{:.1f}'),
+            ('Наружный (см³)', 100, NUMBER, '{:.1f}'),
+            ('Вместимость (см³)', 110, NUMBER, '{:.1f}'),
+            ('Тело (см³)', 90, NUMBER, '{:.1f}'),
+            ('Высота', 70, NUMBER, '{:.1f}'),
+            ('Диаметр', 70, NUMBER, '{:.1f}'),
+            ('Метод', 100, TEXT, None),
+            ('Группа Цетлина', 120, TEXT, None),
+        ]
+        
+        # Фильтр по текстовым столбцам (выполняется моделью)
+        filter_frame = ttk.Frame(parent)
+        filter_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        ttk.Label(filter_frame, text="Фильтр:").pack(side=tk.LEFT)
+        self.results_filter_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.results_filter_var,
+                 width=30).pack(side=tk.LEFT, padx=5)
+        self.results_count_var = tk.StringVar(value="")
+        ttk.Label(filter_frame, textvariable=self.results_count_var,
+                 foreground=MODERN_PALETTE['dark']).pack(side=tk.RIGHT)
         
         tree_frame = ttk.Frame(parent)
         tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        self.results_tree = ttk.Treeview(tree_frame, columns=columns, show='headings', height=20)
-        
-        col_widths = [180, 100, 80, 90, 70, 70, 100, 120]
-        for col, width in zip(columns, col_widths):
-            self.results_tree.heading(col, text=col)
-            self.results_tree.column(col, width=width)
-        
-        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.results_tree.yview)
-        hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.results_tree.xview)
-        self.results_tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-        
-        self.results_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        vsb.pack(side=tk.RIGHT, fill=tk.Y)
-        hsb.pack(side=tk.BOTTOM, fill=tk.X)
+        self.results_model = ResultsModel([(col, kind, fmt) for col, _, kind, fmt
+                                           in self.results_base_columns])
+        self.results_table = VirtualTable(tree_frame, self.results_model,
+                                          widths=[width for _, width, _, _ in self.results_base_columns])
+        self.results_tree = self.results_table.tree
+        self.results_filter_var.trace_add('write', lambda *args: self.apply_results_filter())
         
         self.tree_menu_results = Menu(self.root, tearoff=0)
         self.tree_menu_results.add_command(label="Копировать", command=self.copy_tree_selection)
         self.results_tree.bind('<Button-3>', self.show_tree_menu_results)
     
+    def configure_results_columns(self):
+        """Столбцы таблицы результатов: основные и по одному на схему классификации"""
+        columns = self.results_base_columns + [(scheme.name, 140, TEXT, None)
+                                               for scheme in self.classification_schemes]
+        self.results_model.set_columns([(col, kind, fmt) for col, _, kind, fmt in columns])
+        self.results_table.configure_columns([(col, width) for col, width, _, _ in columns])
+    
+    def apply_results_filter(self):
+        self.results_table.set_filter(self.results_filter_var.get())
+        self.update_results_count()
+    
+    def update_results_count(self):
+        shown, total = len(self.results_model), self.results_model.total
+        self.results_count_var.set(f"Строк: {shown}" if shown == total else f"Строк: {shown} из {total}")
+    
     def setup_tsetlin_table(self, parent):
         """Таблица с полной шкалой классификации Цетлина"""
         columns = ['Группа', 'Начало (л)', 'Центр (л)', 'Конец (л)', 'Качество', 'Класс мобильности']
@@ -1374,6 +1146,9 @@ class BobrinskyAnalyzer:
             ttk.Label(current_card, text=info_text, justify=tk.LEFT,
                      font=('Segoe UI', 11)).pack(pady=10)
         
+        # Устойчивость классификации коллекции при неопределённости объёма
+        self.create_stability_card(parent)
+        
         # Полная шкала классификации
         scale_card = self.create_card(parent, "📏 Полная шкала качественных групп")
         
@@ -1411,6 +1186,116 @@ class BobrinskyAnalyzer:
                      foreground=MODERN_PALETTE['primary']).pack(anchor='w')
             ttk.Label(cls_frame, text=desc, font=('Segoe UI', 9)).pack(anchor='w', padx=10)
     
+    # Методы, разброс которых служит распределением объёма сосуда
+    STABILITY_METHODS = ('disks', 'frustums', 'trapezoidal', 'simpson', 'spline', 'spline_exact',
+                         'adaptive')
+    
+    def create_stability_card(self, parent):
+        """Карточка устойчивости: тепловая карта вероятностей групп Цетлина"""
+        stability_card = self.create_card(parent, "🎲 Устойчивость классификации")
+        
+        controls = ttk.Frame(stability_card)
+        controls.pack(fill=tk.X, pady=5)
+        ttk.Label(controls, text="Распределение объёма:").pack(side=tk.LEFT)
+        self.stability_source_var = tk.StringVar(value='perturbation')
+        ttk.Radiobutton(controls, text="Монте-Карло (оцифровка)", value='perturbation',
+                       variable=self.stability_source_var).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(controls, text="Разброс методов", value='methods',
+                       variable=self.stability_source_var).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="Рассчитать",
+                  command=self.analyze_tsetlin_stability).pack(side=tk.LEFT, padx=10)
+        
+        self.stability_status_var = tk.StringVar(
+            value=f"Пограничные сосуды: уверенность в группе ниже {STABILITY_THRESHOLD:.0%}")
+        ttk.Label(stability_card, textvariable=self.stability_status_var,
+                 font=('Segoe UI', 9),
+                 foreground=MODERN_PALETTE['dark']).pack(anchor='w', padx=5)
+        
+        self.fig_stability = Figure(figsize=(9, 4), dpi=100)
+        self.canvas_stability = FigureCanvasTkAgg(self.fig_stability, stability_card)
+        self.canvas_stability.get_tk_widget().pack(fill=tk.BOTH, expand=True, pady=5)
+    
+    def analyze_tsetlin_stability(self):
+        """
+        Вероятности групп Цетлина для всех сосудов по распределению объёма:
+        реализациям Монте-Карло (volume_uncertainty) или объёмам разными методами
+        """
+        items = [(file_path, profile) for file_path, profile in self.profiles.items() if profile]
+        if not items:
+            messagebox.showwarning("Ошибка", "Нет обработанных профилей")
+            return
+        source = self.stability_source_var.get()
+        
+        if source == 'methods':
+            # Объёмы всеми методами берутся из кэша объёмов
+            volumes = [self.profile_volumes(method) for method in self.STABILITY_METHODS]
+            samples = np.array([[method_volumes[file_path] for method_volumes in volumes]
+                                for file_path, _ in items])
+            self.show_tsetlin_stability(items, samples, source)
+            return
+        
+        pairs = [(profile['y'], profile['r']) for _, profile in items]
+        keys = [file_path for file_path, _ in items]
+        method = self.method_var.get()
+        options = {'n_samples': self.settings['uncertainty_samples'],
+                   'radius_sigma': self.settings['uncertainty_radius_sigma'],
+                   'axis_sigma': self.settings['uncertainty_axis_sigma'],
+                   'seed': self.settings['uncertainty_seed']}
+        self.stability_status_var.set("Расчёт...")
+        
+        def worker():
+            try:
+                result = volume_uncertainty(pairs, method, keys=keys, return_samples=True, **options)
+            except Exception as e:
+                print(f"Ошибка анализа устойчивости: {e}")
+                self.root.after(0, lambda: self.stability_status_var.set(f"Ошибка: {e}"))
+                return
+            self.root.after(0, lambda: self.show_tsetlin_stability(items, result['samples'], source))
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def show_tsetlin_stability(self, items, samples, source):
+        """Сохранение вероятностей групп в профилях и тепловая карта (вызывается в потоке Tk)"""
+        membership = membership_probabilities(samples, self.tsetlin_classification)
+        for i, (_, profile) in enumerate(items):
+            profile['tsetlin_membership'] = {
+                'probabilities': membership['probabilities'][i],
+                'modal': int(membership['modal'][i]),
+                'confidence': float(membership['confidence'][i]),
+                'borderline': bool(membership['borderline'][i]),
+                'source': source,
+            }
+        
+        groups = [c['group'] for c in classification_index(self.tsetlin_classification).classification]
+        order = np.argsort(np.nanmedian(samples, axis=1))
+        probabilities = membership['probabilities'][order]
+        borderline = membership['borderline'][order]
+        
+        self.fig_stability.clf()
+        ax = self.fig_stability.add_subplot(111)
+        image = ax.imshow(probabilities, aspect='auto', cmap='viridis', vmin=0.0, vmax=1.0,
+                          interpolation='nearest')
+        ax.set_xticks(range(len(groups)))
+        ax.set_xticklabels(groups, fontsize=7, rotation=90)
+        ax.set_xlabel("Группа Цетлина")
+        if len(items) <= 40:
+            ax.set_yticks(range(len(items)))
+            ax.set_yticklabels([items[i][1]['name'][:20] for i in order], fontsize=7)
+            for label, flag in zip(ax.get_yticklabels(), borderline):
+                if flag:
+                    label.set_color('#e74c3c')
+        else:
+            ax.set_ylabel("Сосуды (по возрастанию объёма)")
+        self.fig_stability.colorbar(image, ax=ax, label="Вероятность")
+        self.fig_stability.tight_layout()
+        self.canvas_stability.draw_idle()
+        
+        count = int(membership['borderline'].sum())
+        source_text = "Монте-Карло" if source == 'perturbation' else "разброс методов"
+        self.stability_status_var.set(
+            f"Сосудов: {len(items)}, пограничных (уверенность < {STABILITY_THRESHOLD:.0%}): {count} "
+            f"[{source_text}]")
+    
     def get_tsetlin_color(self, group):
         """Получение цвета для группы Цетлина"""
         colors = ['#3498db', '#2ecc71', '#e74c3c', '#f39c12', '#9b59b6', '#1abc9c',
@@ -1477,7 +1362,7 @@ class BobrinskyAnalyzer:
         self.alpha_3d_var = tk.DoubleVar(value=0.8)
         alpha_slider = ttk.Scale(alpha_frame, from_=0.1, to=1.0, 
                                orient=tk.HORIZONTAL, variable=self.alpha_3d_var,
-                               length=150, command=lambda v: self.update_3d_plot())
+                               length=150, command=lambda v: self.refresh.mark('3d'))
         alpha_slider.pack(side=tk.RIGHT, padx=5)
         alpha_value = ttk.Label(alpha_frame, text="0.8")
         alpha_value.pack(side=tk.RIGHT)
@@ -1495,7 +1380,7 @@ class BobrinskyAnalyzer:
         style_combo = ttk.Combobox(style_frame, textvariable=self.surface_style_3d_var,
                                   values=['solid', 'wireframe'], state='readonly', width=15)
         style_combo.pack(side=tk.RIGHT, padx=5)
-        style_combo.bind('<<ComboboxSelected>>', lambda e: self.update_3d_plot())
+        style_combo.bind('<<ComboboxSelected>>', lambda e: self.refresh.mark('3d'))
         
         # Выбор цвета
         color_frame = ttk.Frame(viz_card)
@@ -1525,8 +1410,8 @@ class BobrinskyAnalyzer:
         segments_spin = ttk.Spinbox(segments_frame, from_=10, to=200,
                                   textvariable=self.segments_y_var, width=10)
         segments_spin.pack(side=tk.RIGHT, padx=5)
-        segments_spin.bind('<Return>', lambda e: self.update_3d_plot())
-        segments_spin.bind('<FocusOut>', lambda e: self.update_3d_plot())
+        segments_spin.bind('<Return>', lambda e: self.refresh.mark('3d'))
+        segments_spin.bind('<FocusOut>', lambda e: self.refresh.mark('3d'))
         
         # Сегменты по окружности
         theta_frame = ttk.Frame(grid_card)
@@ -1536,8 +1421,8 @@ class BobrinskyAnalyzer:
         theta_spin = ttk.Spinbox(theta_frame, from_=10, to=100,
                                textvariable=self.segments_theta_var, width=10)
         theta_spin.pack(side=tk.RIGHT, padx=5)
-        theta_spin.bind('<Return>', lambda e: self.update_3d_plot())
-        theta_spin.bind('<FocusOut>', lambda e: self.update_3d_plot())
+        theta_spin.bind('<Return>', lambda e: self.refresh.mark('3d'))
+        theta_spin.bind('<FocusOut>', lambda e: self.refresh.mark('3d'))
         
         # Плотность сетки
         density_frame = ttk.Frame(grid_card)
@@ -1546,7 +1431,7 @@ class BobrinskyAnalyzer:
         self.density_var = tk.IntVar(value=2)
         density_slider = ttk.Scale(density_frame, from_=1, to=10,
                                  orient=tk.HORIZONTAL, variable=self.density_var,
-                                 length=150, command=lambda v: self.update_3d_plot())
+                                 length=150, command=lambda v: self.refresh.mark('3d'))
         density_slider.pack(side=tk.RIGHT, padx=5)
         
         # Карточка: Камера и проекция
@@ -1560,7 +1445,7 @@ class BobrinskyAnalyzer:
         projection_combo = ttk.Combobox(projection_frame, textvariable=self.projection_type_3d_var,
                                        values=['persp', 'ortho'], state='readonly', width=15)
         projection_combo.pack(side=tk.RIGHT, padx=5)
-        projection_combo.bind('<<ComboboxSelected>>', lambda e: self.update_3d_plot())
+        projection_combo.bind('<<ComboboxSelected>>', lambda e: self.refresh.mark('3d'))
         
         # Кнопки управления камерой
         camera_buttons_frame = ttk.Frame(camera_card)
@@ -1650,6 +1535,8 @@ class BobrinskyAnalyzer:
         
         methods = [
             ("Интеграл сплайна (1001 точка, рекоменд.)", "spline"),
+            ("Точный интеграл сплайна", "spline_exact"),
+            ("Адаптивный Симпсон (по допуску)", "adaptive"),
             ("Метод Симпсона (501 точка)", "simpson"),
             ("Метод трапеций (2000 точек)", "trapezoidal"),
             ("Метод дисков (по точкам)", "disks"),
@@ -1706,6 +1593,7 @@ class BobrinskyAnalyzer:
         
         actions = [
             ("⚖️ Сравнить методы", self.compare_all_methods),
+            ("🎲 Неопределённость объёма", self.show_volume_uncertainty),
             ("💾 Сохранить профиль", self.save_current_profile),
             ("📈 Создать график", self.create_volume_chart),
             ("📋 Копировать результаты", self.copy_results_to_clipboard),
@@ -1749,7 +1637,9 @@ class BobrinskyAnalyzer:
             'disks': 'Метод дисков',
             'frustums': 'Метод усечённых конусов',
             'trapezoidal': 'Метод трапеций (2000 точек)',
-            'simpson': 'Метод Симпсона (501 точка)'
+            'simpson': 'Метод Симпсона (501 точка)',
+            'spline_exact': 'Точный интеграл сплайна',
+            'adaptive': 'Адаптивный Симпсон'
         }
         
         current_method = method_names.get(self.method_var.get(), self.method_var.get())
@@ -1779,9 +1669,8 @@ class BobrinskyAnalyzer:
                 
                 print(f"DEBUG: Расчет объема методом '{method}' до уровня {level} см")
                 
-                # Вычисляем объемы РАЗНЫМИ МЕТОДАМИ
-                full_volume = self.volume_calculator.calculate_volume(method)
-                level_volume = self.volume_calculator.calculate_volume(method, level)
+                # Объемы из кэша (уровень - по таблице накопленного объема)
+                full_volume, level_volume = self.current_volumes(level)
                 
                 # Вычисляем процент заполнения
                 if full_volume > 0:
@@ -1909,7 +1798,7 @@ class BobrinskyAnalyzer:
         if color[1]:
             self.surface_color_hex = color[1]
             self.color_button.config(bg=self.surface_color_hex)
-            self.update_3d_plot()  # Мгновенное применение
+            self.refresh.mark('3d')  # Мгновенное применение
     
     def reset_3d_view(self):
         """Сброс вида камеры к стандартному"""
@@ -2175,7 +2064,7 @@ class BobrinskyAnalyzer:
         """Показать окно настроек производительности"""
         settings_window = tk.Toplevel(self.root)
         settings_window.title("Настройки производительности")
-        settings_window.geometry("400x300")
+        settings_window.geometry("400x675")
         settings_window.transient(self.root)
         settings_window.grab_set()
         
@@ -2209,6 +2098,62 @@ class BobrinskyAnalyzer:
                                   textvariable=segments_var, width=10)
         segments_spin.pack(side=tk.LEFT, padx=10)
         
+        # Количество процессов для обработки DXF
+        workers_frame = ttk.Frame(main_frame)
+        workers_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(workers_frame, text="Процессов обработки:", 
+                 width=20).pack(side=tk.LEFT)
+        workers_var = tk.IntVar(value=self.settings['ingest_workers'])
+        workers_spin = ttk.Spinbox(workers_frame, from_=1, to=max(1, os.cpu_count() or 1), 
+                                 textvariable=workers_var, width=10)
+        workers_spin.pack(side=tk.LEFT, padx=10)
+        
+        # Режим чтения DXF
+        read_frame = ttk.Frame(main_frame)
+        read_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(read_frame, text="Чтение DXF:", 
+                 width=20).pack(side=tk.LEFT)
+        read_mode_var = tk.StringVar(value=self.settings['dxf_read_mode'])
+        ttk.Combobox(read_frame, textvariable=read_mode_var, values=list(READ_MODES),
+                    state='readonly', width=10).pack(side=tk.LEFT, padx=10)
+        
+        # Стенка, по которой строится профиль
+        wall_frame = ttk.Frame(main_frame)
+        wall_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(wall_frame, text="Стенка профиля:", 
+                 width=20).pack(side=tk.LEFT)
+        wall_var = tk.StringVar(value=self.settings['profile_wall'])
+        ttk.Combobox(wall_frame, textvariable=wall_var, values=list(PROFILE_WALLS),
+                    state='readonly', width=10).pack(side=tk.LEFT, padx=10)
+        
+        # Ресэмплинг профиля
+        resample_frame = ttk.Frame(main_frame)
+        resample_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(resample_frame, text="Ресэмплинг:", 
+                 width=20).pack(side=tk.LEFT)
+        resample_var = tk.StringVar(value=self.settings['resample_mode'])
+        ttk.Combobox(resample_frame, textvariable=resample_var, values=list(RESAMPLE_MODES),
+                    state='readonly', width=10).pack(side=tk.LEFT, padx=10)
+        ttk.Label(resample_frame, text="допуск, см:").pack(side=tk.LEFT)
+        resample_tol_var = tk.DoubleVar(value=self.settings['resample_tolerance'])
+        ttk.Spinbox(resample_frame, from_=0.001, to=0.1, increment=0.001,
+                   textvariable=resample_tol_var, width=7).pack(side=tk.LEFT, padx=5)
+        
+        # Допуск адаптивного метода объёма (один для всей коллекции)
+        adaptive_frame = ttk.Frame(main_frame)
+        adaptive_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(adaptive_frame, text="Допуск адаптивного:", 
+                 width=20).pack(side=tk.LEFT)
+        adaptive_tol_var = tk.StringVar(value=f"{self.settings['adaptive_rel_tol']:g}")
+        ttk.Combobox(adaptive_frame, textvariable=adaptive_tol_var,
+                    values=['1e-3', '1e-4', '1e-5', '1e-6', '1e-8', '1e-10'],
+                    width=10).pack(side=tk.LEFT, padx=10)
+        
         # Оптимизация
         opt_frame = ttk.Frame(main_frame)
         opt_frame.pack(fill=tk.X, pady=5)
@@ -2217,6 +2162,41 @@ class BobrinskyAnalyzer:
         ttk.Checkbutton(opt_frame, text="Включить оптимизацию 3D",
                        variable=opt_var).pack(anchor='w')
         
+        # Кэш профилей
+        cache_frame = ttk.Frame(main_frame)
+        cache_frame.pack(fill=tk.X, pady=5)
+        
+        cache_var = tk.BooleanVar(value=self.settings['profile_cache_enabled'])
+        ttk.Checkbutton(cache_frame, text="Кэшировать профили на диске",
+                       variable=cache_var).pack(side=tk.LEFT)
+        
+        def clear_cache():
+            cache = self.get_profile_cache()
+            if cache is not None:
+                cache.clear()
+                messagebox.showinfo("Кэш", "Кэш профилей очищен")
+        
+        ttk.Button(cache_frame, text="Очистить",
+                  command=clear_cache).pack(side=tk.RIGHT)
+        
+        # Статистика кэша объёмов за сеанс
+        stats = self.volume_cache.stats()
+        ttk.Label(main_frame,
+                 text=(f"Кэш объёмов: записей {stats['entries']}, попаданий {stats['hits']}, "
+                       f"промахов {stats['misses']} ({stats['hit_rate']:.0%})"),
+                 font=('Segoe UI', 8),
+                 foreground=MODERN_PALETTE['dark']).pack(anchor='w', pady=(0, 5))
+        
+        # Счётчики отложенного обновления представлений за сеанс
+        refresh_lines = ["Обновления (запросов / выполнений, ср. / макс. мс):"]
+        for name, counter in self.refresh.stats().items():
+            average = counter['total_s'] / counter['runs'] * 1000 if counter['runs'] else 0.0
+            refresh_lines.append(f"  {name}: {counter['requests']} / {counter['runs']}, "
+                                 f"{average:.1f} / {counter['max_s'] * 1000:.1f}")
+        ttk.Label(main_frame, text="\n".join(refresh_lines),
+                 font=('Segoe UI', 8),
+                 foreground=MODERN_PALETTE['dark']).pack(anchor='w', pady=(0, 5))
+        
         # Кнопки
         btn_frame = ttk.Frame(main_frame)
         btn_frame.pack(fill=tk.X, pady=20)
@@ -2224,11 +2204,26 @@ class BobrinskyAnalyzer:
         def apply_settings():
             self.settings['rdp_epsilon'] = rdp_var.get()
             self.settings['3d_segments'] = segments_var.get()
+            self.settings['ingest_workers'] = max(1, workers_var.get())
+            self.settings['dxf_read_mode'] = read_mode_var.get()
+            self.settings['profile_wall'] = wall_var.get()
+            self.settings['resample_mode'] = resample_var.get()
+            try:
+                self.settings['resample_tolerance'] = max(1e-4, float(resample_tol_var.get()))
+            except (tk.TclError, ValueError):
+                pass
+            try:
+                rel_tol = min(1e-2, max(1e-12, float(adaptive_tol_var.get())))
+                self.settings['adaptive_rel_tol'] = rel_tol
+                self.volume_cache.set_rel_tol(rel_tol)
+            except ValueError:
+                pass
             self.settings['enable_3d_optimization'] = opt_var.get()
+            self.settings['profile_cache_enabled'] = cache_var.get()
             
             # Обновить 3D модель если есть текущий профиль
             if self.current_profile:
-                self.update_3d_plot()
+                self.refresh.mark('3d')
             
             messagebox.showinfo("Настройки", "Настройки применены")
             settings_window.destroy()
@@ -2238,6 +2233,155 @@ class BobrinskyAnalyzer:
         ttk.Button(btn_frame, text="Отмена", 
                   command=settings_window.destroy).pack(side=tk.LEFT, padx=5)
     
+    # ============================================================================
+    # НАБЛЮДЕНИЕ ЗА ПАПКОЙ
+    # ============================================================================
+    
+    def show_watch_settings(self):
+        """Окно настройки наблюдения за папкой с новыми чертежами"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Наблюдение за папкой")
+        dialog.geometry("460x300")
+        dialog.transient(self.root)
+        
+        main_frame = ttk.Frame(dialog, padding=15)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Папка
+        folder_frame = ttk.Frame(main_frame)
+        folder_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(folder_frame, text="Папка:", width=18).pack(side=tk.LEFT)
+        folder_var = tk.StringVar(value=self.settings['watch_folder'] or '')
+        ttk.Entry(folder_frame, textvariable=folder_var, width=26).pack(side=tk.LEFT, padx=5)
+        
+        def choose_folder():
+            folder = filedialog.askdirectory(title="Папка с новыми DXF", parent=dialog)
+            if folder:
+                folder_var.set(folder)
+        
+        ttk.Button(folder_frame, text="...", width=3, command=choose_folder).pack(side=tk.LEFT)
+        
+        # Группа
+        group_frame = ttk.Frame(main_frame)
+        group_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(group_frame, text="Группа:", width=18).pack(side=tk.LEFT)
+        group_var = tk.StringVar(value=self.settings['watch_group'])
+        ttk.Combobox(group_frame, textvariable=group_var, values=list(self.groups.keys()),
+                    width=24).pack(side=tk.LEFT, padx=5)
+        
+        # Ожидание окончания записи и период опроса
+        settle_frame = ttk.Frame(main_frame)
+        settle_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(settle_frame, text="Ожидание записи (с):", width=18).pack(side=tk.LEFT)
+        settle_var = tk.DoubleVar(value=self.settings['watch_settle_s'])
+        ttk.Spinbox(settle_frame, from_=0.5, to=60, increment=0.5,
+                   textvariable=settle_var, width=8).pack(side=tk.LEFT, padx=5)
+        
+        interval_frame = ttk.Frame(main_frame)
+        interval_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(interval_frame, text="Период опроса (с):", width=18).pack(side=tk.LEFT)
+        interval_var = tk.DoubleVar(value=self.settings['watch_interval_s'])
+        ttk.Spinbox(interval_frame, from_=1, to=600, increment=1,
+                   textvariable=interval_var, width=8).pack(side=tk.LEFT, padx=5)
+        
+        existing_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(main_frame, text="Обработать файлы, уже лежащие в папке",
+                       variable=existing_var).pack(anchor='w', pady=5)
+        
+        state_var = tk.StringVar()
+        
+        def refresh_state():
+            if self.folder_watcher is not None:
+                state_var.set(f"Наблюдение: {self.folder_watcher.folder}")
+            else:
+                state_var.set("Наблюдение остановлено")
+        
+        ttk.Label(main_frame, textvariable=state_var, foreground='gray').pack(anchor='w', pady=5)
+        refresh_state()
+        
+        def start():
+            folder = folder_var.get().strip()
+            if not folder or not os.path.isdir(folder):
+                messagebox.showerror("Ошибка", "Укажите существующую папку", parent=dialog)
+                return
+            try:
+                self.settings['watch_settle_s'] = max(0.0, float(settle_var.get()))
+                self.settings['watch_interval_s'] = max(0.5, float(interval_var.get()))
+            except (tk.TclError, ValueError):
+                messagebox.showerror("Ошибка", "Неверные значения времени", parent=dialog)
+                return
+            self.settings['watch_folder'] = folder
+            self.settings['watch_group'] = group_var.get().strip() or "Наблюдение"
+            self.start_folder_watch(include_existing=existing_var.get())
+            refresh_state()
+        
+        def stop():
+            self.stop_folder_watch()
+            refresh_state()
+        
+        btn_frame = ttk.Frame(main_frame)
+        btn_frame.pack(fill=tk.X, pady=10)
+        ttk.Button(btn_frame, text="Запустить", command=start).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Остановить", command=stop).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Закрыть", command=dialog.destroy).pack(side=tk.RIGHT, padx=5)
+    
+    def start_folder_watch(self, include_existing=False):
+        """Запуск фонового наблюдения за папкой из настроек"""
+        self.stop_folder_watch()
+        
+        try:
+            watcher = FolderWatcher(self.settings['watch_folder'],
+                                    settle_s=self.settings['watch_settle_s'],
+                                    cache=self.get_profile_cache(),
+                                    include_existing=include_existing)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось начать наблюдение: {e}")
+            return
+        
+        self.folder_watcher = watcher
+        self.watch_stop_event = threading.Event()
+        
+        def on_ready(paths):
+            self.root.after(0, lambda: self.ingest_watched_files(paths))
+        
+        thread = threading.Thread(target=watch_loop,
+                                  args=(watcher, on_ready, self.settings['watch_interval_s'],
+                                        self.watch_stop_event))
+        thread.daemon = True
+        thread.start()
+        
+        self.status_var.set(f"Наблюдение за папкой: {watcher.folder}")
+    
+    def stop_folder_watch(self):
+        if self.watch_stop_event is not None:
+            self.watch_stop_event.set()
+        self.watch_stop_event = None
+        self.folder_watcher = None
+    
+    def ingest_watched_files(self, paths):
+        """Новые и изменённые файлы из папки наблюдения (вызывается в потоке Tk)"""
+        group_name = self.settings['watch_group']
+        if group_name not in self.groups:
+            self.groups[group_name] = ProfileGroup(group_name)
+        
+        for file_path in paths:
+            if file_path in self.profiles:
+                # Изменённый файл остаётся в своей группе и обрабатывается заново
+                self.profiles[file_path] = None
+            else:
+                self.groups[group_name].add_profile(None, file_path)
+                self.profiles[file_path] = None
+        
+        # Строки создаются до запуска обработки: пакеты только переподписывают
+        # существующие строки (update_tree(file_paths)) и могут прийти раньше
+        # отложенного обновления
+        self.update_tree()
+        self.status_var.set(f"Наблюдение: новых или изменённых файлов {len(paths)}")
+        
+        thread = threading.Thread(target=self.process_files_thread, args=(list(paths),))
+        thread.daemon = True
+        thread.start()
+    
     # ============================================================================
     # ОСНОВНЫЕ ФУНКЦИИ
     # ============================================================================
@@ -2270,7 +2414,7 @@ class BobrinskyAnalyzer:
             if name and name not in self.groups:
                 self.groups[name] = ProfileGroup(name)
                 self.current_group = name
-                self.update_tree()
+                self.refresh.mark('tree')
                 dialog.destroy()
         
         btn_frame = ttk.Frame(dialog)
@@ -2317,7 +2461,7 @@ class BobrinskyAnalyzer:
                         self.expanded_groups.remove(old_name)
                         self.expanded_groups.add(new_name)
                     
-                    self.update_tree()
+                    self.refresh.mark('tree')
                     dialog.destroy()
         
         btn_frame = ttk.Frame(dialog)
@@ -2354,21 +2498,17 @@ class BobrinskyAnalyzer:
             if group_name == self.current_group:
                 self.current_group = None
             
-            self.update_tree()
-            self.update_results_table()
-            self.update_results_charts()
+            self.refresh.mark('tree', 'table', 'charts')
             
             if self.current_profile and self.current_profile['file_path'] not in self.profiles:
                 self.current_profile = None
                 self.volume_calculator = None
-                self.update_profile_plot()
-                self.update_3d_plot()
-                self.create_modern_results_display(self.results_container)
+                self.refresh.mark('profile', '3d', 'card')
     
     def sort_groups_by_name(self):
         sorted_groups = dict(sorted(self.groups.items()))
         self.groups = sorted_groups
-        self.update_tree()
+        self.refresh.mark('tree')
     
     def on_tree_select(self, event):
         selection = self.tree.selection()
@@ -2449,9 +2589,7 @@ class BobrinskyAnalyzer:
                     # Добавляем в новую группу
                     self.groups[target_group].add_profile(profile, file_path)
                     
-                    self.update_tree()
-                    self.update_results_table()
-                    self.update_results_charts()
+                    self.refresh.mark('tree', 'table', 'charts')
                     dialog.destroy()
         
         btn_frame = ttk.Frame(dialog)
@@ -2460,6 +2598,122 @@ class BobrinskyAnalyzer:
         ttk.Button(btn_frame, text="Переместить", command=move).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Отмена", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
     
+    def open_layer_filter_dialog(self):
+        """Выбор слоёв и области чертежа, из которых строится профиль"""
+        file_path = None
+        selection = self.tree.selection()
+        if selection:
+            item = self.tree.item(selection[0])
+            if 'file' in item.get('tags', []):
+                file_path = item['values'][0]
+        if file_path is None and self.current_profile:
+            file_path = self.current_profile['file_path']
+        if file_path is None:
+            messagebox.showinfo("Информация", "Выберите файл в дереве")
+            return
+        
+        try:
+            index = get_entity_index(file_path, self.settings['dxf_read_mode'],
+                                     flatten_tolerance(self.settings['profile_scale'],
+                                                       self.settings['chord_tolerance']))
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось прочитать {os.path.basename(file_path)}:\n{e}")
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Слои и область: {os.path.basename(file_path)}")
+        dialog.geometry("380x460")
+        dialog.transient(self.root)
+        
+        main_frame = ttk.Frame(dialog, padding=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Слои с количеством примитивов профиля
+        ttk.Label(main_frame, text="Слои (примитивов):").pack(anchor='w')
+        layer_counts = index.layer_counts()
+        layers = list(layer_counts.keys())
+        
+        list_frame = ttk.Frame(main_frame)
+        list_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        layer_list = tk.Listbox(list_frame, selectmode=tk.MULTIPLE, height=8, exportselection=False)
+        layer_scroll = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=layer_list.yview)
+        layer_list.configure(yscrollcommand=layer_scroll.set)
+        layer_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        layer_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        selected = {name.upper() for name in (self.settings['extract_layers'] or layers)}
+        for i, name in enumerate(layers):
+            layer_list.insert(tk.END, f"{name} ({layer_counts[name]})")
+            if name.upper() in selected:
+                layer_list.selection_set(i)
+        
+        # Область интереса в единицах чертежа
+        region_var = tk.BooleanVar(value=self.settings['extract_region'] is not None)
+        ttk.Checkbutton(main_frame, text="Только примитивы внутри области",
+                       variable=region_var).pack(anchor='w', pady=(10, 5))
+        
+        bounds = self.settings['extract_region'] or index.bounds() or (0, 0, 0, 0)
+        region_vars = []
+        region_frame = ttk.Frame(main_frame)
+        region_frame.pack(fill=tk.X)
+        for i, label in enumerate(("X мин:", "Y мин:", "X макс:", "Y макс:")):
+            ttk.Label(region_frame, text=label, width=8).grid(row=i // 2, column=(i % 2) * 2, sticky='w', pady=2)
+            var = tk.StringVar(value=f"{float(bounds[i]):.2f}")
+            ttk.Entry(region_frame, textvariable=var, width=12).grid(row=i // 2, column=(i % 2) * 2 + 1, padx=5, pady=2)
+            region_vars.append(var)
+        
+        apply_new_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(main_frame, text="Применять к новым файлам",
+                       variable=apply_new_var).pack(anchor='w', pady=(10, 0))
+        
+        def apply_filter():
+            chosen = [layers[i] for i in layer_list.curselection()]
+            if not chosen:
+                messagebox.showwarning("Предупреждение", "Выберите хотя бы один слой", parent=dialog)
+                return
+            layer_filter = None if len(chosen) == len(layers) else chosen
+            
+            region = None
+            if region_var.get():
+                try:
+                    region = tuple(float(var.get().replace(',', '.')) for var in region_vars)
+                except ValueError:
+                    messagebox.showerror("Ошибка", "Неверные координаты области", parent=dialog)
+                    return
+            
+            # Профиль строится по индексу - файл повторно не читается
+            points, offsets, _ = index.select(layer_filter, region)
+            profile = build_profile(points, file_path, offsets=offsets, **self.profile_options())
+            if not profile:
+                messagebox.showwarning("Предупреждение",
+                                       f"В выбранных слоях и области недостаточно точек ({len(points)})",
+                                       parent=dialog)
+                return
+            
+            profile['tsetlin_classification'] = self.get_tsetlin_classification(profile['volume'])
+            self.profiles[file_path] = profile
+            
+            cache = self.get_profile_cache()
+            if cache is not None:
+                cache.put(file_path, profile, extraction_params(
+                    layers=layer_filter, region=region,
+                    chord_tolerance=self.settings['chord_tolerance'], **self.profile_options()))
+            
+            if apply_new_var.get():
+                self.settings['extract_layers'] = layer_filter
+                self.settings['extract_region'] = region
+            
+            self.refresh.mark('tree', 'table')
+            self.display_profile(file_path)
+            self.status_var.set(f"{os.path.basename(file_path)}: профиль по {len(chosen)} слоям, "
+                                f"точек {len(points)}")
+            dialog.destroy()
+        
+        btn_frame = ttk.Frame(main_frame)
+        btn_frame.pack(fill=tk.X, pady=10)
+        ttk.Button(btn_frame, text="Применить", command=apply_filter).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Отмена", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+    
     def delete_selected(self):
         selection = self.tree.selection()
         if not selection:
@@ -2484,96 +2738,187 @@ class BobrinskyAnalyzer:
                 if self.current_profile and self.current_profile['file_path'] == file_path:
                     self.current_profile = None
                     self.volume_calculator = None
-                    self.update_profile_plot()
-                    self.update_3d_plot()
-                    self.create_modern_results_display(self.results_container)
+                    self.refresh.mark('profile', '3d', 'card')
                 
-                self.update_tree()
-                self.update_results_table()
-                self.update_results_charts()
+                self.refresh.mark('tree', 'table', 'charts')
     
-    def update_tree(self):
-        expanded = []
-        for group_name, group in self.groups.items():
-            if group_name in self.expanded_groups:
-                expanded.append(group_name)
+    def tree_file_text(self, file_path, volume):
+        """Подпись файла в дереве групп"""
+        filename = os.path.basename(file_path)
+        profile = self.profiles.get(file_path)
+        if not profile or volume is None:
+            return f"{filename} (не обработан)"
+        
+        height = np.max(profile.get('y', [0]))
+        
+        # Добавляем информацию о классификации Цетлина, если есть
+        tsetlin_text = ""
+        if 'tsetlin_classification' in profile:
+            tsetlin_info = profile['tsetlin_classification']
+            tsetlin_text = f", Гр.{tsetlin_info['group']}"
+        
+        return f"{filename} ({volume/1000:.2f} л{tsetlin_text}, H={height:.1f} см)"
+    
+    def set_tree_text(self, item, text):
+        """Подпись строки дерева; Treeview вызывается только при изменении"""
+        if self.tree_texts.get(item) != text:
+            self.tree_texts[item] = text
+            self.tree.item(item, text=text)
+    
+    def update_tree(self, file_paths=None):
+        """
+        Синхронизация дерева с группами и профилями. Идентификаторы строк
+        хранятся в tree_group_items (группа -> строка) и tree_file_items
+        (группа -> {файл: строка}); строки добавляются, перемещаются,
+        переподписываются или удаляются только при изменениях.
+        file_paths - обновить лишь подписи этих файлов (состав групп не менялся).
+        Объёмы берутся из кэша объёмов.
+        """
+        if file_paths is not None:
+            volumes = self.profile_volumes(file_paths=file_paths)
+            for rows in self.tree_file_items.values():
+                for file_path in file_paths:
+                    row = rows.get(file_path)
+                    if row is not None:
+                        self.set_tree_text(row, self.tree_file_text(file_path, volumes.get(file_path)))
+            return
         
-        for item in self.tree.get_children():
+        volumes = self.profile_volumes()
+        groups = list(self.groups.values())
+        
+        # Удалённые группы (вместе со строками файлов)
+        live = set(groups)
+        for group in [g for g in self.tree_group_items if g not in live]:
+            self.forget_tree_rows(self.tree_file_items.pop(group, {}).values())
+            item = self.tree_group_items.pop(group)
+            self.forget_tree_rows([item])
             self.tree.delete(item)
         
+        in_order = [g for g in self.tree_group_items] == [g for g in groups if g in self.tree_group_items]
+        for index, (group_name, group) in enumerate(self.groups.items()):
+            item = self.tree_group_items.get(group)
+            if item is None:
+                item = self.tree.insert('', index, text=group_name, tags=('group',),
+                                        open=group_name in self.expanded_groups)
+                self.tree_group_items[group] = item
+                self.tree_texts[item] = group_name
+            else:
+                if not in_order:
+                    self.tree.move(item, '', index)
+                self.set_tree_text(item, group_name)
+            self.sync_group_rows(group, item, volumes)
+        self.tree_group_items = {group: self.tree_group_items[group] for group in groups}
+    
+    def sync_group_rows(self, group, group_item, volumes):
+        """Строки файлов одной группы: добавление, удаление, порядок, подписи"""
+        rows = self.tree_file_items.setdefault(group, {})
+        files = list(dict.fromkeys(group.files))
+        wanted = set(files)
+        
+        removed = [file_path for file_path in rows if file_path not in wanted]
+        for file_path in removed:
+            row = rows.pop(file_path)
+            self.forget_tree_rows([row])
+            self.tree.delete(row)
+        
+        in_order = list(rows) == [file_path for file_path in files if file_path in rows]
+        for index, file_path in enumerate(files):
+            text = self.tree_file_text(file_path, volumes.get(file_path))
+            row = rows.get(file_path)
+            if row is None:
+                row = self.tree.insert(group_item, index, text=text,
+                                       values=(file_path,), tags=('file',))
+                rows[file_path] = row
+                self.tree_texts[row] = text
+            else:
+                if not in_order:
+                    self.tree.move(row, group_item, index)
+                self.set_tree_text(row, text)
+        self.tree_file_items[group] = {file_path: rows[file_path] for file_path in files}
+    
+    def forget_tree_rows(self, items):
+        for item in items:
+            self.tree_texts.pop(item, None)
+    
+    def profile_volumes(self, method=None, file_paths=None):
+        """
+        Объёмы обработанных профилей методом method (по умолчанию -
+        выбранным): {file_path: объём, см³}; file_paths - только эти файлы.
+        Берутся из кэша объёмов; отсутствующие считаются одним пакетом (ProfileStack).
+        """
+        if file_paths is None:
+            items = [(file_path, profile) for file_path, profile in self.profiles.items() if profile]
+        else:
+            items = [(file_path, self.profiles[file_path]) for file_path in file_paths
+                     if self.profiles.get(file_path)]
+        if not items:
+            return {}
+        method = method or self.method_var.get()
+        volumes = self.volume_cache.volumes([profile for _, profile in items], method)
+        return {file_path: float(volume) for (file_path, _), volume in zip(items, volumes)}
+    
+    def update_results_table(self, file_paths=None):
+        """
+        Обновление модели таблицы результатов: всех строк или только
+        file_paths (пакет обработанных файлов). Виджет перерисовывает
+        лишь видимые строки.
+        """
+        volumes = self.profile_volumes(file_paths=file_paths)
+        method = self.method_var.get()  # Используем текущий метод
+        method_names = {
+            'spline': 'Сплайн',
+            'disks': 'Диски',
+            'frustums': 'Конусы',
+            'trapezoidal': 'Трапеции',
+            'simpson': 'Симпсон',
+            'spline_exact': 'Сплайн (точно)',
+            'adaptive': 'Адаптивный'
+        }
+        method_display = method_names.get(method, method)
+        
+        # Группы по дополнительным схемам - по уже посчитанным объёмам, все сосуды сразу
+        scheme_labels = []
+        if volumes:
+            volume_array = np.array(list(volumes.values()))
+            scheme_labels = [scheme.labels(volume_array) for scheme in self.classification_schemes]
+        
+        group_of = {}
         for group_name, group in self.groups.items():
-            group_id = self.tree.insert('', 'end', text=group_name, tags=('group',))
-            
             for file_path in group.files:
-                filename = os.path.basename(file_path)
-                profile = self.profiles.get(file_path)
-                
-                if profile:
-                    # ВАЖНОЕ ИСПРАВЛЕНИЕ: Рассчитываем объем текущим методом для отображения в дереве
-                    calculator = CorrectVolumeCalculator(profile['y'], profile['r'])
-                    volume = calculator.calculate_volume(self.method_var.get())
-                    
-                    height = np.max(profile.get('y', [0]))
-                    
-                    # Добавляем информацию о классификации Цетлина, если есть
-                    tsetlin_text = ""
-                    if 'tsetlin_classification' in profile:
-                        tsetlin_info = profile['tsetlin_classification']
-                        tsetlin_text = f", Гр.{tsetlin_info['group']}"
-                    
-                    text = f"{filename} ({volume/1000:.2f} л{tsetlin_text}, H={height:.1f} см)"
-                else:
-                    text = f"{filename} (не обработан)"
-                
-                self.tree.insert(group_id, 'end', text=text, 
-                               values=(file_path,), tags=('file',))
+                group_of.setdefault(file_path, group_name)
         
-        for group_name in expanded:
-            for item in self.tree.get_children():
-                if self.tree.item(item, 'text') == group_name:
-                    self.tree.item(item, open=True)
-                    break
-    
-    def update_results_table(self):
-        for item in self.results_tree.get_children():
-            self.results_tree.delete(item)
+        rows = {}
+        for i, (file_path, volume) in enumerate(volumes.items()):
+            profile = self.profiles[file_path]
+            
+            # Получаем классификацию Цетлина
+            tsetlin_group = ""
+            if 'tsetlin_classification' in profile:
+                tsetlin_info = profile['tsetlin_classification']
+                tsetlin_group = f"{tsetlin_info['group']} ({tsetlin_info['group_name']})"
+            
+            rows[file_path] = (
+                profile['name'],
+                group_of.get(file_path, "Без группы"),
+                volume / 1000,
+                volume,
+                # Объёмы двухстенного профиля (пусто, если внутренняя стенка не найдена)
+                profile.get('volume_envelope'),
+                profile.get('volume_capacity'),
+                profile.get('volume_body'),
+                float(np.max(profile['y'])),
+                float(np.max(profile['r']) * 2),
+                method_display,
+                tsetlin_group,
+                *[labels[i] for labels in scheme_labels]
+            )
         
-        for file_path, profile in self.profiles.items():
-            if profile:
-                group_name = self.find_profile_group(file_path)
-                method = self.method_var.get()  # Используем текущий метод
-                
-                calculator = CorrectVolumeCalculator(profile['y'], profile['r'])
-                volume = calculator.calculate_volume(method)  # Используем выбранный метод
-                
-                height = np.max(profile['y'])
-                diameter = np.max(profile['r']) * 2
-                
-                method_names = {
-                    'spline': 'Сплайн',
-                    'disks': 'Диски',
-                    'frustums': 'Конусы',
-                    'trapezoidal': 'Трапеции',
-                    'simpson': 'Симпсон'
-                }
-                method_display = method_names.get(method, method)
-                
-                # Получаем классификацию Цетлина
-                tsetlin_group = ""
-                if 'tsetlin_classification' in profile:
-                    tsetlin_info = profile['tsetlin_classification']
-                    tsetlin_group = f"{tsetlin_info['group']} ({tsetlin_info['group_name']})"
-                
-                self.results_tree.insert('', 'end', values=(
-                    profile['name'],
-                    group_name,
-                    f'{volume/1000:.3f}',
-                    f'{volume:.1f}',
-                    f'{height:.1f}',
-                    f'{diameter:.1f}',
-                    method_display,
-                    tsetlin_group
-                ))
+        if file_paths is None:
+            self.results_model.set_rows(rows)
+        else:
+            self.results_model.update_rows(rows)
+        self.results_table.refresh()
+        self.update_results_count()
     
     def update_results_charts(self):
         """УЛУЧШЕННЫЙ МЕТОД: Обновление графиков с цветами по Цетлину"""
@@ -2596,11 +2941,11 @@ class BobrinskyAnalyzer:
         method = self.method_var.get()
         
         # Собираем данные для всех профилей
-        for profile in self.profiles.values():
+        method_volumes = self.profile_volumes(method)
+        for file_path, profile in self.profiles.items():
             if profile:
                 profile_names.append(profile['name'][:15])
-                calculator = CorrectVolumeCalculator(profile['y'], profile['r'])
-                volume = calculator.calculate_volume(method)
+                volume = method_volumes[file_path]
                 volumes.append(volume / 1000)  # в литры
                 height = np.max(profile['y'])
                 diameter = np.max(profile['r']) * 2
@@ -2760,130 +3105,96 @@ class BobrinskyAnalyzer:
             messagebox.showinfo("Информация", "Все файлы уже обработаны")
             return
         
+        # Первый извлечённый профиль сразу показываем
+        self.display_first_processed = True
+        
         thread = threading.Thread(target=self.process_files_thread, args=(unprocessed,))
         thread.daemon = True
         thread.start()
     
     def process_files_thread(self, files):
-        for i, file_path in enumerate(files):
-            self.status_var.set(f"Обработка: {os.path.basename(file_path)}...")
-            
-            try:
-                profile = self.extract_profile_corrected(file_path)
-                
-                if profile:
-                    self.profiles[file_path] = profile
-                    
-                    # Добавляем классификацию Цетлина
-                    if 'volume' in profile:
-                        tsetlin_classification = self.get_tsetlin_classification(profile['volume'])
-                        profile['tsetlin_classification'] = tsetlin_classification
-                    
-                    self.root.after(0, self.update_tree)
-                    self.root.after(0, self.update_results_table)
-                    
-                    if i == 0:
-                        self.root.after(0, lambda: self.display_profile(file_path))
-            
-            except Exception as e:
-                print(f"Ошибка обработки {file_path}: {e}")
+        """Параллельная обработка файлов в пуле процессов с пакетной фиксацией результатов"""
+        ingestor = ParallelIngestor(max_workers=self.settings['ingest_workers'],
+                                    batch_size=self.settings['ingest_batch_size'],
+                                    cache=self.get_profile_cache(),
+                                    extract_options={'read_mode': self.settings['dxf_read_mode'],
+                                                     'layers': self.settings['extract_layers'],
+                                                     'region': self.settings['extract_region'],
+                                                     'chord_tolerance': self.settings['chord_tolerance'],
+                                                     **self.profile_options()})
+        
+        def on_progress(done, total, file_path):
+            self.root.after(0, lambda: self.status_var.set(
+                f"Обработано {done}/{total}: {os.path.basename(file_path)}"))
+        
+        def on_batch(batch):
+            self.root.after(0, lambda: self.commit_profiles_batch(batch))
+        
+        try:
+            ingestor.run(files, on_batch, on_progress)
+        except Exception as e:
+            print(f"Ошибка параллельной обработки: {e}")
         
         self.root.after(0, lambda: self.status_var.set("Обработка завершена"))
-        self.root.after(0, self.update_results_charts)
+        self.root.after(0, lambda: self.refresh.mark('charts'))
     
-    def extract_profile_corrected(self, file_path):
-        try:
-            doc = ezdxf.readfile(file_path)
-            msp = doc.modelspace()
-            
-            points = []
-            for entity in msp:
-                if entity.dxftype() == 'LINE':
-                    points.append(entity.dxf.start[:2])
-                    points.append(entity.dxf.end[:2])
-                elif entity.dxftype() in ['LWPOLYLINE', 'POLYLINE']:
-                    try:
-                        pts = entity.get_points()
-                        for p in pts:
-                            points.append(p[:2])
-                    except:
-                        pass
-            
-            if len(points) < 10:
+    def profile_options(self):
+        """
+        Параметры построения профиля для build_profile; те же значения
+        записываются в extraction_params, т.е. в ключ кэша профилей
+        """
+        return {'scale': self.settings['profile_scale'],
+                'n_points': self.settings['profile_points'],
+                'wall': self.settings['profile_wall'],
+                **self.resample_options()}
+    
+    def resample_options(self):
+        """Параметры ресэмплинга профиля для extract_profile_corrected и build_profile"""
+        return {'resample': self.settings['resample_mode'],
+                'resample_tolerance': self.settings['resample_tolerance'],
+                'max_points': self.settings['resample_max_points']}
+    
+    def get_profile_cache(self):
+        """Кэш профилей на диске (создаётся при первом обращении)"""
+        if not self.settings['profile_cache_enabled']:
+            return None
+        
+        if self.profile_cache is None:
+            try:
+                self.profile_cache = ProfileCache(
+                    max_bytes=self.settings['profile_cache_mb'] * 1024 * 1024)
+            except Exception as e:
+                print(f"Кэш профилей недоступен: {e}")
+                self.settings['profile_cache_enabled'] = False
                 return None
-            
-            points = np.array(points)
-            
-            x_coords = points[:, 0]
-            y_coords = points[:, 1]
-            
-            axis_x = np.min(x_coords)
-            points[:, 0] -= axis_x
-            
-            y_min = np.min(points[:, 1])
-            points[:, 1] -= y_min
-            
-            points *= 0.1
-            
-            radii = points[:, 0]
-            heights = points[:, 1]
-            
-            if np.any(radii < -0.001):
-                radii = np.abs(radii)
-            
-            sort_idx = np.argsort(heights)
-            heights = heights[sort_idx]
-            radii = radii[sort_idx]
-            
-            unique_heights, unique_idx = np.unique(heights, return_index=True)
-            unique_radii = radii[unique_idx]
-            
-            if unique_heights[0] > 0.01:
-                unique_heights = np.insert(unique_heights, 0, 0.0)
-                unique_radii = np.insert(unique_radii, 0, unique_radii[0])
-            
-            n_points = 200
-            if len(unique_heights) > 1:
-                interp_func = interp1d(unique_heights, unique_radii, 
-                                     kind='cubic', fill_value='extrapolate')
-                
-                max_height = np.max(unique_heights)
-                interp_heights = np.linspace(0, max_height, n_points)
-                interp_radii = interp_func(interp_heights)
-                
-                interp_radii = np.maximum(interp_radii, 0.0)
-            else:
-                interp_heights = np.array([0.0, 1.0])
-                interp_radii = np.array([unique_radii[0], unique_radii[0]])
-            
-            # КРИТИЧЕСКОЕ ИСПРАВЛЕНИЕ: Используем метод по умолчанию (диски) для начального расчета
-            calculator = CorrectVolumeCalculator(interp_heights, interp_radii)
-            
-            # Используем метод дисков для начального расчета (позже пересчитается текущим методом)
-            volume = calculator.method_disks()  # Исправлено: был method_spline_integral()
-            
-            # Создаем профиль
-            profile = {
-                'name': os.path.basename(file_path),
-                'y': interp_heights,
-                'r': interp_radii,
-                'volume': volume,  # Сохраняем начальный объем
-                'file_path': file_path,
-                'is_half': True,
-                'axis_x': axis_x
-            }
-            
-            # Добавляем классификацию Цетлина
-            tsetlin_classification = self.get_tsetlin_classification(volume)
+        return self.profile_cache
+    
+    def commit_profiles_batch(self, batch):
+        """Фиксация пакета извлечённых профилей (вызывается в потоке Tk)"""
+        # Файл могли удалить из проекта, пока он обрабатывался
+        batch = [(file_path, profile) for file_path, profile in batch
+                 if profile and file_path in self.profiles]
+        
+        # Добавляем классификацию Цетлина (весь пакет сразу)
+        classified = [profile for _, profile in batch if 'volume' in profile]
+        tsetlin = self.get_tsetlin_classifications([profile['volume'] for profile in classified])
+        for profile, tsetlin_classification in zip(classified, tsetlin):
             profile['tsetlin_classification'] = tsetlin_classification
-            
-            return profile
-            
-        except Exception as e:
-            print(f"Ошибка извлечения профиля {file_path}: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
+        
+        for file_path, profile in batch:
+            self.profiles[file_path] = profile
+        
+        if not batch:
+            return
+        first_added = batch[0][0]
+        
+        # Состав групп не менялся - обновляются только подписи файлов пакета
+        self.update_tree(file_paths=[file_path for file_path, _ in batch])
+        self.update_results_table(file_paths=[file_path for file_path, _ in batch])
+        
+        if self.display_first_processed:
+            self.display_first_processed = False
+            self.display_profile(first_added)
     
     def display_profile(self, file_path):
         profile = self.profiles.get(file_path)
@@ -2891,13 +3202,10 @@ class BobrinskyAnalyzer:
             return
         
         self.current_profile = profile
-        self.volume_calculator = CorrectVolumeCalculator(profile['y'], profile['r'])
+        self.volume_calculator = self.volume_cache.calculator(profile)
         
-        self.update_profile_plot()
-        self.update_3d_plot()
         self.update_volume_info()  # ВАЖНОЕ ИСПРАВЛЕНИЕ: добавляем вызов для пересчета объема
-        self.create_modern_results_display(self.results_container)
-        self.update_results_charts()
+        self.refresh.mark('profile', '3d', 'card', 'charts')
         
         # Обновление информации о модели
         if self.model_info_label:
@@ -2916,6 +3224,9 @@ class BobrinskyAnalyzer:
             info_text += f"📏 Диаметр: {diameter:.1f} см\n"
             info_text += f"🎯 Объём: {volume:.2f} л{tsetlin_text}\n"
             info_text += f"📊 Точек: {len(profile['y'])}"
+            resample_info = profile.get('resample')
+            if resample_info and resample_info.get('volume_error') is not None:
+                info_text += f" (погрешность ресэмплинга {resample_info['volume_error']:+.2f} см³)"
             self.model_info_label.config(text=info_text)
         
         max_height = np.max(profile['y'])
@@ -2936,22 +3247,18 @@ class BobrinskyAnalyzer:
         self.ax_profile.plot(-r, y, color=MODERN_PALETTE['primary'], linewidth=2.5, label='Левая сторона')
         self.ax_profile.axvline(x=0, color=MODERN_PALETTE['secondary'], linestyle='--', alpha=0.7, label='Ось симметрии')
         
+        # Артисты уровня создаются всегда: при перетаскивании меняются только их данные
         current_level = self.y_level_var.get()
-        if current_level > 0:
-            mask = y <= current_level
-            
-            self.ax_profile.fill_betweenx(y[mask], -r[mask], r[mask], 
-                                        alpha=0.2, color=MODERN_PALETTE['primary_light'],
-                                        label=f'Заполнение до {current_level:.1f} см')
-            
-            self.ax_profile.axhline(y=current_level, color=MODERN_PALETTE['accent'], 
-                                 linestyle='-', linewidth=2, alpha=0.8)
-            
-            r_at_level = np.interp(current_level, y, r)
-            self.ax_profile.plot(r_at_level, current_level, 'o', 
-                               color=MODERN_PALETTE['accent'], markersize=8)
-            self.ax_profile.plot(-r_at_level, current_level, 'o', 
-                               color=MODERN_PALETTE['accent'], markersize=8)
+        fill = Polygon(np.zeros((1, 2)), closed=True,
+                       alpha=0.2, color=MODERN_PALETTE['primary_light'],
+                       label=f'Заполнение до {current_level:.1f} см' if current_level > 0 else '_nolegend_')
+        self.ax_profile.add_patch(fill)
+        line = self.ax_profile.axhline(y=current_level, color=MODERN_PALETTE['accent'], 
+                                    linestyle='-', linewidth=2, alpha=0.8)
+        markers, = self.ax_profile.plot([], [], 'o', 
+                                      color=MODERN_PALETTE['accent'], markersize=8)
+        self.level_artists = (fill, line, markers)
+        self.set_level_artists(current_level)
         
         self.ax_profile.set_xlabel('Радиус (см)', fontsize=12, color=MODERN_PALETTE['primary_dark'])
         self.ax_profile.set_ylabel('Высота (см)', fontsize=12, color=MODERN_PALETTE['primary_dark'])
@@ -2975,7 +3282,64 @@ class BobrinskyAnalyzer:
         self.ax_profile.set_ylim(-max_y * 0.05, max_y * 1.05)
         self.ax_profile.set_aspect('equal', adjustable='box')
         
+        if self.level_background is not None:
+            # Перерисовка во время перетаскивания - обновляем и фон для blit
+            self.start_level_blit()
+        else:
+            self.canvas_profile.draw()
+    
+    def set_level_artists(self, level):
+        """Данные линии уровня, маркеров и заливки до уровня level"""
+        fill, line, markers = self.level_artists
+        y = self.current_profile['y']
+        r = self.current_profile['r']
+        visible = level > 0
+        if visible:
+            mask = y <= level
+            r_at_level = np.interp(level, y, r)
+            right = np.column_stack((np.append(r[mask], r_at_level), np.append(y[mask], level)))
+            left = right[::-1] * (-1.0, 1.0)
+            fill.set_xy(np.vstack((right, left)))
+            line.set_ydata([level, level])
+            markers.set_data([r_at_level, -r_at_level], [level, level])
+        for artist in self.level_artists:
+            artist.set_visible(visible)
+    
+    def start_level_blit(self):
+        """
+        Режим перетаскивания уровня: артисты уровня помечаются анимированными,
+        фигура рисуется без них один раз, и этот фон сохраняется для blit.
+        """
+        for artist in self.level_artists:
+            artist.set_animated(True)
         self.canvas_profile.draw()
+        self.level_background = self.canvas_profile.copy_from_bbox(self.ax_profile.bbox)
+        self.blit_level()
+    
+    def blit_level(self):
+        """Восстановить фон и нарисовать поверх него только артисты уровня"""
+        self.canvas_profile.restore_region(self.level_background)
+        for artist in self.level_artists:
+            self.ax_profile.draw_artist(artist)
+        self.canvas_profile.blit(self.ax_profile.bbox)
+    
+    def stop_level_blit(self):
+        for artist in self.level_artists:
+            artist.set_animated(False)
+        self.level_background = None
+    
+    def current_volumes(self, level):
+        """Полный объем текущего профиля и объем до уровня level выбранным методом"""
+        method = self.method_var.get()
+        return (self.volume_cache.volume(self.current_profile, method),
+                self.volume_cache.volume(self.current_profile, method, level))
+    
+    def current_volume_table(self):
+        """Таблица накопленного объема текущего профиля для выбранного метода"""
+        self.volume_calculator = self.volume_cache.calculator(self.current_profile)
+        table = self.volume_calculator.volume_table(self.method_var.get())
+        self.current_profile['volume_table'] = table
+        return table
     
     def update_volume_info(self):
         if not self.volume_calculator or not self.current_profile:
@@ -2985,9 +3349,8 @@ class BobrinskyAnalyzer:
         level = self.y_level_var.get()
         
         try:
-            # Используем правильный метод расчета
-            full_volume = self.volume_calculator.calculate_volume(method)
-            level_volume = self.volume_calculator.calculate_volume(method, level)
+            # Поиск по таблице накопленного объема вместо повторного интегрирования
+            full_volume, level_volume = self.current_volumes(level)
             
             # Защита от деления на ноль
             if full_volume > 0:
@@ -2998,17 +3361,7 @@ class BobrinskyAnalyzer:
             self.percent_var.set(round(percent, 1))
             
             # ОБНОВЛЯЕМ объем в текущем профиле (убрали условие)
-            self.current_profile['volume'] = full_volume
-            
-            # Обновляем классификацию Цетлина
-            volume_cm3 = self.current_profile['volume']
-            tsetlin_classification = self.get_tsetlin_classification(volume_cm3)
-            self.current_profile['tsetlin_classification'] = tsetlin_classification
-            
-            # Обновляем отображение
-            self.update_results_table()
-            self.update_results_charts()
-            self.create_modern_results_display(self.results_container)
+            self.set_current_volume(full_volume)
             
         except Exception as e:
             print(f"Ошибка расчета объема методом {method}: {e}")
@@ -3019,16 +3372,32 @@ class BobrinskyAnalyzer:
                 percent = (level_volume / full_volume * 100) if full_volume > 0 else 0
                 
                 self.percent_var.set(round(percent, 1))
-                self.current_profile['volume'] = full_volume
-                self.update_results_table()
-                self.update_results_charts()
-                self.create_modern_results_display(self.results_container)
+                self.set_current_volume(full_volume)
             except Exception as e2:
                 print(f"Резервный расчет тоже не удался: {e2}")
     
+    def set_current_volume(self, full_volume):
+        """
+        Полный объём текущего профиля и его классификация Цетлина.
+        Карточка результатов зависит от уровня и обновляется всегда; таблица,
+        графики и дерево - только если полный объём действительно изменился
+        (при смене уровня он остаётся прежним).
+        """
+        changed = self.current_profile.get('volume') != full_volume
+        self.current_profile['volume'] = full_volume
+        
+        # Обновляем классификацию Цетлина
+        tsetlin_classification = self.get_tsetlin_classification(full_volume)
+        self.current_profile['tsetlin_classification'] = tsetlin_classification
+        
+        self.refresh.mark('card')
+        if changed:
+            self.refresh.mark('tree', 'table', 'charts')
+    
     def on_method_change(self):
         self.update_volume_info()
-        self.update_profile_plot()
+        # Объёмы всех профилей в дереве, таблице и графиках зависят от метода
+        self.refresh.mark('tree', 'table', 'charts', 'profile')
     
     def apply_y_level(self):
         try:
@@ -3038,7 +3407,7 @@ class BobrinskyAnalyzer:
             if 0 <= level <= max_height:
                 self.y_slider.set(level)
                 self.update_volume_info()
-                self.update_profile_plot()
+                self.refresh.mark('profile')
             else:
                 messagebox.showwarning("Ошибка", f"Уровень должен быть от 0 до {max_height:.1f}")
         except:
@@ -3048,7 +3417,7 @@ class BobrinskyAnalyzer:
         level = self.y_slider.get()
         self.y_level_var.set(round(level, 1))
         self.update_volume_info()
-        self.update_profile_plot()
+        self.refresh.mark('profile')
     
     def apply_percent(self):
         if not self.volume_calculator or not self.current_profile:
@@ -3058,32 +3427,13 @@ class BobrinskyAnalyzer:
             percent = float(self.percent_var.get())
             
             if 0 <= percent <= 100:
-                method = self.method_var.get()
-                
-                full_volume = self.volume_calculator.calculate_volume(method)
-                
-                target_volume = full_volume * (percent / 100)
+                # Обратный поиск по монотонной таблице V(y)
+                level = self.current_volume_table().level_for_percent(percent)
                 
-                max_height = np.max(self.current_profile['y'])
-                low, high = 0, max_height
-                mid = max_height / 2
-                
-                # Бинарный поиск уровня
-                for _ in range(30):
-                    mid = (low + high) / 2
-                    mid_volume = self.volume_calculator.calculate_volume(method, mid)
-                    
-                    if abs(mid_volume - target_volume) < 0.1:
-                        break
-                    elif mid_volume < target_volume:
-                        low = mid
-                    else:
-                        high = mid
-                
-                self.y_level_var.set(round(mid, 1))
-                self.y_slider.set(mid)
+                self.y_level_var.set(round(level, 1))
+                self.y_slider.set(level)
                 self.update_volume_info()
-                self.update_profile_plot()
+                self.refresh.mark('profile')
                 
             else:
                 messagebox.showwarning("Ошибка", "Процент должен быть от 0 до 100")
@@ -3102,10 +3452,19 @@ class BobrinskyAnalyzer:
             
             self.y_level_var.set(round(level, 1))
             self.y_slider.set(level)
-            self.update_volume_info()
-            self.update_profile_plot()
             
+            if self.level_artists is None or not self.volume_calculator or not self.current_profile:
+                self.update_volume_info()
+                self.refresh.mark('profile')
+                return
+            
+            # Быстрый режим: таблица V(y) для процента и blit артистов уровня;
+            # карточка результатов и полный график - после отпускания кнопки
             self.dragging_level = True
+            self.drag_volume_table = self.current_volume_table()
+            self.set_level_artists(level)
+            self.start_level_blit()
+            self.percent_var.set(round(self.drag_volume_table.percent_at(level), 1))
     
     def on_profile_drag(self, event):
         if not self.dragging_level or event.inaxes != self.ax_profile:
@@ -3118,11 +3477,18 @@ class BobrinskyAnalyzer:
             
             self.y_level_var.set(round(level, 1))
             self.y_slider.set(level)
-            self.update_volume_info()
-            self.update_profile_plot()
+            self.set_level_artists(level)
+            self.blit_level()
+            self.percent_var.set(round(self.drag_volume_table.percent_at(level), 1))
     
     def on_profile_release(self, event):
+        if not self.dragging_level:
+            return
         self.dragging_level = False
+        self.stop_level_blit()
+        self.drag_volume_table = None
+        self.update_volume_info()
+        self.refresh.mark('profile')
     
     def compare_all_methods(self):
         if not self.volume_calculator:
@@ -3158,7 +3524,9 @@ class BobrinskyAnalyzer:
                 'frustums': 'Метод усечённых конусов',
                 'trapezoidal': 'Метод трапеций',
                 'simpson': 'Метод Симпсона',
-                'spline': 'Интеграл сплайна (эталон)'
+                'spline': 'Интеграл сплайна (эталон)',
+                'spline_exact': 'Точный интеграл сплайна',
+                'adaptive': 'Адаптивный Симпсон'
             }
             
             reference = results.get('spline', 0)
@@ -3187,10 +3555,12 @@ class BobrinskyAnalyzer:
             info_text = f"""
             Информация о методах:
             • Сплайн: 1001 точка, интеграл Симпсона
+            • Точный сплайн: аналитический интеграл π·r² по коэффициентам
             • Симпсон: 501 точка, интеграл Симпсона
             • Трапеции: 2000 точек, метод трапеций
             • Диски: интерполяция по точкам профиля
             • Конусы: усечённые конусы между точками
+            • Адаптивный: Симпсон с делением интервалов до допуска {self.volume_cache.rel_tol:g}
             """
             
             ttk.Label(info_frame, text=info_text, justify=tk.LEFT).pack()
@@ -3204,6 +3574,116 @@ class BobrinskyAnalyzer:
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось сравнить методы: {str(e)}")
     
+    def show_volume_uncertainty(self):
+        """
+        Неопределённость объёма всех сосудов из-за ошибок оцифровки (Монте-Карло):
+        радиус возмущается на ошибку линии чертежа, ось - на ошибку положения.
+        Случайные числа сосуда зависят от seed и пути файла, поэтому
+        повторный расчёт даёт те же интервалы.
+        """
+        items = [(file_path, profile) for file_path, profile in self.profiles.items() if profile]
+        if not items:
+            messagebox.showwarning("Ошибка", "Нет обработанных профилей")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Неопределённость объёма (Монте-Карло)")
+        window.geometry("820x520")
+        window.configure(bg='white')
+        
+        params_frame = ttk.Frame(window, padding=10)
+        params_frame.pack(fill=tk.X)
+        
+        samples_var = tk.IntVar(value=self.settings['uncertainty_samples'])
+        radius_var = tk.DoubleVar(value=self.settings['uncertainty_radius_sigma'])
+        axis_var = tk.DoubleVar(value=self.settings['uncertainty_axis_sigma'])
+        seed_var = tk.IntVar(value=self.settings['uncertainty_seed'])
+        
+        for text, var, from_, to, increment in (("Реализаций:", samples_var, 100, 20000, 100),
+                                                ("σ линии, см:", radius_var, 0.0, 1.0, 0.01),
+                                                ("σ оси, см:", axis_var, 0.0, 1.0, 0.01),
+                                                ("Seed:", seed_var, 0, 2**31 - 1, 1)):
+            ttk.Label(params_frame, text=text).pack(side=tk.LEFT)
+            ttk.Spinbox(params_frame, from_=from_, to=to, increment=increment,
+                       textvariable=var, width=7).pack(side=tk.LEFT, padx=(2, 10))
+        
+        low_label, high_label = (f'{p:g}%' for p in UNCERTAINTY_PERCENTILES)
+        columns = ('Файл', 'Номинал (л)', 'Среднее (л)', 'СКО (л)', low_label, high_label, 'СКО, %')
+        tree_frame = ttk.Frame(window)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        tree = ttk.Treeview(tree_frame, columns=columns, show='headings', height=15)
+        for column in columns:
+            tree.heading(column, text=column)
+            tree.column(column, width=180 if column == 'Файл' else 95)
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        status_var = tk.StringVar(value="")
+        ttk.Label(window, textvariable=status_var,
+                 foreground=MODERN_PALETTE['dark']).pack(anchor='w', padx=10, pady=5)
+        
+        def show(result, elapsed):
+            if not window.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for i, (file_path, profile) in enumerate(items):
+                spread = {key: float(result[key][i]) for key in ('nominal', 'mean', 'std', 'low', 'high')}
+                profile['volume_uncertainty'] = spread
+                if not np.isfinite(spread['nominal']):
+                    continue
+                tree.insert('', 'end', values=(
+                    profile['name'],
+                    f"{spread['nominal']/1000:.4f}",
+                    f"{spread['mean']/1000:.4f}",
+                    f"{spread['std']/1000:.4f}",
+                    f"{spread['low']/1000:.4f}",
+                    f"{spread['high']/1000:.4f}",
+                    f"{spread['std'] / spread['nominal'] * 100:.2f}"
+                ))
+            status_var.set(f"Сосудов: {len(items)}, реализаций: {self.settings['uncertainty_samples']}, "
+                           f"время {elapsed:.1f} с")
+        
+        def run():
+            try:
+                self.settings['uncertainty_samples'] = max(10, int(samples_var.get()))
+                self.settings['uncertainty_radius_sigma'] = max(0.0, float(radius_var.get()))
+                self.settings['uncertainty_axis_sigma'] = max(0.0, float(axis_var.get()))
+                self.settings['uncertainty_seed'] = int(seed_var.get())
+            except (tk.TclError, ValueError):
+                messagebox.showerror("Ошибка", "Некорректные параметры", parent=window)
+                return
+            
+            pairs = [(profile['y'], profile['r']) for _, profile in items]
+            keys = [file_path for file_path, _ in items]
+            method = self.method_var.get()
+            options = {'n_samples': self.settings['uncertainty_samples'],
+                       'radius_sigma': self.settings['uncertainty_radius_sigma'],
+                       'axis_sigma': self.settings['uncertainty_axis_sigma'],
+                       'seed': self.settings['uncertainty_seed']}
+            status_var.set("Расчёт...")
+            
+            def worker():
+                t_start = time.perf_counter()
+                try:
+                    result = volume_uncertainty(pairs, method, keys=keys, **options)
+                except Exception as e:
+                    print(f"Ошибка оценки неопределённости: {e}")
+                    self.root.after(0, lambda: status_var.set(f"Ошибка: {e}"))
+                    return
+                elapsed = time.perf_counter() - t_start
+                self.root.after(0, lambda: show(result, elapsed))
+            
+            threading.Thread(target=worker, daemon=True).start()
+        
+        btn_frame = ttk.Frame(window)
+        btn_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        ttk.Button(btn_frame, text="Рассчитать", command=run).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Закрыть", command=window.destroy).pack(side=tk.RIGHT, padx=5)
+        
+        run()
+    
     def copy_results_to_clipboard(self):
         """Копирование результатов в буфер обмена с КЛАССИФИКАЦИЕЙ ЦЕТЛИНА"""
         if not self.current_profile:
@@ -3214,9 +3694,7 @@ class BobrinskyAnalyzer:
             method = self.method_var.get()
             level = self.y_level_var.get()
             
-            calculator = CorrectVolumeCalculator(self.current_profile['y'], self.current_profile['r'])
-            full_volume = calculator.calculate_volume(method)
-            level_volume = calculator.calculate_volume(method, level)
+            full_volume, level_volume = self.current_volumes(level)
             percent = (level_volume / full_volume * 100) if full_volume > 0 else 0
             
             text = f"""Bobrinsky - Результаты анализа
@@ -3256,13 +3734,12 @@ class BobrinskyAnalyzer:
             messagebox.showerror("Ошибка", f"Не удалось копировать: {str(e)}")
     
     def copy_tree_selection(self):
-        selection = self.results_tree.selection()
-        if not selection:
+        selected = self.results_table.selected_rows()
+        if not selected:
             return
         
         lines = []
-        for item in selection:
-            values = self.results_tree.item(item, 'values')
+        for values in selected:
             lines.append('\t'.join(str(v) for v in values))
         
         text = '\n'.join(lines)
@@ -3340,7 +3817,9 @@ class BobrinskyAnalyzer:
             'frustums': 'Конусы',
             'trapezoidal': 'Трапеции',
             'simpson': 'Симпсон',
-            'spline': 'Сплайн'
+            'spline': 'Сплайн',
+            'spline_exact': 'Сплайн (точно)',
+            'adaptive': 'Адаптивный'
         }
         
         display_methods = [display_names.get(m, m) for m in methods]
@@ -3382,11 +3861,16 @@ class BobrinskyAnalyzer:
             try:
                 with pd.ExcelWriter(filename, engine='openpyxl') as writer:
                     profile_data = []
+                    volumes = self.profile_volumes()
+                    low_label, high_label = (f'{p:g}%' for p in UNCERTAINTY_PERCENTILES)
+                    volume_array = np.array([volumes[fp] for fp, p in self.profiles.items() if p])
+                    scheme_labels = [iter(scheme.labels(volume_array))
+                                     for scheme in self.classification_schemes]
                     for file_path, profile in self.profiles.items():
                         if profile:
                             # КРИТИЧЕСКОЕ ИСПРАВЛЕНИЕ: Рассчитываем объем текущим методом
-                            calculator = CorrectVolumeCalculator(profile['y'], profile['r'])
-                            volume = calculator.calculate_volume(self.method_var.get())
+                            volume = volumes[file_path]
+                            spread = profile.get('volume_uncertainty') or {}
                             
                             # Получаем классификацию Цетлина
                             tsetlin_group = ""
@@ -3401,11 +3885,21 @@ class BobrinskyAnalyzer:
                                 'Группа': self.find_profile_group(file_path),
                                 'Объём (л)': volume / 1000,
                                 'Объём (см³)': volume,
+                                'Объём по наружной стенке (см³)': profile.get('volume_envelope'),
+                                'Вместимость (см³)': profile.get('volume_capacity'),
+                                'Объём тела (см³)': profile.get('volume_body'),
+                                'Объём: среднее МК (см³)': spread.get('mean'),
+                                'Объём: СКО (см³)': spread.get('std'),
+                                f'Объём: {low_label} (см³)': spread.get('low'),
+                                f'Объём: {high_label} (см³)': spread.get('high'),
                                 'Высота (см)': np.max(profile.get('y', [0])),
                                 'Диаметр (см)': np.max(profile.get('r', [0])) * 2,
                                 'Точек': len(profile.get('y', [])),
                                 'Группа Цетлина': tsetlin_group,
                                 'Качество Цетлина': tsetlin_name,
+                                **{f'Схема: {scheme.name}': next(labels) for scheme, labels
+                                   in zip(self.classification_schemes, scheme_labels)},
+                                **self.membership_columns(profile),
                                 'Метод расчёта': self.method_var.get()
                             })
                     
@@ -3448,6 +3942,17 @@ class BobrinskyAnalyzer:
             except Exception as e:
                 messagebox.showerror("Ошибка", f"Не удалось экспортировать: {str(e)}")
     
+    def membership_columns(self, profile):
+        """Столбцы экспорта с вероятностями групп Цетлина (если анализ выполнен)"""
+        membership = profile.get('tsetlin_membership')
+        if not membership:
+            return {}
+        groups = [c['group'] for c in classification_index(self.tsetlin_classification).classification]
+        columns = {f'P(группа {group})': float(p) for group, p in zip(groups, membership['probabilities'])}
+        columns['Уверенность группы Цетлина'] = membership['confidence']
+        columns['Пограничный сосуд'] = 'да' if membership['borderline'] else 'нет'
+        return columns
+    
     def find_profile_group(self, file_path):
         for group_name, group in self.groups.items():
             if file_path in group.files:
@@ -3456,10 +3961,63 @@ class BobrinskyAnalyzer:
     
     def update_plots(self):
         if self.current_profile:
-            self.update_profile_plot()
-            self.update_3d_plot()
             self.update_volume_info()
-            self.update_results_charts()
+            self.refresh.mark('profile', '3d', 'charts')
+    
+    def show_classification_schemes(self):
+        """Окно загрузки дополнительных схем классификации (JSON/CSV)"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Схемы классификации")
+        dialog.geometry("520x360")
+        dialog.transient(self.root)
+        
+        main_frame = ttk.Frame(dialog, padding=15)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(main_frame, text="Шкала Цетлина используется всегда; дополнительные схемы\n"
+                                   "добавляют столбцы в таблицу результатов и экспорт Excel.",
+                 foreground=MODERN_PALETTE['dark']).pack(anchor='w', pady=(0, 10))
+        
+        listbox = tk.Listbox(main_frame, height=10)
+        listbox.pack(fill=tk.BOTH, expand=True)
+        
+        def refresh():
+            listbox.delete(0, tk.END)
+            for scheme in self.classification_schemes:
+                listbox.insert(tk.END, f"{scheme.name} - групп: {len(scheme.classification)} "
+                                       f"({os.path.basename(scheme.source or '')})")
+            # Объёмы берутся из кэша - пересчитываются только подписи групп
+            self.configure_results_columns()
+            self.refresh.mark('table')
+        
+        def load():
+            paths = filedialog.askopenfilenames(
+                parent=dialog,
+                filetypes=[("Схемы классификации", "*.json *.csv"), ("All files", "*.*")])
+            for path in paths:
+                try:
+                    scheme = load_scheme(path)
+                except Exception as e:
+                    messagebox.showerror("Ошибка", f"{os.path.basename(path)}: {e}", parent=dialog)
+                    continue
+                names = [s.name for s in self.classification_schemes] + ['Группа Цетлина']
+                if scheme.name in names or scheme.name in dict(self.results_base_columns):
+                    scheme.name = f"{scheme.name} ({os.path.basename(path)})"
+                self.classification_schemes.append(scheme)
+            refresh()
+        
+        def remove():
+            for index in reversed(listbox.curselection()):
+                del self.classification_schemes[index]
+            refresh()
+        
+        btn_frame = ttk.Frame(main_frame)
+        btn_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Button(btn_frame, text="Загрузить...", command=load).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Удалить", command=remove).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Закрыть", command=dialog.destroy).pack(side=tk.RIGHT, padx=5)
+        
+        refresh()
     
     def show_tsetlin_info(self):
         """Показать подробную информацию о классификации Цетлина"""
@@ -0,0 +1,444 @@
+"""batch_cli.py
+Пакетная обработка DXF файлов без графического интерфейса.
+
+Пример:
+    python batch_cli.py finds/2024 "archive/**/*.dxf" -o volumes.csv --methods disks,spline
+    python batch_cli.py incoming -o volumes.csv --watch --group "Раскоп 3"
+
+Для каждого сосуда записывается строка с объёмами выбранными методами
+и группой по классификации Цетлина. Результаты пишутся по мере готовности,
+поэтому обработку большого архива можно прервать без потери готовых строк.
+В режиме --watch после обработки имеющихся файлов папки отслеживаются,
+и в таблицу дописываются строки для новых и изменённых чертежей.
+Диагностика расчёта выводится в stdout, ход обработки - в stderr.
+"""
+
+import os
+import sys
+import csv
+import glob
+import time
+import argparse
+from functools import partial
+
+import numpy as np
+
+from volume_calc import (CorrectVolumeCalculator, ADAPTIVE_REL_TOL, volume_uncertainty,
+                         UNCERTAINTY_RADIUS_SIGMA, UNCERTAINTY_AXIS_SIGMA)
+from tsetlin import classify_volume, load_scheme, membership_probabilities
+from dxf_profile import (READ_MODES, PROFILE_SCALE, PROFILE_POINTS, CHORD_TOLERANCE,
+                         PROFILE_WALLS, RESAMPLE_MODES, RESAMPLE_TOLERANCE, RESAMPLE_MAX_POINTS)
+from ingest import ParallelIngestor, default_worker_count
+from profile_cache import ProfileCache, DEFAULT_CACHE_PATH, DEFAULT_CACHE_MB
+from watch import FolderWatcher, watch_loop, DEFAULT_SETTLE_S, DEFAULT_POLL_S
+
+# Методы CorrectVolumeCalculator.calculate_volume
+VOLUME_METHODS = ('disks', 'frustums', 'trapezoidal', 'simpson', 'spline', 'spline_exact',
+                  'adaptive')
+
+# ============================================================================
+# АНАЛИЗ ПРОФИЛЯ (выполняется в рабочих процессах)
+# ============================================================================
+
+def analyze_profile(profile, methods=('spline',), rel_tol=ADAPTIVE_REL_TOL, uncertainty=None):
+    """
+    Объёмы выбранными методами и классификация Цетлина для профиля.
+    Объём сосуда (profile['report_volume']) и классификация - по первому
+    методу, им же оцениваются неопределённость и устойчивость группы.
+    Для адаптивного метода rel_tol - общий допуск, в профиль записываются
+    оценка погрешности и число вычислений площади (profile['adaptive']).
+    uncertainty - параметры volume_uncertainty (n_samples, radius_sigma,
+    axis_sigma, seed) или None; итог - profile['volume_uncertainty'].
+    """
+    volumes = {}
+    try:
+        calculator = CorrectVolumeCalculator(profile['y'], profile['r'], rel_tol=rel_tol)
+        for method in methods:
+            try:
+                if method == 'adaptive':
+                    adaptive = calculator.method_adaptive()
+                    profile['adaptive'] = {key: adaptive[key]
+                                           for key in ('error', 'evaluations', 'converged')}
+                    volumes[method] = float(adaptive['volume'])
+                    continue
+                volumes[method] = float(calculator.calculate_volume(method))
+            except Exception as e:
+                print(f"Ошибка метода '{method}' для {profile['name']}: {e}")
+                volumes[method] = float('nan')
+    except Exception as e:
+        print(f"Ошибка расчёта объёма {profile['name']}: {e}")
+
+    if uncertainty:
+        try:
+            # Ключ случайных чисел - имя файла: результат не зависит от порядка обработки
+            result = volume_uncertainty([(profile['y'], profile['r'])], methods[0],
+                                        keys=[profile['name']], return_samples=True, **uncertainty)
+            membership = membership_probabilities(result.pop('samples'))
+            profile['volume_uncertainty'] = {key: float(value[0]) for key, value in result.items()}
+            profile['tsetlin_membership'] = {'confidence': float(membership['confidence'][0]),
+                                             'borderline': bool(membership['borderline'][0])}
+        except Exception as e:
+            print(f"Ошибка оценки неопределённости {profile['name']}: {e}")
+
+    profile['volumes'] = volumes
+    # Объём извлечения (диски) в профиле не меняется - он же хранится в кэше
+    volume = volumes.get(methods[0], float('nan'))
+    profile['report_volume'] = volume if np.isfinite(volume) else float(profile['volume'])
+    profile['tsetlin_classification'] = classify_volume(profile['report_volume'])
+    return profile
+
+# ============================================================================
+# ЗАПИСЬ РЕЗУЛЬТАТОВ
+# ============================================================================
+
+UNCERTAINTY_COLUMNS = ('volume_mean_cm3', 'volume_std_cm3', 'volume_low_cm3', 'volume_high_cm3')
+STABILITY_COLUMNS = ('tsetlin_confidence', 'tsetlin_borderline')
+
+
+def scheme_column(scheme):
+    """Столбец группы по дополнительной схеме классификации"""
+    return f'scheme_{scheme.name}'
+
+
+def result_columns(methods, uncertainty=False, schemes=()):
+    """Столбцы выходной таблицы"""
+    adaptive = (['adaptive_error_cm3', 'adaptive_evaluations', 'adaptive_converged']
+                if 'adaptive' in methods else [])
+    adaptive += list(UNCERTAINTY_COLUMNS + STABILITY_COLUMNS) if uncertainty else []
+    return (['file', 'name', 'group', 'status', 'from_cache', 'height_cm', 'max_diameter_cm',
+             'volume_cm3', 'volume_l', 'envelope_cm3', 'capacity_cm3', 'body_cm3']
+            + [f'volume_{method}_cm3' for method in methods]
+            + adaptive
+            + ['tsetlin_group', 'tsetlin_group_name', 'tsetlin_strict', 'tsetlin_mobility',
+               'points', 'profile_points', 'resample_error_cm3', 'reader']
+            + [scheme_column(scheme) for scheme in schemes])
+
+
+def profile_row(file_path, profile, methods, group=None, uncertainty=False, schemes=()):
+    """Строка таблицы для одного файла (профиль может быть None)"""
+    row = dict.fromkeys(result_columns(methods, uncertainty, schemes))
+    row['file'] = file_path
+    row['name'] = os.path.basename(file_path)
+    row['group'] = group
+    if not profile:
+        row['status'] = 'error'
+        return row
+
+    stats = profile.get('extraction_stats', {})
+    tsetlin = profile.get('tsetlin_classification') or {}
+    row.update({
+        'status': 'ok',
+        'from_cache': bool(profile.get('from_cache', False)),
+        'height_cm': float(np.max(profile['y'])),
+        'max_diameter_cm': float(np.max(profile['r']) * 2),
+        'volume_cm3': float(profile.get('report_volume', profile['volume'])),
+        'volume_l': float(profile.get('report_volume', profile['volume'])) / 1000.0,
+        'envelope_cm3': profile.get('volume_envelope'),
+        'capacity_cm3': profile.get('volume_capacity'),
+        'body_cm3': profile.get('volume_body'),
+        'tsetlin_group': tsetlin.get('group'),
+        'tsetlin_group_name': tsetlin.get('group_name'),
+        'tsetlin_strict': tsetlin.get('is_strict_quality'),
+        'tsetlin_mobility': tsetlin.get('mobility_class'),
+        'points': stats.get('points'),
+        'profile_points': len(profile['y']),
+        'resample_error_cm3': (profile.get('resample') or {}).get('volume_error'),
+        'reader': stats.get('reader', 'cache' if profile.get('from_cache') else None),
+    })
+    for method, volume in profile.get('volumes', {}).items():
+        row[f'volume_{method}_cm3'] = volume
+    if 'adaptive' in methods and profile.get('adaptive'):
+        adaptive = profile['adaptive']
+        row['adaptive_error_cm3'] = float(adaptive['error'])
+        row['adaptive_evaluations'] = int(adaptive['evaluations'])
+        row['adaptive_converged'] = bool(adaptive['converged'])
+    if uncertainty and profile.get('volume_uncertainty'):
+        spread = profile['volume_uncertainty']
+        for column in UNCERTAINTY_COLUMNS:
+            row[column] = spread[column[len('volume_'):-len('_cm3')]]
+        membership = profile.get('tsetlin_membership') or {}
+        row['tsetlin_confidence'] = membership.get('confidence')
+        row['tsetlin_borderline'] = membership.get('borderline')
+    return row
+
+
+def add_scheme_columns(rows, schemes):
+    """Группы по дополнительным схемам для порции строк (один вызов на схему)"""
+    if not schemes or not rows:
+        return rows
+    volumes = np.array([row['volume_cm3'] if row['volume_cm3'] is not None else np.nan
+                        for row in rows])
+    for scheme in schemes:
+        column = scheme_column(scheme)
+        for row, label in zip(rows, scheme.labels(volumes)):
+            row[column] = label if row['status'] == 'ok' else None
+    return rows
+
+
+class CsvSink:
+    """Построчная запись CSV с немедленным сбросом на диск"""
+
+    def __init__(self, path, columns):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=columns)
+        self._writer.writeheader()
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink:
+    """Запись Parquet группами строк (требуется pyarrow)"""
+
+    def __init__(self, path, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Для записи Parquet установите pyarrow: pip install pyarrow")
+
+        self._pa = pa
+        self._columns = columns
+        fields = []
+        for column in columns:
+            if column in ('from_cache', 'tsetlin_strict', 'adaptive_converged', 'tsetlin_borderline'):
+                fields.append(pa.field(column, pa.bool_()))
+            elif column in ('points', 'profile_points', 'adaptive_evaluations'):
+                fields.append(pa.field(column, pa.int64()))
+            elif (column in ('height_cm', 'max_diameter_cm', 'volume_l', 'tsetlin_confidence')
+                  or column.endswith('_cm3')):
+                fields.append(pa.field(column, pa.float64()))
+            else:
+                fields.append(pa.field(column, pa.string()))
+        self._schema = pa.schema(fields)
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        if not rows:
+            return
+        data = {column: [row[column] for row in rows] for column in self._columns}
+        self._writer.write_table(self._pa.Table.from_pydict(data, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def open_sink(path, columns, fmt=None):
+    """Выбор формата по явному параметру или расширению файла"""
+    fmt = fmt or ('parquet' if path.lower().endswith(('.parquet', '.pq')) else 'csv')
+    if fmt == 'parquet':
+        return ParquetSink(path, columns)
+    return CsvSink(path, columns)
+
+# ============================================================================
+# ПОИСК ФАЙЛОВ
+# ============================================================================
+
+def expand_inputs(inputs, recursive=True):
+    """Список DXF файлов из каталогов, шаблонов glob и отдельных файлов (без повторов)"""
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                for root, _, names in os.walk(item):
+                    found.extend(os.path.join(root, name) for name in sorted(names)
+                                 if name.lower().endswith('.dxf'))
+            else:
+                found.extend(os.path.join(item, name) for name in sorted(os.listdir(item))
+                             if name.lower().endswith('.dxf'))
+        elif os.path.isfile(item):
+            found.append(item)
+        else:
+            found.extend(path for path in sorted(glob.glob(item, recursive=True))
+                         if os.path.isfile(path) and path.lower().endswith('.dxf'))
+
+    seen = set()
+    files = []
+    for path in found:
+        path = os.path.normpath(os.path.abspath(path))
+        if path not in seen:
+            seen.add(path)
+            files.append(path)
+    return files
+
+# ============================================================================
+# ЗАПУСК
+# ============================================================================
+
+def parse_methods(value):
+    methods = [m.strip() for m in value.split(',') if m.strip()]
+    unknown = [m for m in methods if m not in VOLUME_METHODS]
+    if unknown or not methods:
+        raise argparse.ArgumentTypeError(
+            f"неизвестные методы: {', '.join(unknown) or '-'} (доступны: {', '.join(VOLUME_METHODS)})")
+    return methods
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Пакетный расчёт объёмов сосудов по DXF чертежам (без GUI)")
+    parser.add_argument('inputs', nargs='+',
+                        help="каталоги, шаблоны (например, 'finds/**/*.dxf') или файлы DXF")
+    parser.add_argument('-o', '--output', required=True,
+                        help="файл результатов (.csv или .parquet)")
+    parser.add_argument('--format', choices=('csv', 'parquet'),
+                        help="формат вывода (по умолчанию - по расширению)")
+    parser.add_argument('--methods', type=parse_methods, default=['spline'],
+                        help=f"методы объёма через запятую: {', '.join(VOLUME_METHODS)}")
+    parser.add_argument('-j', '--workers', type=int, default=default_worker_count(),
+                        help="число рабочих процессов")
+    parser.add_argument('--batch-size', type=int, default=25,
+                        help="строк в одной порции записи")
+    parser.add_argument('--no-recursive', action='store_true',
+                        help="не обходить подкаталоги")
+    parser.add_argument('--read-mode', choices=READ_MODES, default='auto',
+                        help="способ чтения DXF")
+    parser.add_argument('--layers',
+                        help="слои профиля через запятую (по умолчанию - все)")
+    parser.add_argument('--wall', choices=PROFILE_WALLS, default='outer',
+                        help="стенка, по которой строится профиль")
+    parser.add_argument('--scale', type=float, default=PROFILE_SCALE,
+                        help="масштаб единиц чертежа в см")
+    parser.add_argument('--resample', choices=RESAMPLE_MODES, default='adaptive',
+                        help="ресэмплинг профиля: по кривизне или равномерный")
+    parser.add_argument('--resample-tolerance', type=float, default=RESAMPLE_TOLERANCE,
+                        help="допуск адаптивного ресэмплинга, см")
+    parser.add_argument('--max-points', type=int, default=RESAMPLE_MAX_POINTS,
+                        help="предел точек адаптивного профиля")
+    parser.add_argument('--points', type=int, default=PROFILE_POINTS,
+                        help="точек равномерного ресэмплинга профиля")
+    parser.add_argument('--rel-tol', type=float, default=ADAPTIVE_REL_TOL,
+                        help="относительный допуск адаптивного метода (общий для всех сосудов)")
+    parser.add_argument('--uncertainty', type=int, default=0, metavar='N',
+                        help="оценить неопределённость объёма по N возмущённым реализациям "
+                             "(Монте-Карло, 0 - не оценивать)")
+    parser.add_argument('--radius-sigma', type=float, default=UNCERTAINTY_RADIUS_SIGMA,
+                        help="ошибка линии чертежа для --uncertainty, см")
+    parser.add_argument('--axis-sigma', type=float, default=UNCERTAINTY_AXIS_SIGMA,
+                        help="ошибка положения оси для --uncertainty, см")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="начальное значение генератора для --uncertainty")
+    parser.add_argument('--chord-tolerance', type=float, default=CHORD_TOLERANCE,
+                        help="допуск аппроксимации дуг и сплайнов, см")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help="файл кэша профилей")
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_MB,
+                        help="лимит размера кэша, МБ")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="не использовать кэш профилей")
+    parser.add_argument('--scheme', action='append', default=[], metavar='FILE',
+                        help="дополнительная схема классификации (JSON/CSV), можно несколько раз")
+    parser.add_argument('--group',
+                        help="группа, в которую записываются сосуды")
+    parser.add_argument('--watch', action='store_true',
+                        help="после обработки отслеживать папки и обрабатывать новые файлы")
+    parser.add_argument('--skip-existing', action='store_true',
+                        help="в режиме --watch не обрабатывать уже лежащие в папках файлы")
+    parser.add_argument('--interval', type=float, default=DEFAULT_POLL_S,
+                        help="период опроса папок, с")
+    parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE_S,
+                        help="сколько секунд файл не должен меняться перед обработкой")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    watchers = []
+    if args.watch:
+        folders = [item for item in args.inputs if os.path.isdir(item)]
+        if not folders:
+            print("Для режима --watch укажите папки", file=sys.stderr)
+            return 1
+
+    files = expand_inputs(args.inputs, recursive=not args.no_recursive)
+    if args.watch and args.skip_existing:
+        files = []
+    elif not files and not args.watch:
+        print("DXF файлы не найдены", file=sys.stderr)
+        return 1
+
+    cache = None
+    if not args.no_cache:
+        try:
+            cache = ProfileCache(path=args.cache, max_bytes=args.cache_mb * 1024 * 1024)
+        except Exception as e:
+            print(f"Кэш профилей недоступен: {e}", file=sys.stderr)
+
+    layers = [layer.strip() for layer in args.layers.split(',')] if args.layers else None
+    schemes = []
+    for path in args.scheme:
+        try:
+            schemes.append(load_scheme(path))
+        except Exception as e:
+            print(f"Схема классификации {path}: {e}", file=sys.stderr)
+            return 1
+
+    uncertainty = None
+    if args.uncertainty > 0:
+        uncertainty = {'n_samples': args.uncertainty, 'radius_sigma': args.radius_sigma,
+                       'axis_sigma': args.axis_sigma, 'seed': args.seed}
+    ingestor = ParallelIngestor(max_workers=max(1, args.workers),
+                                batch_size=args.batch_size,
+                                cache=cache,
+                                extract_options={'read_mode': args.read_mode,
+                                                 'scale': args.scale,
+                                                 'n_points': args.points,
+                                                 'layers': layers,
+                                                 'chord_tolerance': args.chord_tolerance,
+                                                 'wall': args.wall,
+                                                 'resample': args.resample,
+                                                 'resample_tolerance': args.resample_tolerance,
+                                                 'max_points': args.max_points},
+                                analyze=partial(analyze_profile, methods=tuple(args.methods),
+                                                rel_tol=args.rel_tol, uncertainty=uncertainty))
+
+    columns = result_columns(args.methods, bool(uncertainty), schemes)
+    sink = open_sink(args.output, columns, args.format)
+    t_start = time.perf_counter()
+
+    def on_batch(batch):
+        sink.write(add_scheme_columns(
+            [profile_row(file_path, profile, args.methods, args.group, bool(uncertainty), schemes)
+             for file_path, profile in batch], schemes))
+
+    def on_progress(done, total, file_path):
+        print(f"[{done}/{total}] {os.path.basename(file_path)}", file=sys.stderr)
+
+    def on_ready(paths):
+        print(f"Новые или изменённые файлы: {len(paths)}", file=sys.stderr)
+        ingestor.run(paths, on_batch, on_progress)
+
+    try:
+        if args.watch:
+            # Наблюдение начинается до обработки, чтобы не пропустить файлы,
+            # появившиеся за время первого прохода
+            watchers = [FolderWatcher(folder, recursive=not args.no_recursive,
+                                      settle_s=args.settle, cache=cache)
+                        for folder in folders]
+            for watcher in watchers:
+                watcher.poll()
+
+        extracted = ingestor.run(files, on_batch, on_progress) if files else 0
+        elapsed = time.perf_counter() - t_start
+        print(f"Готово: {extracted} из {len(files)} профилей за {elapsed:.1f} с -> {args.output}",
+              file=sys.stderr)
+
+        if args.watch:
+            print(f"Наблюдение за папками: {', '.join(folders)} (Ctrl+C - выход)", file=sys.stderr)
+            watch_loop(watchers, on_ready, interval=args.interval)
+    finally:
+        for watcher in watchers:
+            watcher.close()
+        sink.close()
+        if cache is not None:
+            cache.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1216 @@
+"""dxf_profile.py
+Извлечение профиля сосуда из DXF (без зависимостей от GUI).
+Функции модуля вызываются в дочерних процессах пула обработки,
+поэтому здесь не должно быть импортов tkinter/matplotlib.
+"""
+
+import os
+import time
+from collections import OrderedDict
+import numpy as np
+import ezdxf
+from ezdxf.filemanagement import dxf_file_info
+from ezdxf.lldxf.tagger import ascii_tags_loader, tag_compiler
+from scipy.interpolate import interp1d
+from scipy.integrate import trapezoid
+
+from volume_calc import CorrectVolumeCalculator, calculate_wall_volumes
+
+# ============================================================================
+# ПАРАМЕТРЫ ИЗВЛЕЧЕНИЯ
+# ============================================================================
+
+PROFILE_SCALE = 0.1        # Единицы чертежа (мм) -> см
+PROFILE_POINTS = 200       # Количество точек равномерного ресэмплинга профиля
+EXTRACTOR_VERSION = 7      # Увеличивать при изменении алгоритма (сбрасывает кэш)
+
+# Режимы чтения DXF: 'full' - весь документ через ezdxf.readfile,
+# 'stream' - однопроходное чтение modelspace без построения документа,
+# 'auto' - потоковое чтение для файлов от STREAMING_AUTO_BYTES
+READ_MODES = ('auto', 'full', 'stream')
+STREAMING_AUTO_BYTES = 64 * 1024 * 1024
+# Допустимое отклонение хорды от дуг и сплайнов, см (см. flatten_tolerance)
+CHORD_TOLERANCE = 0.01
+# Ресэмплинг профиля: 'adaptive' - точки по кривизне с допуском RESAMPLE_TOLERANCE
+# (не больше RESAMPLE_MAX_POINTS), 'uniform' - n_points на равномерной сетке высот
+RESAMPLE_MODES = ('adaptive', 'uniform')
+RESAMPLE_TOLERANCE = 0.01
+RESAMPLE_MAX_POINTS = 1000
+
+
+def extraction_params(scale=PROFILE_SCALE, n_points=PROFILE_POINTS, layers=None, region=None,
+                      chord_tolerance=CHORD_TOLERANCE, wall='outer', resample='adaptive',
+                      resample_tolerance=RESAMPLE_TOLERANCE, max_points=RESAMPLE_MAX_POINTS):
+    """Параметры, от которых зависит результат извлечения (для ключа кэша)"""
+    return {
+        'version': EXTRACTOR_VERSION,
+        'scale': scale,
+        'n_points': n_points,
+        'resample': resample,
+        'resample_tolerance': resample_tolerance,
+        'max_points': max_points,
+        'chord_tolerance': chord_tolerance,
+        'wall': wall,
+        'layers': normalize_layers(layers),
+        'region': normalize_region(region),
+    }
+
+# ============================================================================
+# АППРОКСИМАЦИЯ КРИВЫХ
+# ============================================================================
+
+# Ограничение числа сегментов на одну кривую
+CURVE_MAX_SEGMENTS = 2048
+# Плотная сетка параметра для эллипсов и сплайнов перед адаптивным прореживанием
+CURVE_DENSE_SAMPLES = 4096
+
+
+def flatten_tolerance(scale=PROFILE_SCALE, chord_tolerance=CHORD_TOLERANCE):
+    """Допуск хорды в единицах чертежа для заданного масштаба профиля"""
+    return chord_tolerance / scale
+
+
+def arc_points(center, radius, start_angle, end_angle, tolerance, extrusion_z=1.0):
+    """
+    Дуга окружности ломаной с постоянным шагом угла.
+    Число сегментов выбирается так, чтобы стрелка прогиба хорды
+    r * (1 - cos(dφ/2)) не превышала tolerance.
+    Углы в градусах в OCS; при выдавливании (0, 0, -1) ось X зеркальна.
+    """
+    sweep = np.radians((end_angle - start_angle) % 360.0 or 360.0)
+    if radius <= 0:
+        return np.empty((0, 2), dtype=np.float64)
+
+    if tolerance < radius:
+        step = 2.0 * np.arccos(1.0 - tolerance / radius)
+        segments = int(np.clip(np.ceil(sweep / step), 1, CURVE_MAX_SEGMENTS))
+    else:
+        segments = 1
+
+    phi = np.radians(start_angle) + np.linspace(0.0, sweep, segments + 1)
+    xy = np.column_stack((center[0] + radius * np.cos(phi),
+                          center[1] + radius * np.sin(phi)))
+    if extrusion_z < 0:
+        xy[:, 0] = -xy[:, 0]
+    return xy
+
+
+def adaptive_polyline(dense, tolerance):
+    """
+    Прореживание плотной ломаной по кривизне.
+    Для сегмента длины L при кривизне k стрелка прогиба ≈ k·L²/8,
+    поэтому допустимая длина sqrt(8·tolerance / k): на крутых участках
+    точки остаются часто, на прямых - редко.
+    """
+    if len(dense) < 3:
+        return dense
+
+    d = np.diff(dense, axis=0)
+    seg = np.hypot(d[:, 0], d[:, 1])
+
+    # Кривизна в вершинах: угол поворота / средняя длина соседних сегментов
+    cross = d[:-1, 0] * d[1:, 1] - d[:-1, 1] * d[1:, 0]
+    dot = np.einsum('ij,ij->i', d[:-1], d[1:])
+    turn = np.abs(np.arctan2(cross, dot))
+    span = 0.5 * (seg[:-1] + seg[1:])
+    k_vertex = np.divide(turn, span, out=np.zeros_like(turn), where=span > 0)
+
+    # Кривизна сегмента - наибольшая на его концах
+    k_seg = np.empty(len(seg))
+    k_seg[0] = k_vertex[0]
+    k_seg[-1] = k_vertex[-1]
+    k_seg[1:-1] = np.maximum(k_vertex[:-1], k_vertex[1:])
+
+    allowed = np.sqrt(8.0 * tolerance / np.maximum(k_seg, 1e-300))
+    cost = np.concatenate(([0.0], np.cumsum(seg / allowed)))
+
+    segments = int(np.clip(np.ceil(cost[-1]), 1, CURVE_MAX_SEGMENTS))
+    idx = np.searchsorted(cost, np.linspace(0.0, cost[-1], segments + 1), side='left')
+    idx[0], idx[-1] = 0, len(dense) - 1
+    return dense[np.unique(idx)]
+
+
+def ellipse_points(center, major_axis, ratio, start_param, end_param, tolerance,
+                   extrusion_z=1.0):
+    """Эллипс (дуга эллипса) в WCS с адаптивной плотностью точек"""
+    sweep = (end_param - start_param) % (2.0 * np.pi)
+    if sweep <= 1e-12:
+        sweep = 2.0 * np.pi
+
+    major = np.asarray(major_axis[:2], dtype=np.float64)
+    # Малая полуось: extrusion × major_axis · ratio
+    minor = np.array((-major[1], major[0])) * ratio * (1.0 if extrusion_z >= 0 else -1.0)
+
+    t = start_param + np.linspace(0.0, sweep, CURVE_DENSE_SAMPLES)
+    dense = (np.asarray(center[:2], dtype=np.float64)
+             + np.outer(np.cos(t), major) + np.outer(np.sin(t), minor))
+    return adaptive_polyline(dense, tolerance)
+
+
+def spline_points(degree, knots, control_points, weights, fit_points, tolerance,
+                  tangents=None):
+    """
+    B-сплайн (в том числе рациональный) с адаптивной плотностью точек.
+    Вычисление векторизовано через scipy BSpline; для сплайна, заданного только
+    определяющими точками, контрольные точки строятся как в CAD (ezdxf).
+    """
+    control_points = np.asarray(control_points, dtype=np.float64).reshape(-1, 2)
+
+    if len(control_points) == 0:
+        if len(fit_points) < 2:
+            return np.empty((0, 2), dtype=np.float64)
+        from ezdxf.math import fit_points_to_cad_cv
+        curve = fit_points_to_cad_cv(fit_points, tangents=tangents)
+        control_points = np.array([(p.x, p.y) for p in curve.control_points])
+        knots = list(curve.knots())
+        weights = list(curve.weights())
+        degree = curve.degree
+
+    n = len(control_points)
+    degree = int(min(degree, n - 1))
+    knots = np.asarray(knots, dtype=np.float64)
+    if degree < 1 or len(knots) != n + degree + 1:
+        # Некорректные узлы - используем контрольную ломаную
+        return control_points
+
+    from scipy.interpolate import BSpline
+    t = np.linspace(knots[degree], knots[n], CURVE_DENSE_SAMPLES)
+    if len(weights) == n and not np.allclose(weights, 1.0):
+        w = np.asarray(weights, dtype=np.float64)
+        homogeneous = BSpline(knots, np.column_stack((control_points * w[:, None], w)), degree)(t)
+        dense = homogeneous[:, :2] / homogeneous[:, 2:3]
+    else:
+        dense = BSpline(knots, control_points, degree)(t)
+    return adaptive_polyline(dense, tolerance)
+
+
+def flatten_curve(dxftype, data, tolerance):
+    """
+    Ломаная (N, 2) для кривой по её параметрам.
+    data - словарь параметров DXF (см. _curve_data и _curve_data_from_tags).
+    """
+    if dxftype == 'ARC':
+        return arc_points(data['center'], data['radius'], data['start_angle'],
+                          data['end_angle'], tolerance, data['extrusion_z'])
+    if dxftype == 'CIRCLE':
+        return arc_points(data['center'], data['radius'], 0.0, 360.0,
+                          tolerance, data['extrusion_z'])
+    if dxftype == 'ELLIPSE':
+        return ellipse_points(data['center'], data['major_axis'], data['ratio'],
+                              data['start_param'], data['end_param'], tolerance,
+                              data['extrusion_z'])
+    if dxftype == 'SPLINE':
+        return spline_points(data['degree'], data['knots'], data['control_points'],
+                             data['weights'], data['fit_points'], tolerance,
+                             data.get('tangents'))
+    return np.empty((0, 2), dtype=np.float64)
+
+
+def _curve_data(entity):
+    """Параметры кривой из примитива ezdxf"""
+    dxf = entity.dxf
+    dxftype = entity.dxftype()
+    if dxftype == 'SPLINE':
+        return {
+            'degree': dxf.degree,
+            'knots': list(entity.knots),
+            'control_points': [(p[0], p[1]) for p in entity.control_points],
+            'weights': list(entity.weights),
+            'fit_points': [(p[0], p[1]) for p in entity.fit_points],
+            'tangents': ([dxf.start_tangent, dxf.end_tangent]
+                         if dxf.hasattr('start_tangent') and dxf.hasattr('end_tangent') else None),
+        }
+
+    data = {'center': (dxf.center.x, dxf.center.y), 'extrusion_z': dxf.extrusion.z}
+    if dxftype in ('ARC', 'CIRCLE'):
+        data['radius'] = dxf.radius
+        if dxftype == 'ARC':
+            data['start_angle'] = dxf.start_angle
+            data['end_angle'] = dxf.end_angle
+    else:
+        data['major_axis'] = (dxf.major_axis.x, dxf.major_axis.y)
+        data['ratio'] = dxf.ratio
+        data['start_param'] = dxf.start_param
+        data['end_param'] = dxf.end_param
+    return data
+
+
+def _curve_data_from_tags(dxftype, tags):
+    """Параметры кривой из DXF-тегов потокового чтения: tags - {код: [значения]}"""
+    def first(code, default):
+        values = tags.get(code)
+        return values[0] if values else default
+
+    if dxftype == 'SPLINE':
+        return {
+            'degree': int(first(71, 3)),
+            'knots': tags.get(40, []),
+            'control_points': [(p[0], p[1]) for p in tags.get(10, [])],
+            'weights': tags.get(41, []),
+            'fit_points': [(p[0], p[1]) for p in tags.get(11, [])],
+            'tangents': [first(12, None), first(13, None)] if 12 in tags and 13 in tags else None,
+        }
+
+    center = first(10, (0.0, 0.0, 0.0))
+    data = {'center': (center[0], center[1]), 'extrusion_z': first(210, (0.0, 0.0, 1.0))[2]}
+    if dxftype in ('ARC', 'CIRCLE'):
+        data['radius'] = float(first(40, 0.0))
+        data['start_angle'] = float(first(50, 0.0))
+        data['end_angle'] = float(first(51, 360.0))
+    else:
+        major = first(11, (1.0, 0.0, 0.0))
+        data['major_axis'] = (major[0], major[1])
+        data['ratio'] = float(first(40, 1.0))
+        data['start_param'] = float(first(41, 0.0))
+        data['end_param'] = float(first(42, 2.0 * np.pi))
+    return data
+
+
+# ============================================================================
+# СБОР ГЕОМЕТРИИ
+# ============================================================================
+
+# Типы примитивов, из которых собирается профиль
+CURVE_ENTITY_TYPES = ('ARC', 'CIRCLE', 'ELLIPSE', 'SPLINE')
+PROFILE_ENTITY_TYPES = ('LINE', 'LWPOLYLINE', 'POLYLINE') + CURVE_ENTITY_TYPES
+
+# Размер записи вершины LWPOLYLINE во внутреннем массиве ezdxf (x, y, ширины, bulge)
+_LWPOINT_SIZE = 5
+
+
+def _close_ring(xy, closed):
+    """Для замкнутой полилинии повторяет первую вершину в конце"""
+    if closed and len(xy) > 2:
+        return np.concatenate((xy, xy[:1]))
+    return xy
+
+
+def _lwpolyline_xy(entity):
+    """Координаты вершин LWPOLYLINE одним массивом (без поточечного обхода)"""
+    try:
+        flat = np.frombuffer(entity.lwpoints.values, dtype=np.float64)
+        xy = flat.reshape(-1, _LWPOINT_SIZE)[:, :2]
+    except Exception:
+        xy = np.asarray(entity.get_points('xy'), dtype=np.float64).reshape(-1, 2)
+    return _close_ring(xy, entity.closed)
+
+
+def _polyline_xy(entity):
+    """Координаты вершин POLYLINE"""
+    xy = np.asarray([(v.x, v.y) for v in entity.points()], dtype=np.float64).reshape(-1, 2)
+    return _close_ring(xy, entity.is_closed)
+
+
+def _curve_xy(entity, tolerance):
+    """Ломаная для ARC/CIRCLE/ELLIPSE/SPLINE"""
+    return flatten_curve(entity.dxftype(), _curve_data(entity), tolerance)
+
+
+def collect_profile_points(entities, tolerance=None):
+    """
+    Сбор координат профиля в заранее выделенный массив (N, 2).
+    Порядок точек совпадает с порядком примитивов в чертеже.
+
+    entities: примитивы PROFILE_ENTITY_TYPES (другие типы пропускаются)
+    tolerance: допуск хорды для кривых в единицах чертежа
+    Возвращает (points, offsets, entity_counts): точки примитива i -
+    points[offsets[i]:offsets[i + 1]].
+    """
+    if tolerance is None:
+        tolerance = flatten_tolerance()
+    entity_counts = dict.fromkeys(PROFILE_ENTITY_TYPES, 0)
+
+    # Первый проход: отбор примитивов и число точек без извлечения координат
+    # (кривые аппроксимируются сразу - число их точек зависит от кривизны)
+    selected = []
+    sizes = []
+    for entity in entities:
+        dxftype = entity.dxftype()
+        if dxftype == 'LINE':
+            size = 2
+        elif dxftype == 'LWPOLYLINE':
+            size = len(entity)
+            size += entity.closed and size > 2
+        elif dxftype == 'POLYLINE':
+            size = len(entity.vertices)
+            size += entity.is_closed and size > 2
+        elif dxftype in CURVE_ENTITY_TYPES:
+            try:
+                entity = _curve_xy(entity, tolerance)
+            except Exception:
+                continue
+            size = len(entity)
+        else:
+            continue
+        selected.append((dxftype, entity))
+        sizes.append(size)
+        entity_counts[dxftype] += 1
+
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    points = np.empty((int(offsets[-1]), 2), dtype=np.float64)
+
+    # Отрезки: начала и концы записываются пачкой по вычисленным индексам
+    line_idx = [i for i, (dxftype, _) in enumerate(selected) if dxftype == 'LINE']
+    if line_idx:
+        coords = np.array([(e.dxf.start.x, e.dxf.start.y, e.dxf.end.x, e.dxf.end.y)
+                           for e in (selected[i][1] for i in line_idx)], dtype=np.float64)
+        line_offsets = offsets[line_idx]
+        points[line_offsets] = coords[:, :2]
+        points[line_offsets + 1] = coords[:, 2:]
+
+    # Полилинии и аппроксимированные кривые: вершины копируются блоками
+    keep = None
+    for i, (dxftype, entity) in enumerate(selected):
+        if dxftype == 'LINE':
+            continue
+        start, stop = offsets[i], offsets[i + 1]
+        try:
+            if dxftype == 'LWPOLYLINE':
+                points[start:stop] = _lwpolyline_xy(entity)
+            elif dxftype == 'POLYLINE':
+                points[start:stop] = _polyline_xy(entity)
+            else:
+                points[start:stop] = entity
+        except Exception:
+            if keep is None:
+                keep = np.ones(len(points), dtype=bool)
+            keep[start:stop] = False
+            sizes[i] = 0
+
+    if keep is not None:
+        points = points[keep]
+        np.cumsum(sizes, out=offsets[1:])
+
+    return points, offsets, entity_counts
+
+
+class _PointBuffer:
+    """Растущий буфер точек (N, 2) с удвоением ёмкости"""
+
+    def __init__(self, capacity=4096):
+        self.data = np.empty((capacity, 2), dtype=np.float64)
+        self.size = 0
+
+    def extend(self, xy):
+        n = len(xy)
+        if self.size + n > len(self.data):
+            capacity = max(len(self.data) * 2, self.size + n)
+            grown = np.empty((capacity, 2), dtype=np.float64)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:self.size + n] = xy
+        self.size += n
+
+    def array(self):
+        return self.data[:self.size].copy()
+
+
+def iter_modelspace_streaming(file_path, types=PROFILE_ENTITY_TYPES, tolerance=None):
+    """
+    Однопроходное чтение геометрии modelspace на уровне DXF-тегов.
+    Документ (блоки, макеты, тексты) не строится и не индексируется,
+    в памяти только текущий примитив.
+
+    Выдаёт кортежи (dxftype, layer, xy), где xy - массив (N, 2).
+    Для POLYLINE координаты собираются из последующих VERTEX до SEQEND,
+    кривые аппроксимируются ломаной с допуском tolerance (единицы чертежа).
+    """
+    if tolerance is None:
+        tolerance = flatten_tolerance()
+    types = set(types)
+    info = dxf_file_info(file_path)
+
+    with open(file_path, 'rt', encoding=info.encoding, errors='surrogateescape') as stream:
+        in_entities = False
+        prev_tag = None
+        current = None      # [dxftype, layer, points, paperspace, теги кривой, замкнута]
+        polyline = None     # POLYLINE, ожидающая VERTEX/SEQEND
+
+        for tag in tag_compiler(ascii_tags_loader(stream)):
+            code, value = tag.code, tag.value
+
+            if not in_entities:
+                if code == 2 and value == 'ENTITIES' and prev_tag == (0, 'SECTION'):
+                    in_entities = True
+                prev_tag = (code, value)
+                continue
+
+            if code != 0:
+                if current is not None:
+                    if code == 8:
+                        current[1] = value
+                    elif code == 67:
+                        current[3] = value == 1
+                    elif current[4] is not None:
+                        current[4].setdefault(code, []).append(value)
+                    elif code in (10, 11):
+                        current[2].append(value[:2])
+                    elif code == 70:
+                        current[5] = bool(value & 1)
+                continue
+
+            # Тег 0 завершает предыдущий примитив
+            record = None
+            if current is not None:
+                dxftype, layer, pts, paperspace, curve_tags, closed = current
+                if curve_tags is not None:
+                    if not paperspace:
+                        try:
+                            xy = flatten_curve(dxftype, _curve_data_from_tags(dxftype, curve_tags),
+                                               tolerance)
+                        except Exception:
+                            xy = None
+                        if xy is not None and len(xy):
+                            record = (dxftype, layer, xy, False)
+                elif dxftype == 'VERTEX':
+                    if polyline is not None and pts:
+                        polyline[2].append(pts[0])
+                elif dxftype == 'SEQEND':
+                    if polyline is not None and not polyline[3] and polyline[2]:
+                        record = ('POLYLINE', polyline[1], polyline[2], polyline[5])
+                    polyline = None
+                elif dxftype == 'POLYLINE':
+                    # Точка заголовка POLYLINE служебная, вершины придут в VERTEX
+                    polyline = [dxftype, layer, [], paperspace, None, closed]
+                elif not paperspace and pts:
+                    record = (dxftype, layer, pts, closed and dxftype == 'LWPOLYLINE')
+
+            if record is not None:
+                dxftype, layer, pts, closed = record
+                yield dxftype, layer, _close_ring(np.asarray(pts, dtype=np.float64).reshape(-1, 2),
+                                                  closed)
+
+            if value == 'ENDSEC':
+                return
+            if value in types or (polyline is not None and value in ('VERTEX', 'SEQEND')):
+                current = [value, '0', [], False, {} if value in CURVE_ENTITY_TYPES else None, False]
+            else:
+                current = None
+
+
+def stream_profile_points(records):
+    """
+    Сбор координат профиля за один проход по записям iter_modelspace_streaming.
+    Записи не удерживаются в памяти - координаты сразу копируются в буфер.
+    """
+    entity_counts = dict.fromkeys(PROFILE_ENTITY_TYPES, 0)
+    buffer = _PointBuffer()
+    offsets = [0]
+
+    for dxftype, layer, xy in records:
+        if dxftype not in entity_counts:
+            continue
+        buffer.extend(xy)
+        offsets.append(buffer.size)
+        entity_counts[dxftype] += 1
+
+    return buffer.array(), np.asarray(offsets, dtype=np.int64), entity_counts
+
+
+def use_streaming(file_path, read_mode='auto'):
+    """Нужно ли читать файл потоково при заданном режиме"""
+    if read_mode == 'stream':
+        return True
+    if read_mode == 'auto':
+        try:
+            return os.path.getsize(file_path) >= STREAMING_AUTO_BYTES
+        except OSError:
+            return False
+    return False
+
+
+def read_profile_points(file_path, read_mode='auto', tolerance=None):
+    """
+    Чтение точек профиля из DXF выбранным способом.
+    Возвращает (points, offsets, entity_counts, reader, read_s), где read_s -
+    время построения документа (для потокового чтения входит в сбор точек).
+    """
+    if use_streaming(file_path, read_mode):
+        try:
+            points, offsets, entity_counts = stream_profile_points(
+                iter_modelspace_streaming(file_path, tolerance=tolerance))
+            return points, offsets, entity_counts, 'stream', 0.0
+        except Exception as e:
+            # Например, двоичный DXF - читаем обычным способом
+            print(f"Потоковое чтение {os.path.basename(file_path)} невозможно ({e}), "
+                  f"используется полное чтение")
+
+    t_start = time.perf_counter()
+    doc = ezdxf.readfile(file_path)
+    msp = doc.modelspace()
+    read_s = time.perf_counter() - t_start
+
+    points, offsets, entity_counts = collect_profile_points(
+        msp.query(' '.join(PROFILE_ENTITY_TYPES)), tolerance)
+    return points, offsets, entity_counts, 'full', read_s
+
+
+# ============================================================================
+# ИНДЕКС ПРИМИТИВОВ (СЛОИ И ГАБАРИТЫ)
+# ============================================================================
+
+_INDEX_CACHE_SIZE = 16
+_index_cache = OrderedDict()
+
+
+def normalize_layers(layers):
+    """Список слоёв для фильтра (имена слоёв DXF регистронезависимы)"""
+    if not layers:
+        return None
+    return sorted({str(layer).strip().upper() for layer in layers if str(layer).strip()}) or None
+
+
+def normalize_region(region):
+    """Область интереса (xmin, ymin, xmax, ymax) в единицах чертежа"""
+    if not region:
+        return None
+    x0, y0, x1, y1 = (float(v) for v in region)
+    return (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+
+def _iter_document_records(msp, tolerance=None):
+    """Записи (dxftype, layer, xy) из построенного документа ezdxf"""
+    if tolerance is None:
+        tolerance = flatten_tolerance()
+    for entity in msp.query(' '.join(PROFILE_ENTITY_TYPES)):
+        dxftype = entity.dxftype()
+        try:
+            if dxftype == 'LINE':
+                start, end = entity.dxf.start, entity.dxf.end
+                xy = np.array(((start.x, start.y), (end.x, end.y)), dtype=np.float64)
+            elif dxftype == 'LWPOLYLINE':
+                xy = _lwpolyline_xy(entity)
+            elif dxftype == 'POLYLINE':
+                xy = _polyline_xy(entity)
+            else:
+                xy = _curve_xy(entity, tolerance)
+        except Exception:
+            continue
+        if len(xy):
+            yield dxftype, entity.dxf.layer, xy
+
+
+class EntityIndex:
+    """
+    Индекс примитивов одного DXF файла: координаты всех точек в порядке
+    чертежа, слой и габаритный прямоугольник каждого примитива.
+    Выборка по слоям и области интереса выполняется по индексу,
+    без повторного чтения файла.
+    """
+
+    def __init__(self, points, offsets, type_ids, layer_ids, layers, reader='full'):
+        self.points = points
+        self.offsets = offsets
+        self.type_ids = type_ids
+        self.layer_ids = layer_ids
+        self.layers = layers
+        self.reader = reader
+        self.sizes = np.diff(offsets)
+
+        # Габариты примитивов: (xmin, ymin, xmax, ymax)
+        n = len(self.sizes)
+        self.bbox = np.empty((n, 4), dtype=np.float64)
+        if n:
+            starts = offsets[:-1]
+            self.bbox[:, 0] = np.minimum.reduceat(points[:, 0], starts)
+            self.bbox[:, 1] = np.minimum.reduceat(points[:, 1], starts)
+            self.bbox[:, 2] = np.maximum.reduceat(points[:, 0], starts)
+            self.bbox[:, 3] = np.maximum.reduceat(points[:, 1], starts)
+
+        # Примитивы, упорядоченные по xmin - для отсечения по области бинарным поиском
+        self._order = np.argsort(self.bbox[:, 0], kind='stable')
+        self._xmin_sorted = self.bbox[self._order, 0]
+
+    @classmethod
+    def from_records(cls, records, reader='full'):
+        buffer = _PointBuffer()
+        sizes = []
+        type_ids = []
+        layer_ids = []
+        layers = []
+        layer_lookup = {}
+
+        for dxftype, layer, xy in records:
+            if dxftype not in PROFILE_ENTITY_TYPES or not len(xy):
+                continue
+            key = layer.upper()
+            if key not in layer_lookup:
+                layer_lookup[key] = len(layers)
+                layers.append(layer)
+            buffer.extend(xy)
+            sizes.append(len(xy))
+            type_ids.append(PROFILE_ENTITY_TYPES.index(dxftype))
+            layer_ids.append(layer_lookup[key])
+
+        offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        return cls(buffer.array(), offsets,
+                   np.asarray(type_ids, dtype=np.int8),
+                   np.asarray(layer_ids, dtype=np.int32),
+                   layers, reader)
+
+    def layer_counts(self):
+        """Количество примитивов профиля на каждом слое"""
+        counts = np.bincount(self.layer_ids, minlength=len(self.layers))
+        return dict(zip(self.layers, counts.tolist()))
+
+    def bounds(self):
+        """Габариты всей геометрии (xmin, ymin, xmax, ymax)"""
+        if not len(self.points):
+            return None
+        return (*self.points.min(axis=0), *self.points.max(axis=0))
+
+    def select(self, layers=None, region=None):
+        """
+        Точки примитивов с заданных слоёв, целиком лежащих в области.
+        Возвращает (points, offsets, entity_counts) в порядке чертежа.
+        """
+        mask = np.ones(len(self.sizes), dtype=bool)
+
+        layers = normalize_layers(layers)
+        if layers:
+            wanted = [i for i, name in enumerate(self.layers) if name.upper() in layers]
+            mask &= np.isin(self.layer_ids, wanted)
+
+        region = normalize_region(region)
+        if region:
+            x0, y0, x1, y1 = region
+            # Кандидаты: xmin в [x0, x1] - диапазон в отсортированном порядке
+            lo = np.searchsorted(self._xmin_sorted, x0, side='left')
+            hi = np.searchsorted(self._xmin_sorted, x1, side='right')
+            candidates = self._order[lo:hi]
+            box = self.bbox[candidates]
+            inside = (box[:, 1] >= y0) & (box[:, 2] <= x1) & (box[:, 3] <= y1)
+            in_region = np.zeros(len(self.sizes), dtype=bool)
+            in_region[candidates[inside]] = True
+            mask &= in_region
+
+        counts = np.bincount(self.type_ids[mask], minlength=len(PROFILE_ENTITY_TYPES))
+        entity_counts = dict(zip(PROFILE_ENTITY_TYPES, counts.tolist()))
+        offsets = np.zeros(int(mask.sum()) + 1, dtype=np.int64)
+        np.cumsum(self.sizes[mask], out=offsets[1:])
+        return self.points[np.repeat(mask, self.sizes)], offsets, entity_counts
+
+
+def build_entity_index(file_path, read_mode='auto', tolerance=None):
+    """Построение индекса примитивов файла (один проход чтения)"""
+    if use_streaming(file_path, read_mode):
+        try:
+            return EntityIndex.from_records(
+                iter_modelspace_streaming(file_path, tolerance=tolerance), 'stream')
+        except Exception as e:
+            print(f"Потоковое чтение {os.path.basename(file_path)} невозможно ({e}), "
+                  f"используется полное чтение")
+
+    doc = ezdxf.readfile(file_path)
+    return EntityIndex.from_records(_iter_document_records(doc.modelspace(), tolerance), 'full')
+
+
+def get_entity_index(file_path, read_mode='auto', tolerance=None):
+    """
+    Индекс примитивов из кэша процесса (LRU) или построенный заново.
+    Запись действительна, пока не изменились размер и mtime файла.
+    """
+    if tolerance is None:
+        tolerance = flatten_tolerance()
+    st = os.stat(file_path)
+    key = (os.path.abspath(file_path), st.st_size, st.st_mtime_ns, tolerance)
+
+    index = _index_cache.get(key)
+    if index is not None:
+        _index_cache.move_to_end(key)
+        return index
+
+    index = build_entity_index(file_path, read_mode, tolerance)
+    _index_cache[key] = index
+    while len(_index_cache) > _INDEX_CACHE_SIZE:
+        _index_cache.popitem(last=False)
+    return index
+
+
+# ============================================================================
+# СБОРКА КОНТУРА
+# ============================================================================
+
+# Концы примитивов ближе CHAIN_SNAP (см) считаются одной вершиной
+CHAIN_SNAP = 0.005
+# Больше монотонных участков - контур не собран, используется облако точек
+MAX_WALL_PIECES = 512
+# Стенка, по которой строится профиль
+PROFILE_WALLS = ('outer', 'inner')
+
+
+def _merge_endpoint_nodes(endpoints, snap):
+    """
+    Номера вершин для концов примитивов.
+    Концы округляются до сетки snap и группируются по хэшу ячейки;
+    висячие концы дополнительно ищутся в соседних ячейках, чтобы
+    совпадающие точки на границе ячеек не распались на две вершины.
+    """
+    keys = np.round(endpoints / snap).astype(np.int64)
+    cells, node_of = np.unique(keys, axis=0, return_inverse=True)
+    node_of = node_of.reshape(-1)
+    degree = np.bincount(node_of, minlength=len(cells))
+
+    dangling = np.flatnonzero(degree == 1)
+    if len(dangling) == 0:
+        return node_of
+
+    index = {(int(cx), int(cy)): i for i, (cx, cy) in enumerate(cells)}
+    first_endpoint = np.empty(len(cells), dtype=np.int64)
+    first_endpoint[node_of[::-1]] = np.arange(len(node_of))[::-1]
+
+    parent = list(range(len(cells)))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for node in dangling:
+        cx, cy = cells[node]
+        xy = endpoints[first_endpoint[node]]
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                other = index.get((int(cx) + dx, int(cy) + dy))
+                if other is None or other == node:
+                    continue
+                if np.all(np.abs(endpoints[first_endpoint[other]] - xy) <= snap):
+                    root_a, root_b = find(node), find(other)
+                    if root_a != root_b:
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    roots = np.array([find(node) for node in range(len(cells))])
+    # Перенумерация без пропусков
+    _, roots = np.unique(roots, return_inverse=True)
+    return roots.reshape(-1)[node_of]
+
+
+def chain_polylines(points, offsets, snap):
+    """
+    Сборка примитивов в упорядоченные ломаные по совпадающим концам.
+    Цепочка продолжается через вершины, где сходятся ровно два примитива,
+    и обрывается на свободных концах и разветвлениях.
+    Возвращает список массивов (N, 2).
+    """
+    sizes = np.diff(offsets)
+    valid = np.flatnonzero(sizes >= 2)
+    if len(valid) == 0:
+        return []
+
+    starts = offsets[valid]
+    stops = offsets[valid + 1]
+    endpoints = np.concatenate((points[starts], points[stops - 1]))
+    nodes = _merge_endpoint_nodes(endpoints, snap)
+    m = len(valid)
+    head, tail = nodes[:m], nodes[m:]
+
+    # Инцидентность вершина -> примитивы (CSR)
+    incident = np.concatenate((np.arange(m), np.arange(m)))
+    order = np.argsort(np.concatenate((head, tail)), kind='stable')
+    node_sorted = np.concatenate((head, tail))[order]
+    n_nodes = int(nodes.max()) + 1
+    node_start = np.searchsorted(node_sorted, np.arange(n_nodes + 1))
+    incident = incident[order]
+    degree = np.diff(node_start)
+
+    used = np.zeros(m, dtype=bool)
+
+    def piece_points(piece, from_node):
+        xy = points[starts[piece]:stops[piece]]
+        return xy if head[piece] == from_node else xy[::-1]
+
+    def next_piece(node):
+        for piece in incident[node_start[node]:node_start[node + 1]]:
+            if not used[piece]:
+                return piece
+        return None
+
+    def walk(node, piece):
+        parts = []
+        while piece is not None:
+            used[piece] = True
+            xy = piece_points(piece, node)
+            parts.append(xy if not parts else xy[1:])
+            node = tail[piece] if head[piece] == node else head[piece]
+            if degree[node] != 2:
+                break
+            piece = next_piece(node)
+        return np.concatenate(parts)
+
+    chains = []
+    # Сначала открытые цепочки - от свободных концов и разветвлений
+    for node in np.flatnonzero(degree != 2):
+        piece = next_piece(node)
+        while piece is not None:
+            chains.append(walk(node, piece))
+            piece = next_piece(node)
+    # Оставшиеся примитивы образуют замкнутые контуры
+    for piece in range(m):
+        if not used[piece]:
+            chains.append(walk(head[piece], piece))
+    return chains
+
+
+def monotone_pieces(chain, eps=1e-9):
+    """
+    Разбиение ломаной на участки, монотонные по высоте.
+    Возвращает список (ys, xs, horizontal) с ys по возрастанию.
+    """
+    if len(chain) < 2:
+        return []
+    dy = np.diff(chain[:, 1])
+    direction = np.where(np.abs(dy) <= eps, 0, np.sign(dy)).astype(np.int8)
+    bounds = np.concatenate(([0], np.flatnonzero(direction[1:] != direction[:-1]) + 1,
+                             [len(direction)]))
+
+    pieces = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        xy = chain[start:stop + 1]
+        if direction[start] < 0:
+            xy = xy[::-1]
+        pieces.append((xy[:, 1], xy[:, 0], direction[start] == 0))
+    return pieces
+
+
+def wall_radii(pieces, heights, snap=CHAIN_SNAP):
+    """
+    Радиусы наружной и внутренней стенки на заданных высотах.
+    Наружная - наибольшее пересечение горизонтали с контуром, внутренняя -
+    ближайшее к ней изнутри (кроме линии оси). Возвращает (outer, inner),
+    где inner = NaN на высотах без внутренней стенки.
+    """
+    radii = np.full((len(pieces), len(heights)), -np.inf)
+    on_axis = np.zeros(len(pieces), dtype=bool)
+
+    for i, (ys, xs, horizontal) in enumerate(pieces):
+        on_axis[i] = np.max(np.abs(xs)) <= snap
+        if horizontal:
+            mask = np.abs(heights - ys[0]) <= 1e-9
+            radii[i, mask] = np.max(xs)
+        else:
+            lo = np.searchsorted(heights, ys[0] - 1e-9, side='left')
+            hi = np.searchsorted(heights, ys[-1] + 1e-9, side='right')
+            radii[i, lo:hi] = np.interp(heights[lo:hi], ys, xs)
+
+    outer = radii.max(axis=0)
+
+    radii[on_axis] = -np.inf
+    radii[radii >= outer - snap] = -np.inf
+    inner = radii.max(axis=0)
+    inner[~np.isfinite(inner)] = np.nan
+    return outer, inner
+
+
+def profile_walls(points, offsets, snap=CHAIN_SNAP):
+    """
+    Профиль стенок из геометрии примитивов (координаты в см от оси и дна).
+    Возвращает (heights, outer, inner, info) или None, если контур не удаётся
+    собрать в разумное число участков.
+    """
+    chains = chain_polylines(points, offsets, snap)
+    pieces = [piece for chain in chains for piece in monotone_pieces(chain)]
+    if not pieces or len(pieces) > MAX_WALL_PIECES:
+        return None
+
+    heights = np.unique(np.concatenate([ys for ys, _, _ in pieces]))
+    outer, inner = wall_radii(pieces, heights, snap)
+    info = {'method': 'contour', 'chains': len(chains), 'pieces': len(pieces)}
+    return heights, outer, inner, info
+
+
+def extract_profile_corrected(file_path, scale=PROFILE_SCALE, n_points=PROFILE_POINTS,
+                              read_mode='auto', layers=None, region=None,
+                              chord_tolerance=CHORD_TOLERANCE, wall='outer', resample='adaptive',
+                              resample_tolerance=RESAMPLE_TOLERANCE, max_points=RESAMPLE_MAX_POINTS):
+    """
+    Извлечение полупрофиля сосуда из DXF файла.
+    Возвращает словарь профиля или None, если профиль не найден.
+    Классификация Цетлина добавляется вызывающей стороной.
+    В профиль добавляется 'extraction_stats' - число примитивов и время этапов.
+
+    read_mode: 'full', 'stream' или 'auto' (см. READ_MODES)
+    layers: слои, с которых берётся геометрия (None - все)
+    region: область (xmin, ymin, xmax, ymax) в единицах чертежа (None - весь чертёж)
+    chord_tolerance: допуск аппроксимации дуг и сплайнов, см
+    wall: стенка, по которой строится профиль ('outer' или 'inner')
+    resample: 'adaptive' (по кривизне с допуском resample_tolerance, см, не больше
+    max_points точек) или 'uniform' (n_points точек), см. resample_profile
+    """
+    try:
+        t_start = time.perf_counter()
+        tolerance = flatten_tolerance(scale, chord_tolerance)
+        if normalize_layers(layers) or normalize_region(region):
+            # Выборка через индекс примитивов: при смене фильтра файл не перечитывается
+            index = get_entity_index(file_path, read_mode, tolerance)
+            points, offsets, entity_counts = index.select(layers, region)
+            reader, read_s = f"{index.reader}+index", 0.0
+        else:
+            points, offsets, entity_counts, reader, read_s = read_profile_points(
+                file_path, read_mode, tolerance)
+        t_collect = time.perf_counter()
+
+        profile = build_profile(points, file_path, scale, n_points, offsets, wall,
+                                resample, resample_tolerance, max_points)
+        t_build = time.perf_counter()
+
+        stats = {
+            'reader': reader,
+            'entities': entity_counts,
+            'points': len(points),
+            'read_s': read_s,
+            'collect_s': t_collect - t_start - read_s,
+            'build_s': t_build - t_collect,
+            'total_s': t_build - t_start,
+        }
+        print(f"{os.path.basename(file_path)} [{reader}]: "
+              f"{', '.join(f'{k}={v}' for k, v in entity_counts.items())}, точек {len(points)}, "
+              f"чтение {stats['read_s']:.3f} с, сбор {stats['collect_s']:.3f} с, "
+              f"профиль {stats['build_s']:.3f} с")
+
+        if profile:
+            contour = profile['contour']
+            print(f"  Контур: {contour['method']}, стенка {contour['wall']}"
+                  + (f", цепочек {contour['chains']}, участков {contour['pieces']}"
+                     if contour['method'] == 'contour' else ''))
+            info = profile['resample']
+            error_pct = (100.0 * info['volume_error'] / info['reference_volume']
+                         if info['reference_volume'] else 0.0)
+            print(f"  Ресэмплинг: {info['mode']}, точек {info['points']}, "
+                  f"погрешность объёма {info['volume_error']:+.3f} см³ ({error_pct:+.4f}%)"
+                  + (", достигнут предел точек" if info['capped'] else ''))
+            profile['extraction_stats'] = stats
+        return profile
+
+    except Exception as e:
+        print(f"Ошибка извлечения профиля {file_path}: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+def build_profile(points, file_path, scale=PROFILE_SCALE, n_points=PROFILE_POINTS,
+                  offsets=None, wall='outer', resample='adaptive',
+                  resample_tolerance=RESAMPLE_TOLERANCE, max_points=RESAMPLE_MAX_POINTS):
+    """
+    Построение ресэмплированного профиля из точек (N, 2) в единицах чертежа.
+
+    offsets: границы примитивов в points (см. collect_profile_points); если
+    заданы, примитивы собираются в контур и профиль строится по стенке wall
+    ('outer' - наружная, 'inner' - внутренняя). Без offsets или если контур
+    не собирается, используется облако точек.
+    resample, resample_tolerance, max_points: см. resample_profile.
+    """
+    if len(points) < 10:
+        return None
+
+    points = np.array(points, dtype=np.float64)
+
+    x_coords = points[:, 0]
+    y_coords = points[:, 1]
+
+    axis_x = np.min(x_coords)
+    points[:, 0] -= axis_x
+
+    y_min = np.min(points[:, 1])
+    points[:, 1] -= y_min
+
+    points *= scale
+
+    radii = points[:, 0]
+    heights = points[:, 1]
+
+    if np.any(radii < -0.001):
+        radii = np.abs(radii)
+
+    walls = None
+    if offsets is not None:
+        walls = profile_walls(np.column_stack((radii, heights)), offsets)
+
+    resample_options = {'n_points': n_points, 'mode': resample,
+                        'tolerance': resample_tolerance, 'max_points': max_points}
+    wall_profile = None
+    if walls is not None:
+        unique_heights, outer, inner, contour = walls
+        unique_radii = outer
+        contour['wall'] = 'outer'
+        has_inner = np.isfinite(inner)
+        if np.count_nonzero(has_inner) >= 2:
+            # Обе стенки в системе высот сосуда (от дна наружной поверхности)
+            y_outer, r_outer, _ = resample_profile(unique_heights, outer, **resample_options)
+            # Внутренняя стенка может прерываться по высоте: через пропуски -
+            # линейно, и она не выходит за наружную
+            y_inner, r_inner, _ = resample_profile(unique_heights[has_inner], inner[has_inner],
+                                                   kind='linear', **resample_options)
+            r_inner = np.clip(r_inner, 0.0, np.interp(y_inner, y_outer, r_outer))
+            wall_profile = {'y_outer': y_outer, 'r_outer': r_outer,
+                            'y_inner': y_inner, 'r_inner': r_inner}
+        if wall == 'inner':
+            if wall_profile is not None:
+                # Высоты полости отсчитываются от её дна
+                contour['wall'] = 'inner'
+                contour['y_offset'] = float(unique_heights[has_inner][0])
+                unique_heights = unique_heights[has_inner] - contour['y_offset']
+                unique_radii = inner[has_inner]
+            else:
+                print(f"{os.path.basename(file_path)}: внутренняя стенка не найдена, "
+                      f"используется наружная")
+    else:
+        # Облако точек: на каждой высоте - наибольший радиус (наружная стенка)
+        sort_idx = np.argsort(heights, kind='stable')
+        heights = heights[sort_idx]
+        radii = radii[sort_idx]
+
+        unique_heights, unique_idx = np.unique(heights, return_index=True)
+        unique_radii = np.maximum.reduceat(radii, unique_idx)
+        contour = {'method': 'cloud', 'wall': 'outer'}
+
+    if unique_heights[0] > 0.01:
+        unique_heights = np.insert(unique_heights, 0, 0.0)
+        unique_radii = np.insert(unique_radii, 0, unique_radii[0])
+
+    if len(unique_heights) > 1:
+        interp_heights, interp_radii, resample_info = resample_profile(
+            unique_heights, unique_radii, start=0.0,
+            kind='linear' if contour['wall'] == 'inner' else 'cubic', **resample_options)
+    else:
+        interp_heights = np.array([0.0, 1.0])
+        interp_radii = np.array([unique_radii[0], unique_radii[0]])
+        resample_info = {'mode': 'constant', 'points': 2, 'tolerance': None,
+                         'capped': False, 'volume_error': 0.0, 'reference_volume': None}
+
+    # КРИТИЧЕСКОЕ ИСПРАВЛЕНИЕ: Используем метод по умолчанию (диски) для начального расчета
+    calculator = CorrectVolumeCalculator(interp_heights, interp_radii)
+
+    # Используем метод дисков для начального расчета (позже пересчитается текущим методом)
+    volume = calculator.method_disks()  # Исправлено: был method_spline_integral()
+
+    # Создаем профиль
+    profile = {
+        'name': os.path.basename(file_path),
+        'y': interp_heights,
+        'r': interp_radii,
+        'volume': volume,  # Сохраняем начальный объем
+        'file_path': file_path,
+        'is_half': True,
+        'axis_x': axis_x,
+        'contour': contour,
+        'resample': resample_info
+    }
+    set_wall_volumes(profile, wall_profile)
+
+    return profile
+
+
+# Плотная сетка эталонного профиля для адаптивного ресэмплинга и оценки погрешности
+RESAMPLE_DENSE_POINTS = 4096
+# Начальное число равноотстоящих точек адаптивного профиля
+RESAMPLE_MIN_POINTS = 16
+
+
+def adaptive_knots(dense_y, dense_r, tolerance, max_points=RESAMPLE_MAX_POINTS,
+                   min_points=RESAMPLE_MIN_POINTS):
+    """
+    Индексы точек плотного профиля, ломаная по которым отклоняется от него
+    по радиусу не больше чем на tolerance (и так же для радиуса, равновеликого
+    линейно интерполированной площади сечения).
+
+    Начиная с min_points равноотстоящих точек, на каждом проходе в каждый
+    интервал с превышением допуска добавляется точка наибольшего отклонения;
+    так точки сгущаются на участках с большой кривизной (перегибы, ребра).
+    Если точек становится больше max_points, добавляются только интервалы
+    с наибольшим отклонением.
+    """
+    n = len(dense_y)
+    max_points = max(2, min(int(max_points), n))
+    knots = np.unique(np.linspace(0, n - 1, min(min_points, max_points)).astype(np.intp))
+    index = np.arange(n)
+    dense_area = dense_r**2
+
+    while len(knots) < max_points:
+        # Отклонение ломаной и радиуса, равновеликого линейно интерполированной
+        # площади сечения (так интегрируют методы дисков и трапеций)
+        linear = np.interp(dense_y, dense_y[knots], dense_r[knots])
+        area = np.interp(dense_y, dense_y[knots], dense_area[knots])
+        deviation = np.maximum(np.abs(dense_r - linear), np.abs(dense_r - np.sqrt(area)))
+        segment = np.searchsorted(knots, index, side='right') - 1
+        worst = np.maximum.reduceat(deviation, knots)
+        candidates = np.flatnonzero((deviation > tolerance) & (deviation == worst[segment]))
+        if len(candidates) == 0:
+            break
+        # Одна новая точка на интервал
+        _, first = np.unique(segment[candidates], return_index=True)
+        new = candidates[first]
+        room = max_points - len(knots)
+        if len(new) > room:
+            new = new[np.argsort(deviation[new])[::-1][:room]]
+        knots = np.union1d(knots, new)
+    return knots
+
+
+def resample_profile(heights, radii, n_points=PROFILE_POINTS, mode='adaptive',
+                     tolerance=RESAMPLE_TOLERANCE, max_points=RESAMPLE_MAX_POINTS, start=None,
+                     kind='cubic'):
+    """
+    Ресэмплинг стенки r(y), заданной по возрастающим высотам heights.
+
+    Профиль интерполируется кубически (interp1d) и вычисляется на плотной
+    эталонной сетке из RESAMPLE_DENSE_POINTS высот. В режиме 'uniform'
+    берётся n_points равноотстоящих высот; в режиме 'adaptive' из эталона
+    выбираются точки, ломаная по которым отклоняется от него не больше
+    чем на tolerance (см), но не больше max_points точек (см. adaptive_knots).
+    start - начальная высота сетки (по умолчанию heights[0]).
+    kind - вид интерполяции interp1d; 'linear' - для стенки с разрывами,
+    где кубическая интерполяция через пропуск даёт выбросы.
+
+    Возвращает (y, r, info); info['volume_error'] - разница объёма по методу
+    дисков между результатом и эталоном, см³.
+    """
+    interp_func = interp1d(heights, radii, kind=kind, fill_value='extrapolate')
+    start = heights[0] if start is None else start
+
+    dense_y = np.linspace(start, heights[-1], RESAMPLE_DENSE_POINTS)
+    dense_r = np.maximum(interp_func(dense_y), 0.0)
+    reference = trapezoid(np.pi * dense_r**2, dense_y)
+
+    if mode == 'uniform':
+        y = np.linspace(start, heights[-1], n_points)
+        r = np.maximum(interp_func(y), 0.0)
+    else:
+        knots = adaptive_knots(dense_y, dense_r, tolerance, max_points)
+        y = dense_y[knots]
+        r = dense_r[knots]
+
+    volume_error = trapezoid(np.pi * r**2, y) - reference
+    info = {
+        'mode': mode,
+        'points': len(y),
+        'tolerance': tolerance if mode != 'uniform' else None,
+        'capped': mode != 'uniform' and len(y) >= max_points,
+        'volume_error': float(volume_error),
+        'reference_volume': float(reference),
+    }
+    return y, r, info
+
+
+def set_wall_volumes(profile, walls):
+    """
+    Записывает в профиль стенки и объёмы двухстенного сосуда:
+    volume_envelope (наружная поверхность), volume_capacity (вместимость)
+    и volume_body (керамическое тело). Для одностенного профиля
+    вместимость и объём тела - None, а наружный объём равен объёму профиля,
+    если профиль построен по наружной стенке.
+    """
+    if walls is not None:
+        volumes = calculate_wall_volumes(walls['y_outer'], walls['r_outer'],
+                                         walls['y_inner'], walls['r_inner'])
+        profile['walls'] = walls
+    else:
+        outer = profile.get('contour', {}).get('wall', 'outer') == 'outer'
+        volumes = {'envelope': profile['volume'] if outer else None,
+                   'capacity': None, 'body': None}
+    for key, value in volumes.items():
+        profile[f'volume_{key}'] = value
+    return profile
@@ -0,0 +1,147 @@
+"""ingest.py
+Параллельная обработка DXF файлов в пуле процессов
+"""
+
+import os
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dxf_profile import extract_profile_corrected, extraction_params
+
+# ============================================================================
+# ПАРАЛЛЕЛЬНАЯ ОБРАБОТКА
+# ============================================================================
+
+# Пул запускается из фонового потока GUI, пока работают Tk и matplotlib:
+# fork многопоточного процесса может зависнуть, поэтому процессы - через spawn
+START_METHOD = 'spawn'
+
+def default_worker_count():
+    """Количество рабочих процессов по умолчанию (все ядра, кроме одного под GUI)"""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _extract_task(extract, analyze, file_path):
+    """Задача рабочего процесса: извлечение профиля и его анализ"""
+    profile = extract(file_path)
+    if profile and analyze is not None:
+        profile = analyze(profile)
+    return profile
+
+
+def _analyze_task(analyze, profile):
+    """Задача рабочего процесса: анализ профиля, взятого из кэша"""
+    return analyze(profile)
+
+
+class ParallelIngestor:
+    """
+    Отправляет извлечение профилей в пул процессов и собирает результаты
+    по мере готовности. Результаты передаются пакетами в on_batch,
+    чтобы вызывающая сторона могла фиксировать их реже, чем по одному.
+    Если задан кэш (ProfileCache), файлы из кэша в пул не отправляются.
+    extract_options передаются в extract_profile_corrected (например, read_mode,
+    layers, region); влияющие на результат параметры входят в ключ кэша.
+    analyze(profile) -> profile выполняется в рабочих процессах после извлечения
+    (и для профилей из кэша); функция должна быть доступна для pickle.
+    """
+
+    # Параметры extract_profile_corrected, от которых зависит профиль
+    RESULT_OPTIONS = ('scale', 'n_points', 'layers', 'region', 'chord_tolerance', 'wall',
+                      'resample', 'resample_tolerance', 'max_points')
+
+    def __init__(self, max_workers=None, batch_size=25, cache=None, extract_options=None,
+                 analyze=None):
+        self.max_workers = max_workers or default_worker_count()
+        self.batch_size = max(1, int(batch_size))
+        self.cache = cache
+        options = dict(extract_options or {})
+        self.extract = partial(extract_profile_corrected, **options)
+        self.params = extraction_params(**{k: v for k, v in options.items()
+                                           if k in self.RESULT_OPTIONS})
+        self.analyze = analyze
+
+    def run(self, files, on_batch, on_progress=None):
+        """
+        Обработка списка файлов.
+
+        on_batch(batch): batch - список пар (file_path, profile или None)
+        on_progress(done, total, file_path): вызывается после каждого файла
+        Возвращает количество успешно извлечённых профилей.
+        """
+        files = list(files)
+        total = len(files)
+        if total == 0:
+            return 0
+
+        done = 0
+        extracted = 0
+        batch = []
+        fresh = []
+
+        def flush():
+            nonlocal batch, fresh
+            if self.cache is not None and fresh:
+                self.cache.store(fresh, self.params)
+            on_batch(batch)
+            batch = []
+            fresh = []
+
+        def collect(file_path, profile, from_cache=False):
+            nonlocal done, extracted
+            done += 1
+            if profile:
+                extracted += 1
+                profile['from_cache'] = from_cache
+            batch.append((file_path, profile))
+            if not from_cache:
+                fresh.append((file_path, profile))
+            if on_progress:
+                on_progress(done, total, file_path)
+            if len(batch) >= self.batch_size:
+                flush()
+
+        hits = {}
+        pending = files
+        if self.cache is not None:
+            try:
+                hits, pending = self.cache.lookup(files, self.params)
+            except Exception as e:
+                print(f"Ошибка чтения кэша профилей: {e}")
+                hits, pending = {}, files
+            if self.analyze is None:
+                for file_path, profile in hits.items():
+                    collect(file_path, profile, from_cache=True)
+                hits = {}
+
+        if self.max_workers == 1 or len(pending) + len(hits) == 1:
+            # Один процесс - обрабатываем на месте, без накладных расходов пула
+            for file_path, profile in hits.items():
+                collect(file_path, _analyze_task(self.analyze, profile), from_cache=True)
+            for file_path in pending:
+                collect(file_path, _extract_task(self.extract, self.analyze, file_path))
+        elif pending or hits:
+            workers = min(self.max_workers, len(pending) + len(hits))
+            context = multiprocessing.get_context(START_METHOD)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                futures = {}
+                for file_path, profile in hits.items():
+                    future = executor.submit(_analyze_task, self.analyze, profile)
+                    futures[future] = (file_path, True)
+                for file_path in pending:
+                    future = executor.submit(_extract_task, self.extract, self.analyze, file_path)
+                    futures[future] = (file_path, False)
+                for future in as_completed(futures):
+                    file_path, from_cache = futures[future]
+                    try:
+                        profile = future.result()
+                    except Exception as e:
+                        print(f"Ошибка обработки {file_path}: {e}")
+                        profile = None
+                    collect(file_path, profile, from_cache)
+
+        if batch:
+            flush()
+
+        return extracted
@@ -0,0 +1,248 @@
+"""profile_cache.py
+Постоянный кэш извлечённых профилей на диске.
+Ключ записи - хэш содержимого DXF, размер файла и параметры извлечения,
+поэтому неизменённые файлы не открываются повторно между сессиями.
+"""
+
+import os
+import io
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+
+from dxf_profile import extraction_params
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.bobrinsky', 'profile_cache.sqlite')
+DEFAULT_CACHE_MB = 256
+# Версия формата записи: входит в ключ, старые записи просто не находятся
+CACHE_FORMAT = 2
+
+# ============================================================================
+# ХЭШ СОДЕРЖИМОГО
+# ============================================================================
+
+def file_content_hash(file_path, chunk_size=1 << 20):
+    """Хэш содержимого файла (читается блоками, без загрузки целиком)"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# ============================================================================
+# КЭШ ПРОФИЛЕЙ
+# ============================================================================
+
+class ProfileCache:
+    """
+    Кэш профилей в SQLite с ограничением размера и вытеснением LRU.
+
+    Хэши содержимого запоминаются по (путь, размер, mtime), поэтому
+    для неизменённого файла не требуется даже повторное чтение.
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_CACHE_MB * 1024 * 1024, params=None):
+        self.path = path or DEFAULT_CACHE_PATH
+        self.max_bytes = int(max_bytes)
+        self.params = params or extraction_params()
+        self._params_key = json.dumps(self.params, sort_keys=True)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Кэш используется из потока обработки, доступ защищён блокировкой
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS file_hashes (
+                                  path TEXT PRIMARY KEY,
+                                  size INTEGER,
+                                  mtime_ns INTEGER,
+                                  content_hash TEXT)''')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS profiles (
+                                  key TEXT PRIMARY KEY,
+                                  payload BLOB,
+                                  nbytes INTEGER,
+                                  last_access REAL)''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS profiles_lru ON profiles(last_access)')
+        self._conn.commit()
+
+    # --- ключи ---------------------------------------------------------------
+
+    def content_hash(self, file_path):
+        """Хэш содержимого с запоминанием по размеру и mtime файла"""
+        st = os.stat(file_path)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT size, mtime_ns, content_hash FROM file_hashes WHERE path = ?',
+                (file_path,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+
+        content_hash = file_content_hash(file_path)
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)',
+                               (file_path, st.st_size, st.st_mtime_ns, content_hash))
+            self._conn.commit()
+        return content_hash
+
+    def key_for(self, file_path, params=None):
+        """
+        Ключ записи: хэш содержимого + размер + параметры извлечения.
+        params переопределяет параметры кэша (например, фильтр слоёв и области).
+        """
+        content_hash = self.content_hash(file_path)
+        size = os.path.getsize(file_path)
+        params_key = self._params_key if params is None else json.dumps(params, sort_keys=True)
+        raw = f"{CACHE_FORMAT}:{content_hash}:{size}:{params_key}".encode('utf-8')
+        return hashlib.blake2b(raw, digest_size=20).hexdigest()
+
+    # --- сериализация --------------------------------------------------------
+
+    # Объёмы двухстенного профиля (None хранится как NaN)
+    WALL_VOLUMES = ('volume_envelope', 'volume_capacity', 'volume_body')
+    WALL_ARRAYS = ('y_outer', 'r_outer', 'y_inner', 'r_inner')
+    # Описательные поля профиля, хранятся как JSON
+    META_FIELDS = ('contour', 'resample', 'extraction_stats')
+
+    @staticmethod
+    def _pack(profile):
+        buffer = io.BytesIO()
+        extra = {key: np.float64(np.nan if profile.get(key) is None else profile[key])
+                 for key in ProfileCache.WALL_VOLUMES}
+        meta = {key: profile[key] for key in ProfileCache.META_FIELDS if profile.get(key) is not None}
+        extra['meta'] = np.array(json.dumps(meta, default=lambda value: value.item()))
+        walls = profile.get('walls')
+        if walls:
+            extra.update({key: np.asarray(walls[key], dtype=np.float64)
+                          for key in ProfileCache.WALL_ARRAYS})
+        np.savez(buffer,
+                 y=np.asarray(profile['y'], dtype=np.float64),
+                 r=np.asarray(profile['r'], dtype=np.float64),
+                 axis_x=np.float64(profile['axis_x']),
+                 volume=np.float64(profile['volume']),
+                 **extra)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _unpack(payload, file_path):
+        with np.load(io.BytesIO(payload)) as data:
+            profile = {
+                'name': os.path.basename(file_path),
+                'y': data['y'],
+                'r': data['r'],
+                'volume': float(data['volume']),
+                'file_path': file_path,
+                'is_half': True,
+                'axis_x': float(data['axis_x'])
+            }
+            for key in ProfileCache.WALL_VOLUMES:
+                value = float(data[key]) if key in data.files else np.nan
+                profile[key] = None if np.isnan(value) else value
+            profile.update(json.loads(str(data['meta'])))
+            if all(key in data.files for key in ProfileCache.WALL_ARRAYS):
+                profile['walls'] = {key: data[key] for key in ProfileCache.WALL_ARRAYS}
+            return profile
+
+    # --- доступ --------------------------------------------------------------
+
+    def lookup(self, files, params=None):
+        """
+        Поиск профилей в кэше.
+        Возвращает (hits, misses): словарь {file_path: profile} и список
+        файлов, которые нужно обработать.
+        """
+        hits = {}
+        misses = []
+        touched = []
+        now = time.time()
+
+        for file_path in files:
+            try:
+                key = self.key_for(file_path, params)
+            except OSError:
+                misses.append(file_path)
+                continue
+
+            with self._lock:
+                row = self._conn.execute('SELECT payload FROM profiles WHERE key = ?',
+                                         (key,)).fetchone()
+            if row is None:
+                misses.append(file_path)
+                continue
+
+            try:
+                hits[file_path] = self._unpack(row[0], file_path)
+                touched.append((now, key))
+            except Exception as e:
+                print(f"Повреждённая запись кэша для {file_path}: {e}")
+                misses.append(file_path)
+
+        if touched:
+            with self._lock:
+                self._conn.executemany('UPDATE profiles SET last_access = ? WHERE key = ?', touched)
+                self._conn.commit()
+
+        return hits, misses
+
+    def get(self, file_path, params=None):
+        hits, _ = self.lookup([file_path], params)
+        return hits.get(file_path)
+
+    def store(self, items, params=None):
+        """Сохранение пар (file_path, profile); пустые профили не кэшируются"""
+        rows = []
+        now = time.time()
+        for file_path, profile in items:
+            if not profile:
+                continue
+            try:
+                payload = self._pack(profile)
+                rows.append((self.key_for(file_path, params), payload, len(payload), now))
+            except Exception as e:
+                print(f"Не удалось закэшировать {file_path}: {e}")
+
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?)', rows)
+            self._conn.commit()
+        self.evict()
+
+    def put(self, file_path, profile, params=None):
+        self.store([(file_path, profile)], params)
+
+    def evict(self):
+        """Вытеснение давно неиспользуемых записей сверх лимита размера"""
+        with self._lock:
+            total = self._conn.execute('SELECT COALESCE(SUM(nbytes), 0) FROM profiles').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            excess = total - self.max_bytes
+            stale = []
+            for key, nbytes in self._conn.execute(
+                    'SELECT key, nbytes FROM profiles ORDER BY last_access ASC'):
+                stale.append((key,))
+                excess -= nbytes
+                if excess <= 0:
+                    break
+
+            self._conn.executemany('DELETE FROM profiles WHERE key = ?', stale)
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM profiles')
+            self._conn.execute('DELETE FROM file_hashes')
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,214 @@
+"""results_model.py
+Столбцовая модель таблицы результатов (без зависимостей от GUI).
+
+Строки хранятся по ключу (путь файла); для сортировки и фильтрации
+строятся массивы numpy по столбцам, которые пересобираются только после
+изменения данных. Представление запрашивает отформатированные строки
+лишь для видимого окна (rows), поэтому размер коллекции не влияет
+на число операций с виджетами.
+"""
+
+import numpy as np
+
+# ============================================================================
+# МОДЕЛЬ ТАБЛИЦЫ
+# ============================================================================
+
+TEXT = 'text'
+NUMBER = 'number'
+
+
+class ResultsModel:
+    """
+    Таблица результатов в виде столбцов.
+
+    columns - список (имя, тип, формат): тип TEXT или NUMBER, формат -
+    строка формата для чисел (например, '{:.3f}'); None/NaN отображаются
+    пустой строкой. Порядок строк - порядок добавления, пока не задана
+    сортировка (sort_by); фильтр (set_filter) - подстрока без учёта
+    регистра в текстовых столбцах.
+    """
+
+    def __init__(self, columns):
+        self.set_columns(columns)
+        self._rows = {}
+        self.sort_column = None
+        self.sort_ascending = True
+        self.filter_text = ''
+        self._invalidate()
+
+    def set_columns(self, columns):
+        self.columns = [name for name, _, _ in columns]
+        self.kinds = [kind for _, kind, _ in columns]
+        self.formats = [fmt for _, _, fmt in columns]
+        self._invalidate()
+
+    def _invalidate(self):
+        self._keys = None
+        self._index = None
+        self._arrays = None
+        self._search = None
+        self._view = None
+
+    # --- данные ---------------------------------------------------------------
+
+    def set_rows(self, rows):
+        """Замена всех строк: rows - {ключ: последовательность значений}"""
+        self._rows = {key: tuple(values) for key, values in rows.items()}
+        self._invalidate()
+
+    def update_rows(self, rows):
+        """
+        Добавление или замена отдельных строк. Если столбцы уже собраны,
+        они обновляются на месте (новые строки дописываются в конец),
+        а не пересобираются целиком.
+        """
+        if self._arrays is None:
+            for key, values in rows.items():
+                self._rows[key] = tuple(values)
+            return
+        added = []
+        for key, values in rows.items():
+            values = tuple(values)
+            self._rows[key] = values
+            index = self._index.get(key)
+            if index is None:
+                added.append(key)
+                continue
+            for column, array in enumerate(self._arrays):
+                array[index] = self._cell(column, values)
+            if self._search is not None:
+                self._search[index] = self._search_row(values)
+        if added:
+            for key in added:
+                self._index[key] = len(self._keys)
+                self._keys.append(key)
+            for column, array in enumerate(self._arrays):
+                self._arrays[column] = np.concatenate(
+                    (array, self._column([self._rows[key] for key in added], column)))
+            if self._search is not None:
+                self._search.extend(self._search_row(self._rows[key]) for key in added)
+        self._view = None
+
+    def remove_rows(self, keys):
+        for key in keys:
+            self._rows.pop(key, None)
+        self._invalidate()
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    @property
+    def total(self):
+        """Число строк без учёта фильтра"""
+        return len(self._rows)
+
+    # --- столбцы --------------------------------------------------------------
+
+    def _cell(self, column, row):
+        """Значение ячейки для массива столбца (NaN / '' вместо None)"""
+        value = row[column] if column < len(row) else None
+        if self.kinds[column] == NUMBER:
+            return np.nan if value is None else value
+        return '' if value is None else str(value)
+
+    def _column(self, rows, column):
+        dtype = np.float64 if self.kinds[column] == NUMBER else object
+        return np.array([self._cell(column, row) for row in rows], dtype=dtype)
+
+    def _build(self):
+        if self._arrays is not None:
+            return
+        self._keys = list(self._rows)
+        self._index = {key: index for index, key in enumerate(self._keys)}
+        values = list(self._rows.values())
+        self._arrays = [self._column(values, column) for column in range(len(self.kinds))]
+
+    def _search_row(self, row):
+        """Текстовые столбцы строки, склеенные в нижнем регистре (для фильтра)"""
+        return '\t'.join(self._cell(column, row) for column, kind in enumerate(self.kinds)
+                         if kind == TEXT).lower()
+
+    def _search_text(self):
+        if self._search is None:
+            self._build()
+            self._search = [self._search_row(self._rows[key]) for key in self._keys]
+        return self._search
+
+    # --- сортировка и фильтр ------------------------------------------------
+
+    def sort_by(self, column, ascending=None):
+        """
+        Сортировка по столбцу; повторный вызов для того же столбца без
+        ascending меняет направление. column=None - порядок добавления.
+        """
+        if ascending is None:
+            ascending = not self.sort_ascending if column == self.sort_column else True
+        self.sort_column = column
+        self.sort_ascending = ascending
+        self._view = None
+
+    def set_filter(self, text):
+        text = (text or '').strip().lower()
+        if text != self.filter_text:
+            self.filter_text = text
+            self._view = None
+
+    def view(self):
+        """Индексы строк (в порядке добавления) после фильтра и сортировки"""
+        if self._view is not None:
+            return self._view
+        self._build()
+        indices = np.arange(len(self._keys))
+        if self.filter_text and len(indices):
+            text = self.filter_text
+            matches = np.fromiter((text in row for row in self._search_text()), dtype=bool,
+                                  count=len(indices))
+            indices = np.flatnonzero(matches)
+
+        if self.sort_column in self.columns and len(indices):
+            column = self.columns.index(self.sort_column)
+            values = self._arrays[column][indices]
+            if self.kinds[column] == NUMBER:
+                # NaN всегда в конце, при любом направлении
+                order = np.argsort(values if self.sort_ascending else -values, kind='stable')
+            else:
+                order = np.argsort(np.char.lower(values.astype(str)), kind='stable')
+                if not self.sort_ascending:
+                    order = order[::-1]
+            indices = indices[order]
+        self._view = indices
+        return indices
+
+    def __len__(self):
+        return len(self.view())
+
+    # --- доступ для представления -------------------------------------------
+
+    def _format(self, column, value):
+        if self.kinds[column] == NUMBER:
+            if value is None or not np.isfinite(value):
+                return ''
+            fmt = self.formats[column]
+            return fmt.format(value) if fmt else f'{value:g}'
+        return '' if value is None else str(value)
+
+    def rows(self, start, stop):
+        """Отформатированные строки окна [start, stop): список (ключ, значения)"""
+        indices = self.view()[max(0, start):max(0, stop)]
+        result = []
+        for index in indices.tolist():
+            key = self._keys[index]
+            values = self._rows[key]
+            result.append((key, tuple(self._format(column, values[column] if column < len(values) else None)
+                                      for column in range(len(self.columns)))))
+        return result
+
+    def position(self, key):
+        """Позиция строки с ключом key в текущем представлении (или None)"""
+        self._build()
+        index = self._index.get(key)
+        if index is None:
+            return None
+        found = np.flatnonzero(self.view() == index)
+        return int(found[0]) if len(found) else None
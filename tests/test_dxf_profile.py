@@ -0,0 +1,80 @@
+"""Потоковое чтение DXF даёт те же точки и профили, что и полное чтение"""
+
+import numpy as np
+import pytest
+
+ezdxf = pytest.importorskip('ezdxf')
+
+from dxf_profile import read_profile_points, extract_profile_corrected, flatten_tolerance
+
+# Половина контура сосуда (мм): дно, тулово, плечо, горло
+OUTLINE = [(0, 0), (40, 0), (70, 60), (65, 120), (35, 160), (30, 200), (0, 200)]
+
+
+def write_drawing(path, version):
+    doc = ezdxf.new(version)
+    msp = doc.modelspace()
+    msp.add_line((0, 0), (40, 0), dxfattribs={'layer': 'PROFILE'})
+    msp.add_polyline2d(OUTLINE[1:4], dxfattribs={'layer': 'PROFILE'})
+    msp.add_polyline2d([(65, 120), (35, 160), (30, 200), (0, 200)], close=True)
+    msp.add_arc((30, 205), 5, 0, 180)
+    msp.add_circle((90, 20), 4)
+    if version != 'R12':
+        msp.add_lwpolyline([(0, 0), (40, 0), (70, 60), (65, 120)], close=True)
+        msp.add_ellipse((50, 90), major_axis=(0, 30), ratio=0.4, start_param=0.3, end_param=2.8)
+        msp.add_rational_spline([(40, 0), (75, 30), (72, 80), (65, 120)],
+                                weights=[1.0, 2.5, 0.7, 1.0], degree=3)
+        msp.add_spline([(65, 120), (50, 140), (35, 160), (31, 185)])
+    # Примитивы листа не относятся к профилю
+    paper = doc.layout('Layout1')
+    paper.add_line((0, 0), (500, 500))
+    paper.add_circle((250, 250), 100)
+    doc.saveas(path)
+    return path
+
+
+@pytest.fixture(params=['R12', 'R2000', 'R2018'])
+def drawing(request, tmp_path):
+    return write_drawing(str(tmp_path / f'vessel_{request.param}.dxf'), request.param)
+
+
+def test_stream_points_match_full(drawing):
+    tolerance = flatten_tolerance()
+    full = read_profile_points(drawing, 'full', tolerance)
+    stream = read_profile_points(drawing, 'stream', tolerance)
+    assert (full[3], stream[3]) == ('full', 'stream')
+    assert full[2] == stream[2]
+    assert np.array_equal(full[1], stream[1])
+    assert np.allclose(full[0], stream[0], rtol=0.0, atol=1e-9)
+
+
+def test_stream_profile_matches_full(drawing):
+    full = extract_profile_corrected(drawing, read_mode='full')
+    stream = extract_profile_corrected(drawing, read_mode='stream')
+    assert full is not None and stream is not None
+    assert np.allclose(full['y'], stream['y'], rtol=0.0, atol=1e-9)
+    assert np.allclose(full['r'], stream['r'], rtol=0.0, atol=1e-9)
+    assert full['volume'] == pytest.approx(stream['volume'], rel=1e-12)
+    assert full['contour'] == stream['contour']
+
+
+def test_gapped_inner_wall_stays_inside(tmp_path, drawing):
+    """Внутренняя стенка с разрывом не выходит за наружную: 0 <= тело <= объём"""
+    doc = ezdxf.new('R2000')
+    msp = doc.modelspace()
+    msp.add_lwpolyline([(0, 0), (60, 0), (85, 90), (70, 150), (45, 200), (0, 200)])
+    # Внутренняя стенка прервана между 70 и 140 мм (например, скол на чертеже)
+    msp.add_lwpolyline([(0, 10), (50, 10), (72, 70)])
+    msp.add_lwpolyline([(62, 140), (40, 195)])
+    path = str(tmp_path / 'gapped.dxf')
+    doc.saveas(path)
+
+    for file_path in (path, drawing):
+        profile = extract_profile_corrected(file_path, read_mode='full')
+        if profile.get('walls') is None:
+            continue
+        walls = profile['walls']
+        outer = np.interp(walls['y_inner'], walls['y_outer'], walls['r_outer'])
+        assert np.all(walls['r_inner'] >= 0.0)
+        assert np.all(walls['r_inner'] <= outer + 1e-12)
+        assert 0.0 <= profile['volume_body'] <= profile['volume_envelope']
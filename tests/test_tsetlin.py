@@ -0,0 +1,43 @@
+import json
+
+import numpy as np
+
+from tsetlin import (BETWEEN_RANGES, OUT_OF_SCALE, classify_volume, classification_index,
+                     load_scheme)
+
+
+def gapped_scheme(tmp_path):
+    """Схема с промежутком 2–3 л между группами A и B"""
+    path = tmp_path / 'gapped.json'
+    path.write_text(json.dumps({'name': 'gapped', 'groups': [
+        {'group': 'A', 'start_l': 1.0, 'end_l': 2.0, 'mobility_class': 'малые'},
+        {'group': 'B', 'start_l': 3.0, 'end_l': 4.0, 'mobility_class': 'большие'},
+    ]}), encoding='utf-8')
+    return load_scheme(str(path))
+
+
+def test_gap_volume_is_out_of_scale(tmp_path):
+    """Объём в промежутке между группами не относится к следующей группе"""
+    scheme = gapped_scheme(tmp_path)
+    volumes = [1500.0, 2500.0, 3500.0, 2000.0, 3000.0]
+    assert scheme.labels(volumes) == ['A', OUT_OF_SCALE, 'B', 'A', 'B']
+
+    batch = scheme.index.classify(volumes)
+    assert batch['position'].tolist()[1] == BETWEEN_RANGES
+    assert batch['mobility'].tolist()[1] == -1
+    assert not batch['strict'][1]
+
+    # Словари (classify_volume и пакетный results) совпадают и не берут группу B
+    single = classify_volume(2500.0, scheme.classification)
+    assert single == classification_index(scheme.classification).results([2500.0])[0]
+    assert single['group'] == OUT_OF_SCALE
+    assert 'выше диапазона' not in single['group_name']
+    assert (single['start_l'], single['end_l']) == (2.0, 3.0)
+    assert not single['is_strict_quality']
+
+
+def test_contiguous_scale_has_no_gaps():
+    """Шкала Цетлина без промежутков: все объёмы внутри шкалы получают группу"""
+    index = classification_index()
+    volumes = np.geomspace(index.starts[0], index.ends[-1], 2000) * 1000.0
+    assert not np.any(index.classify(volumes)['position'] == BETWEEN_RANGES)
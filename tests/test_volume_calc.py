@@ -0,0 +1,106 @@
+"""Регрессия векторизованного метода усечённых конусов и пакетного расчёта"""
+
+import numpy as np
+import pytest
+
+from volume_calc import CorrectVolumeCalculator, ProfileStack
+
+
+def frustums_loop(calculator, y_max=None):
+    """Прежняя реализация method_frustums (цикл по сегментам) - эталон"""
+    if y_max is None:
+        y_max = calculator.y[-1]
+    mask = calculator.y <= y_max
+    y_slice = calculator.y[mask]
+    r_slice = calculator.r[mask]
+    if len(y_slice) < 2:
+        return 0.0
+    if y_max > y_slice[-1]:
+        r_max = float(calculator.linear(y_max))
+        y_slice = np.append(y_slice, y_max)
+        r_slice = np.append(r_slice, r_max)
+    volume = 0.0
+    for i in range(len(y_slice) - 1):
+        h = y_slice[i + 1] - y_slice[i]
+        if h <= 0:
+            continue
+        r1 = r_slice[i]
+        r2 = r_slice[i + 1]
+        volume += (np.pi / 3.0) * h * (r1**2 + r1 * r2 + r2**2)
+    return volume
+
+
+def random_profiles(count=12, seed=7):
+    rng = np.random.default_rng(seed)
+    profiles = []
+    for n in rng.integers(2, 3000, size=count):
+        y = np.sort(rng.uniform(0.0, 40.0, size=n))
+        y[0] = 0.0
+        r = np.abs(8.0 + 3.0 * np.sin(y / 4.0) + rng.normal(0.0, 0.2, size=n))
+        profiles.append((y, r))
+    # Гладкий профиль и профиль из двух точек
+    y = np.linspace(0.0, 30.0, 200)
+    profiles.append((y, 6.0 + 2.0 * np.cos(y / 5.0)))
+    profiles.append((np.array([0.0, 10.0]), np.array([5.0, 5.0])))
+    return profiles
+
+
+@pytest.mark.parametrize('index', range(len(random_profiles())))
+def test_frustums_matches_loop(index):
+    y, r = random_profiles()[index]
+    calculator = CorrectVolumeCalculator(y, r)
+    top = calculator.y[-1]
+    for y_max in (None, 0.0, top * 0.37, top * 0.5, top):
+        assert calculator.method_frustums(y_max) == frustums_loop(calculator, y_max)
+
+
+def test_batch_frustums_matches_loop():
+    profiles = random_profiles()
+    batch = CorrectVolumeCalculator.batch_volumes(profiles, 'frustums')
+    expected = [frustums_loop(CorrectVolumeCalculator(y, r)) for y, r in profiles]
+    assert np.array_equal(batch, expected)
+
+
+@pytest.mark.parametrize('method', ['disks', 'trapezoidal', 'simpson', 'spline', 'spline_exact',
+                                    'adaptive'])
+def test_batch_matches_calculator(method):
+    profiles = random_profiles(count=6)
+    batch = CorrectVolumeCalculator.batch_volumes(profiles, method)
+    expected = [CorrectVolumeCalculator(y, r).calculate_volume(method) for y, r in profiles]
+    assert np.allclose(batch, expected, rtol=1e-12, atol=0.0)
+
+
+def test_perturbed_radius_clipped_at_zero():
+    """Возмущённый радиус не уходит ниже 0 (узкое горло почти у оси)"""
+    y = np.linspace(0.0, 20.0, 300)
+    r = 0.02 + 5.0 * np.abs(np.sin(y / 3.0))
+    stack = ProfileStack([(y, r)])
+    volumes = stack.perturbed_volumes(n_samples=400, radius_sigma=0.05, axis_sigma=0.05,
+                                      seed=3, nodes=8)[0]
+
+    # Явный расчёт по точкам с теми же случайными числами
+    y, r = stack.y[0], stack.r[0]
+    weights = np.zeros_like(y)
+    weights[:-1] += 0.5 * np.diff(y)
+    weights[1:] += 0.5 * np.diff(y)
+    basis = np.maximum(0.0, 1.0 - np.abs((y / y[-1] * 7)[:, None] - np.arange(8)))
+    noise = np.random.default_rng([3, 0]).standard_normal((400, 9))
+    radii = r + 0.05 * noise[:, :1] + (0.05 * noise[:, 1:]) @ basis.T
+    assert np.any(radii < 0)
+    expected = np.pi * np.sum(weights * np.maximum(radii, 0.0)**2, axis=1)
+    assert np.allclose(volumes, expected, rtol=1e-12, atol=0.0)
+
+
+def test_spline_exact_clips_negative_radius():
+    """Сплайн уходит ниже нуля у резкого сужения: точный метод его обрезает"""
+    y = np.array([0.0, 2.0, 4.0, 5.0, 6.0, 8.0, 10.0, 12.0])
+    r = np.array([6.0, 6.5, 6.0, 0.3, 0.3, 6.0, 6.5, 6.0])
+    calculator = CorrectVolumeCalculator(y, r)
+    assert calculator.spline(np.linspace(0.0, 12.0, 2001)).min() < 0
+
+    for y_max in (None, 4.7, 5.5, 9.0):
+        exact = calculator.method_spline_exact(y_max)
+        reference = calculator.method_spline_integral(y_max, n_points=20001)
+        assert exact == pytest.approx(reference, rel=1e-8)
+    stacked = CorrectVolumeCalculator.batch_volumes([(y, r)], 'spline_exact')[0]
+    assert stacked == pytest.approx(calculator.method_spline_exact(), rel=1e-12)
@@ -0,0 +1,532 @@
+"""tsetlin.py
+Классификация объёма сосудов по шкале Ю.Б. Цетлина (без зависимостей от GUI)
+"""
+
+import os
+import csv
+import json
+import math
+from bisect import bisect_left
+
+import numpy as np
+
+# ============================================================================
+# КЛАССИФИКАЦИЯ ЦЕТЛИНА (научная шкала)
+# ============================================================================
+
+TSETLIN_CLASSIFICATION_L = [
+    {
+        'group': 'I',
+        'start_l': 0.024,
+        'center_l': 0.035,
+        'end_l': 0.049,
+        'quality_name': 'Супермалый-2',
+        'mobility_class': '1 – «супермалые» (менее 0,097 л)',
+        'description': 'Сосуды для хранения ароматических веществ'
+    },
+    {
+        'group': 'II',
+        'start_l': 0.049,
+        'center_l': 0.071,
+        'end_l': 0.097,
+        'quality_name': 'Супермалый-1',
+        'mobility_class': '1 – «супермалые» (менее 0,097 л)',
+        'description': 'Сосуды для хранения ароматических веществ'
+    },
+    {
+        'group': 'III',
+        'start_l': 0.097,
+        'center_l': 0.137,
+        'end_l': 0.194,
+        'quality_name': 'Очень очень малый',
+        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
+        'description': 'Легко перемещаются одним взрослым человеком'
+    },
+    {
+        'group': 'IV',
+        'start_l': 0.194,
+        'center_l': 0.274,
+        'end_l': 0.389,
+        'quality_name': 'Очень малый',
+        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
+        'description': 'Легко перемещаются одним взрослым человеком'
+    },
+    {
+        'group': 'V',
+        'start_l': 0.389,
+        'center_l': 0.552,
+        'end_l': 0.782,
+        'quality_name': 'Малый',
+        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
+        'description': 'Легко перемещаются одним взрослым человеком'
+    },
+    {
+        'group': 'VI',
+        'start_l': 0.782,
+        'center_l': 1.105,
+        'end_l': 1.565,
+        'quality_name': 'Мало-средний',
+        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
+        'description': 'Легко перемещаются одним взрослым человеком'
+    },
+    {
+        'group': 'VII',
+        'start_l': 1.565,
+        'center_l': 2.210,
+        'end_l': 3.125,
+        'quality_name': 'Средний-1',
+        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
+        'description': 'Легко перемещаются одним взрослым человеком'
+    },
+    {
+        'group': 'VIII',
+        'start_l': 3.125,
+        'center_l': 4.420,
+        'end_l': 6.250,
+        'quality_name': 'Средний-2',
+        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
+        'description': 'Легко перемещаются одним взрослым человеком'
+    },
+    {
+        'group': 'IX',
+        'start_l': 6.250,
+        'center_l': 8.840,
+        'end_l': 12.500,
+        'quality_name': 'Средний-3',
+        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
+        'description': 'Легко перемещаются одним взрослым человеком'
+    },
+    {
+        'group': 'X',
+        'start_l': 12.500,
+        'center_l': 17.680,
+        'end_l': 25.000,
+        'quality_name': 'Средний-4',
+        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
+        'description': 'Легко перемещаются одним взрослым человеком'
+    },
+    {
+        'group': 'XI',
+        'start_l': 25.000,
+        'center_l': 35.360,
+        'end_l': 50.0,
+        'quality_name': 'Больше-средний',
+        'mobility_class': '2 – «мобильные» (0,097 л – 50,0 л)',
+        'description': 'Легко перемещаются одним взрослым человеком'
+    },
+    {
+        'group': 'XII',
+        'start_l': 50.0,
+        'center_l': 70.7,
+        'end_l': 100.0,
+        'quality_name': 'Большой',
+        'mobility_class': '3 – «ограниченно-мобильные» (50,0 л – 200,0 л)',
+        'description': 'Требуют усилий минимум двух человек'
+    },
+    {
+        'group': 'XIII',
+        'start_l': 100.0,
+        'center_l': 141.4,
+        'end_l': 200.0,
+        'quality_name': 'Очень большой',
+        'mobility_class': '3 – «ограниченно-мобильные» (50,0 л – 200,0 л)',
+        'description': 'Требуют усилий минимум двух человек'
+    },
+    {
+        'group': 'XIV',
+        'start_l': 200.0,
+        'center_l': 282.9,
+        'end_l': 400.0,
+        'quality_name': 'Очень очень большой',
+        'mobility_class': '4 – «мало-мобильные» (200,0 л – 800,0 л)',
+        'description': 'Перемещались крайне редко, только пустыми'
+    },
+    {
+        'group': 'XV',
+        'start_l': 400.0,
+        'center_l': 565.8,
+        'end_l': 800.0,
+        'quality_name': 'Гигантский',
+        'mobility_class': '4 – «мало-мобильные» (200,0 л – 800,0 л)',
+        'description': 'Перемещались крайне редко, только пустыми'
+    },
+    {
+        'group': 'XVI',
+        'start_l': 800.0,
+        'center_l': 1131.5,
+        'end_l': 1600.0,
+        'quality_name': 'Супер-1',
+        'mobility_class': '5 – «условно-мобильные» (800,0 л – 3200,0 л)',
+        'description': 'Перемещаются только в незаполненном виде'
+    },
+    {
+        'group': 'XVII',
+        'start_l': 1600.0,
+        'center_l': 2263.0,
+        'end_l': 3200.0,
+        'quality_name': 'Супер-2',
+        'mobility_class': '5 – «условно-мобильные» (800,0 л – 3200,0 л)',
+        'description': 'Перемещаются только в незаполненном виде'
+    },
+    {
+        'group': 'XVIII',
+        'start_l': 3200.0,
+        'center_l': 4526.0,
+        'end_l': 6400.0,
+        'quality_name': 'Сверх-1',
+        'mobility_class': '6 – «стационарные» (3200,0 л – 25000,0 л)',
+        'description': 'В принципе не предполагают перемещения'
+    },
+    {
+        'group': 'XIX',
+        'start_l': 6400.0,
+        'center_l': 9052.0,
+        'end_l': 12800.0,
+        'quality_name': 'Сверх-2',
+        'mobility_class': '6 – «стационарные» (3200,0 л – 25000,0 л)',
+        'description': 'В принципе не предполагают перемещения'
+    },
+    {
+        'group': 'XX',
+        'start_l': 12800.0,
+        'center_l': 18104.0,
+        'end_l': 25000.0,
+        'quality_name': 'Сверх-3',
+        'mobility_class': '6 – «стационарные» (3200,0 л – 25000,0 л)',
+        'description': 'В принципе не предполагают перемещения'
+    }
+]
+
+
+# Доля интервала вокруг центра, в которой качество считается строгим
+STRICT_QUALITY_FRACTION = 0.25
+
+# Уверенность отнесения к группе, ниже которой сосуд считается пограничным
+STABILITY_THRESHOLD = 0.95
+
+# Положение объёма относительно шкалы (ClassificationIndex.classify)
+BELOW_RANGE = -1
+IN_RANGE = 0
+ABOVE_RANGE = 1
+BETWEEN_RANGES = 2
+
+# Подпись объёма, не попавшего ни в одну группу шкалы
+OUT_OF_SCALE = "вне шкалы"
+
+# ============================================================================
+# КОМПИЛИРОВАННАЯ ШКАЛА (пакетная классификация)
+# ============================================================================
+
+class ClassificationIndex:
+    """
+    Шкала классификации, собранная в отсортированные массивы границ.
+
+    classify(volumes_cm3) классифицирует массив объёмов одним вызовом
+    np.searchsorted. Интервалы сортируются по началу и не должны
+    пересекаться; общая граница соседних групп относится к нижней группе
+    (как в последовательном переборе start <= v <= end).
+    """
+
+    def __init__(self, classification):
+        order = sorted(range(len(classification)), key=lambda i: classification[i]['start_l'])
+        self.classification = [classification[i] for i in order]
+        if not self.classification:
+            raise ValueError("Пустая шкала классификации")
+        self.starts = np.array([c['start_l'] for c in self.classification], dtype=np.float64)
+        self.ends = np.array([c['end_l'] for c in self.classification], dtype=np.float64)
+        self.centers = np.array([c['center_l'] for c in self.classification], dtype=np.float64)
+        if np.any(self.ends < self.starts) or np.any(self.starts[1:] < self.ends[:-1]):
+            raise ValueError("Интервалы шкалы классификации пересекаются")
+        self.strict_width = (self.ends - self.starts) * STRICT_QUALITY_FRACTION
+        self._ends_list = self.ends.tolist()
+        self.groups = [c['group'] for c in self.classification]
+
+        # Классы мобильности - коды в порядке первого появления
+        self.mobility_classes = []
+        for c in self.classification:
+            if c['mobility_class'] not in self.mobility_classes:
+                self.mobility_classes.append(c['mobility_class'])
+        self.mobility = np.array([self.mobility_classes.index(c['mobility_class'])
+                                  for c in self.classification], dtype=np.intp)
+
+        # Постоянная часть результата classify_volume по группам
+        self._templates = [{
+            'group': c['group'],
+            'group_name': c['quality_name'],
+            'center_l': c['center_l'],
+            'start_l': c['start_l'],
+            'end_l': c['end_l'],
+            'mobility_class': c['mobility_class'],
+            'description': c['description'],
+        } for c in self.classification]
+
+    def classify(self, volumes_cm3):
+        """
+        Пакетная классификация объёмов (см³). Словарь массивов:
+        group - номер группы в шкале (-1 для нечисловых объёмов),
+        strict - строгое качество, mobility - код класса мобильности
+        (индекс в mobility_classes, -1 для нечисловых и вне групп), position -
+        BELOW_RANGE / IN_RANGE / ABOVE_RANGE / BETWEEN_RANGES (объём в
+        промежутке между группами; group - следующая за промежутком группа).
+        """
+        volume_l = np.asarray(volumes_cm3, dtype=np.float64) / 1000.0
+        finite = np.isfinite(volume_l)
+        index = np.searchsorted(self.ends, volume_l, side='left')
+        above = finite & (index == len(self.ends))
+        index = np.minimum(index, len(self.ends) - 1)
+        in_range = finite & ~above & (volume_l >= self.starts[index])
+        # Объём больше конца предыдущей группы и меньше начала следующей
+        gap = finite & ~above & ~in_range & (index > 0)
+
+        position = np.where(in_range, IN_RANGE, ABOVE_RANGE)
+        position = np.where(finite & ~above & (volume_l < self.starts[0]), BELOW_RANGE, position)
+        position = np.where(gap, BETWEEN_RANGES, position)
+        strict = in_range & (np.abs(volume_l - self.centers[index]) < self.strict_width[index])
+        group = np.where(finite, index, -1)
+        return {
+            'group': group,
+            'strict': strict,
+            'mobility': np.where(finite & ~gap, self.mobility[index], -1),
+            'position': position,
+            'volume_l': volume_l,
+        }
+
+    def membership(self, samples_cm3, threshold=STABILITY_THRESHOLD):
+        """
+        Вероятности принадлежности к группам по распределениям объёма.
+
+        samples_cm3 - массив (N, S): S реализаций объёма каждого из N сосудов
+        (разброс методов, возмущения оцифровки); NaN-реализации не учитываются.
+        Возвращает словарь: probabilities (N, G) - доли реализаций в каждой
+        группе, outside (N,) - доля вне шкалы, modal (N,) - наиболее вероятная
+        группа (-1, если реализаций нет), confidence (N,) - её вероятность,
+        borderline (N,) - confidence < threshold.
+        """
+        samples = np.atleast_2d(np.asarray(samples_cm3, dtype=np.float64))
+        n_rows, n_groups = samples.shape[0], len(self.classification)
+        batch = self.classify(samples.ravel())
+        inside = (batch['position'] == IN_RANGE).reshape(samples.shape)
+        counted = np.isfinite(samples).sum(axis=1)
+
+        rows = np.repeat(np.arange(n_rows), samples.shape[1])
+        cells = rows[inside.ravel()] * n_groups + batch['group'][inside.ravel()]
+        counts = np.bincount(cells, minlength=n_rows * n_groups).reshape(n_rows, n_groups)
+        total = np.where(counted > 0, counted, 1)[:, None]
+        probabilities = counts / total
+        confidence = probabilities.max(axis=1) if n_groups else np.zeros(n_rows)
+        modal = np.where(counted > 0, probabilities.argmax(axis=1), -1)
+        return {
+            'probabilities': probabilities,
+            'outside': np.where(counted > 0, 1.0 - probabilities.sum(axis=1), np.nan),
+            'modal': modal,
+            'confidence': confidence,
+            'borderline': (counted > 0) & (confidence < threshold),
+        }
+
+    def classify_one(self, volume_cm3):
+        """Классификация одного объёма (формат classify_volume) без массивов numpy"""
+        volume_l = volume_cm3 / 1000.0
+        if not math.isfinite(volume_l):
+            return self.result(-1, volume_l, False, ABOVE_RANGE)
+        index = bisect_left(self._ends_list, volume_l)
+        if index == len(self._ends_list):
+            return self.result(index - 1, volume_l, False, ABOVE_RANGE)
+        c = self._templates[index]
+        if volume_l < c['start_l']:
+            return self.result(index, volume_l, False, BELOW_RANGE if index == 0 else BETWEEN_RANGES)
+        strict = abs(volume_l - c['center_l']) < self.strict_width[index]
+        return self.result(index, volume_l, strict, IN_RANGE)
+
+    def result(self, group, volume_l, strict, position):
+        """Словарь классификации одного сосуда (формат classify_volume)"""
+        if group < 0:
+            # Нечисловой объём - как при последовательном переборе: последняя группа
+            group, position, strict = len(self.classification) - 1, ABOVE_RANGE, False
+        if position == BETWEEN_RANGES:
+            return self._gap_result(group, volume_l)
+        result = dict(self._templates[group])
+        if position == BELOW_RANGE:
+            result['group_name'] = f"{result['group_name']} (ниже диапазона)"
+        elif position == ABOVE_RANGE:
+            result['group_name'] = f"{result['group_name']} (выше диапазона)"
+        result['volume_l'] = float(volume_l)
+        result['is_strict_quality'] = bool(strict)
+        return result
+
+    def _gap_result(self, group, volume_l):
+        """Объём в промежутке между группами group-1 и group: вне шкалы"""
+        lower, upper = self._templates[group - 1], self._templates[group]
+        return {
+            'group': OUT_OF_SCALE,
+            'group_name': f"между группами {lower['group']} и {upper['group']}",
+            'center_l': 0.5 * (lower['end_l'] + upper['start_l']),
+            'start_l': lower['end_l'],
+            'end_l': upper['start_l'],
+            'mobility_class': '—',
+            'description': "Объём не входит ни в одну группу шкалы",
+            'volume_l': float(volume_l),
+            'is_strict_quality': False,
+        }
+
+    def results(self, volumes_cm3):
+        """Словари классификации (формат classify_volume) для массива объёмов"""
+        batch = self.classify(volumes_cm3)
+        return [self.result(g, v, s, p) for g, v, s, p in zip(batch['group'].tolist(),
+                                                                batch['volume_l'].tolist(),
+                                                                batch['strict'].tolist(),
+                                                                batch['position'].tolist())]
+
+
+_INDEXES = {}
+
+
+def classification_index(classification=TSETLIN_CLASSIFICATION_L):
+    """Компилированная шкала (строится один раз для каждого списка групп)"""
+    key = id(classification)
+    cached = _INDEXES.get(key)
+    if cached is None or cached[0] is not classification:
+        cached = (classification, ClassificationIndex(classification))
+        _INDEXES[key] = cached
+    return cached[1]
+
+
+def classify_volumes(volumes_cm3, classification=TSETLIN_CLASSIFICATION_L):
+    """Пакетная классификация массива объёмов (см. ClassificationIndex.classify)"""
+    return classification_index(classification).classify(volumes_cm3)
+
+
+def membership_probabilities(samples_cm3, classification=TSETLIN_CLASSIFICATION_L,
+                             threshold=STABILITY_THRESHOLD):
+    """Вероятности групп по распределениям объёма (см. ClassificationIndex.membership)"""
+    return classification_index(classification).membership(samples_cm3, threshold)
+
+
+def classify_volume(volume_cm3, classification=TSETLIN_CLASSIFICATION_L):
+    """Определение качественной группы объема по классификации Цетлина"""
+    return classification_index(classification).classify_one(volume_cm3)
+
+
+# ============================================================================
+# СХЕМЫ КЛАССИФИКАЦИИ ИЗ ФАЙЛОВ
+# ============================================================================
+
+# Обязательные и необязательные поля группы в файле схемы
+SCHEME_REQUIRED_FIELDS = ('group', 'start_l', 'end_l')
+SCHEME_OPTIONAL_FIELDS = ('center_l', 'quality_name', 'mobility_class', 'description')
+
+
+class ClassificationScheme:
+    """
+    Именованная шкала классификации (Цетлина или региональная типология).
+    Индекс интервалов (ClassificationIndex) строится при первом обращении.
+    """
+
+    def __init__(self, name, classification, source=None):
+        self.name = name
+        self.classification = classification
+        self.source = source
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = ClassificationIndex(self.classification)
+        return self._index
+
+    def labels(self, volumes_cm3):
+        """
+        Подписи групп для массива объёмов: "группа (качество)";
+        объёмы вне шкалы (в том числе в промежутках между группами)
+        и нечисловые - OUT_OF_SCALE
+        """
+        batch = self.index.classify(volumes_cm3)
+        names = [f"{c['group']} ({c['quality_name']})" if c['quality_name'] != c['group']
+                 else c['group'] for c in self.index.classification]
+        return [names[group] if position == IN_RANGE and group >= 0 else OUT_OF_SCALE
+                for group, position in zip(batch['group'].tolist(), batch['position'].tolist())]
+
+
+TSETLIN_SCHEME = ClassificationScheme('Цетлин', TSETLIN_CLASSIFICATION_L)
+
+
+def _scheme_group(record, line):
+    """Группа схемы из записи файла (словаря полей) с проверкой значений"""
+    missing = [field for field in SCHEME_REQUIRED_FIELDS if record.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Группа {line}: нет полей {', '.join(missing)}")
+    try:
+        start = float(record['start_l'])
+        end = float(record['end_l'])
+        center = record.get('center_l')
+        if center not in (None, ''):
+            center = float(center)
+        elif start > 0:
+            # Центр по умолчанию - среднее геометрическое границ, как в шкале Цетлина
+            center = math.sqrt(start * end)
+        else:
+            center = 0.5 * (start + end)
+    except (TypeError, ValueError):
+        raise ValueError(f"Группа {line}: границы должны быть числами (литры)")
+    if not start < end:
+        raise ValueError(f"Группа {line}: начало интервала должно быть меньше конца")
+    group = str(record['group']).strip()
+    return {
+        'group': group,
+        'start_l': start,
+        'center_l': center,
+        'end_l': end,
+        'quality_name': str(record.get('quality_name') or group).strip(),
+        'mobility_class': str(record.get('mobility_class') or '').strip(),
+        'description': str(record.get('description') or '').strip(),
+    }
+
+
+def load_scheme(path, name=None):
+    """
+    Загрузка схемы классификации из JSON или CSV.
+
+    JSON - список групп или объект {"name": ..., "groups": [...]};
+    CSV - таблица с заголовком. Поля группы: group, start_l, end_l
+    (литры) и необязательные center_l, quality_name, mobility_class,
+    description. Имя схемы по умолчанию - имя файла без расширения.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    scheme_name = None
+    if extension == '.json':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            scheme_name = data.get('name')
+            data = data.get('groups')
+        if not isinstance(data, list):
+            raise ValueError("JSON схемы: ожидается список групп или объект с полем 'groups'")
+        records = data
+    elif extension == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+            except csv.Error:
+                dialect = csv.excel
+            records = [{(k or '').strip(): v for k, v in row.items()}
+                       for row in csv.DictReader(f, dialect=dialect)]
+    else:
+        raise ValueError(f"Неизвестный формат схемы: {extension or path} (нужен .json или .csv)")
+
+    if not records:
+        raise ValueError("Схема не содержит групп")
+    classification = [_scheme_group(record, line) for line, record in enumerate(records, 1)]
+    scheme = ClassificationScheme(name or scheme_name or os.path.splitext(os.path.basename(path))[0],
+                                  classification, source=path)
+    scheme.index  # Проверка интервалов при загрузке
+    return scheme
+
+
+def classify_schemes(volumes_cm3, schemes):
+    """
+    Классификация массива объёмов сразу по нескольким схемам:
+    {имя схемы: результат ClassificationIndex.classify}
+    """
+    volumes_cm3 = np.asarray(volumes_cm3, dtype=np.float64)
+    return {scheme.name: scheme.index.classify(volumes_cm3) for scheme in schemes}
@@ -0,0 +1,1177 @@
+"""volume_calc.py
+Расчёт объёма сосуда по профилю (без зависимостей от GUI)
+"""
+
+import itertools
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+from scipy.interpolate import interp1d, CubicSpline
+from scipy.integrate import simpson, trapezoid, cumulative_trapezoid
+
+try:
+    from scipy.integrate import cumulative_simpson
+    HAVE_CUMULATIVE_SIMPSON = True
+except ImportError:  # scipy < 1.12
+    HAVE_CUMULATIVE_SIMPSON = False
+
+ADAPTIVE_REL_TOL = 1e-6     # Относительный допуск адаптивного метода по умолчанию
+ADAPTIVE_MAX_DEPTH = 30     # Предел делений одного интервала
+
+# ============================================================================
+# КОРРЕКТНЫЙ РАСЧЁТ ОБЪЁМА (ИСПРАВЛЕННЫЙ)
+# ============================================================================
+
+class CorrectVolumeCalculator:
+    """Исправленный калькулятор объёма с разными методами"""
+    
+    def __init__(self, y_coords, r_coords, rel_tol=ADAPTIVE_REL_TOL):
+        # Относительный допуск адаптивного метода ('adaptive')
+        self.rel_tol = rel_tol
+        self.y = np.asarray(y_coords, dtype=np.float64)
+        self.r = np.asarray(r_coords, dtype=np.float64)
+        
+        # Убираем нулевые и отрицательные радиусы
+        self.r = np.maximum(self.r, 0.001)
+        
+        # Сортируем по высоте
+        sort_idx = np.argsort(self.y)
+        self.y = self.y[sort_idx]
+        self.r = self.r[sort_idx]
+        
+        # Убираем дубликаты высот
+        unique_y, unique_idx = np.unique(self.y, return_index=True)
+        self.y = unique_y
+        self.r = self.r[unique_idx]
+        
+        # Проверяем данные
+        if len(self.y) < 2:
+            raise ValueError("Слишком мало точек для расчета объема")
+        
+        # Убедимся, что высота начинается с 0
+        if self.y[0] > 0.01:
+            self.y = np.insert(self.y, 0, 0.0)
+            self.r = np.insert(self.r, 0, self.r[0])
+        
+        # Инициализируем интерполяторы
+        self._init_interpolators()
+        
+        # Таблицы накопленного объема по методам (см. volume_table)
+        self._tables = {}
+        # Накопленные интегралы сплайна для method_spline_exact (при первом вызове)
+        self._spline_cumulative = None
+        # Принятые интервалы адаптивного метода для полной высоты
+        self._adaptive_segments = None
+        
+        # Диагностика
+        print(f"\nИнициализация калькулятора:")
+        print(f"  Количество точек: {len(self.y)}")
+        print(f"  Высота: от {self.y[0]:.2f} до {self.y[-1]:.2f} см")
+        print(f"  Радиус: от {self.r[0]:.2f} до {self.r[-1]:.2f} см")
+    
+    def _init_interpolators(self):
+        """Инициализация интерполяторов с проверкой"""
+        try:
+            # Для сплайна нужно минимум 4 точки
+            if len(self.y) >= 4:
+                self.spline = CubicSpline(self.y, self.r, bc_type='natural')
+                print("  Используется кубический сплайн")
+            else:
+                self.spline = interp1d(self.y, self.r, kind='cubic', 
+                                     fill_value='extrapolate', bounds_error=False)
+                print("  Используется кубическая интерполяция (мало точек)")
+        except Exception as e:
+            print(f"  Ошибка создания сплайна: {e}")
+            print("  Используется линейная интерполяция")
+            self.spline = interp1d(self.y, self.r, kind='linear', 
+                                 fill_value='extrapolate', bounds_error=False)
+        
+        # Линейный интерполятор для некоторых методов
+        self.linear = interp1d(self.y, self.r, kind='linear', 
+                             fill_value='extrapolate', bounds_error=False)
+    
+    def method_disks(self, y_max=None):
+        """
+        Метод дисков - интегрирование площадей кругов
+        Использует исходные точки без интерполяции
+        """
+        if y_max is None:
+            y_max = self.y[-1]
+        
+        # Находим индекс последней точки до y_max
+        mask = self.y <= y_max
+        y_slice = self.y[mask]
+        r_slice = self.r[mask]
+        
+        if len(y_slice) < 2:
+            return 0.0
+        
+        # Если y_max не совпадает с последней точкой, добавляем её
+        if y_max > y_slice[-1] and y_max < self.y[-1]:
+            # Интерполируем радиус для y_max
+            r_max = float(self.linear(y_max))
+            y_slice = np.append(y_slice, y_max)
+            r_slice = np.append(r_slice, r_max)
+        
+        # Площади дисков
+        areas = np.pi * r_slice**2
+        
+        # Интегрирование методом трапеций по исходным точкам
+        return trapezoid(areas, y_slice)
+    
+    def method_frustums(self, y_max=None):
+        """
+        Метод усеченных конусов
+        Объем между двумя сечениями: V = π/3 * h * (r1² + r1*r2 + r2²)
+        """
+        if y_max is None:
+            y_max = self.y[-1]
+        
+        # Находим индекс последней точки до y_max
+        mask = self.y <= y_max
+        y_slice = self.y[mask]
+        r_slice = self.r[mask]
+        
+        if len(y_slice) < 2:
+            return 0.0
+        
+        # Если y_max не совпадает с последней точкой
+        if y_max > y_slice[-1]:
+            r_max = float(self.linear(y_max))
+            y_slice = np.append(y_slice, y_max)
+            r_slice = np.append(r_slice, r_max)
+        
+        h = np.diff(y_slice)
+        r1 = r_slice[:-1]
+        r2 = r_slice[1:]
+        cones = np.where(h > 0, (np.pi / 3.0) * h * (r1**2 + r1 * r2 + r2**2), 0.0)
+        
+        # cumsum складывает по порядку, как прежний цикл (np.sum - попарно)
+        return np.cumsum(cones)[-1]
+    
+    def method_trapezoidal(self, y_max=None, n_points=2000):
+        """
+        Метод трапеций с интерполяцией
+        Большое количество точек для точности
+        """
+        if y_max is None:
+            y_max = self.y[-1]
+        
+        # Создаем равномерную сетку с большим количеством точек
+        y_fine = np.linspace(0, y_max, n_points)
+        r_fine = self.spline(y_fine)
+        r_fine = np.maximum(r_fine, 0.0)  # Защита от отрицательных радиусов
+        
+        # Площади сечений
+        areas = np.pi * r_fine**2
+        
+        # Интегрирование методом трапеций
+        return trapezoid(areas, y_fine)
+    
+    def method_simpson(self, y_max=None, n_points=501):
+        """
+        Метод Симпсона (парабол)
+        Нечетное количество точек для точности
+        """
+        if y_max is None:
+            y_max = self.y[-1]
+        
+        # Для метода Симпсона желательно нечетное число точек
+        if n_points % 2 == 0:
+            n_points += 1
+        
+        y_fine = np.linspace(0, y_max, n_points)
+        r_fine = self.spline(y_fine)
+        r_fine = np.maximum(r_fine, 0.0)
+        
+        # Площади сечений
+        areas = np.pi * r_fine**2
+        
+        # Интегрирование методом Симпсона
+        return simpson(areas, y_fine)
+    
+    def method_spline_integral(self, y_max=None, n_points=1001):
+        """
+        Интеграл сплайна с аналитическим интегрированием
+        Самый точный метод для гладких профилей
+        """
+        if y_max is None:
+            y_max = self.y[-1]
+        
+        # Для точности используем много точек
+        y_fine = np.linspace(0, y_max, n_points)
+        r_fine = self.spline(y_fine)
+        r_fine = np.maximum(r_fine, 0.0)
+        
+        # Площади сечений
+        areas = np.pi * r_fine**2
+        
+        # Используем метод Симпсона для максимальной точности
+        return simpson(areas, y_fine)
+    
+    def method_spline_exact(self, y_max=None):
+        """
+        Точный интеграл π·r(y)² по коэффициентам кубического сплайна.
+        На каждом сегменте r(t) = c3 + c2·t + c1·t² + c0·t³, квадрат -
+        многочлен 6-й степени, интеграл которого берётся аналитически;
+        сегмент, содержащий y_max, интегрируется частично.
+        Как и в сеточных методах, отрицательный радиус сплайна считается нулём:
+        на сегментах, где r(t) < 0, интегрируются только участки между корнями
+        с r > 0 (см. _positive_square_integral).
+        """
+        if y_max is None:
+            y_max = self.y[-1]
+        
+        if not isinstance(self.spline, CubicSpline):
+            # Меньше 4 точек - сплайна нет, считаем по сетке
+            return self.method_spline_integral(y_max)
+        
+        if self._spline_cumulative is None:
+            # Накопленные интегралы сегментов - один раз на профиль
+            full = np.pi * self._positive_square_integral(self.spline.c, np.diff(self.spline.x))
+            self._spline_cumulative = np.concatenate(([0.0], np.cumsum(full)))
+        
+        knots = self.spline.x
+        y_max = min(max(y_max, knots[0]), knots[-1])
+        i = min(int(np.searchsorted(knots, y_max, side='right')) - 1, len(knots) - 2)
+        partial = np.pi * self._positive_square_integral(self.spline.c[:, i], y_max - knots[i])
+        return float(self._spline_cumulative[i] + partial)
+    
+    @staticmethod
+    def _square_coefficients(coefficients):
+        """
+        Коэффициенты r(t)² по коэффициентам кубик (4, ...) в порядке
+        CubicSpline.c, массив (7, ...); строка k - коэффициент при t^k
+        """
+        # Коэффициенты по возрастанию степени: a[k] при t^k
+        a = coefficients[::-1]
+        # Квадрат многочлена: свёртка коэффициентов, по всем сегментам сразу
+        squared = np.zeros((7,) + a.shape[1:])
+        for j in range(4):
+            for k in range(4):
+                squared[j + k] += a[j] * a[k]
+        return squared
+    
+    @staticmethod
+    def _positive_square_integral(coefficients, h):
+        """
+        ∫₀ʰ max(r(t), 0)² dt для кубик с коэффициентами (4, ...) в порядке
+        CubicSpline.c и длинами h той же формы, что сегменты. Почти везде
+        r > 0 и интеграл берётся по коэффициентам квадрата целиком; сегменты,
+        где оценка снизу r0 - |r1|·h - |r2|·h² - |r3|·h³ отрицательна,
+        делятся корнями r(t) и интегрируются только участки с r > 0.
+        """
+        coefficients = np.asarray(coefficients, dtype=np.float64)
+        single = coefficients.ndim == 1
+        if single:
+            coefficients = coefficients[:, None]
+        h = np.broadcast_to(np.asarray(h, dtype=np.float64), coefficients.shape[1:])
+        squared = CorrectVolumeCalculator._square_coefficients(coefficients)
+        result = np.array(CorrectVolumeCalculator._integrate_squared(squared, h), dtype=np.float64)
+        
+        a = coefficients[::-1]
+        bound = a[0] - np.abs(a[1]) * h - np.abs(a[2]) * h**2 - np.abs(a[3]) * h**3
+        for index in zip(*np.nonzero(bound < 0)):
+            segment = coefficients[(slice(None),) + index]
+            length = float(h[index])
+            roots = np.roots(segment)
+            roots = np.sort(roots.real[(np.abs(roots.imag) < 1e-12)
+                                        & (roots.real > 0.0) & (roots.real < length)])
+            edges = np.concatenate(([0.0], roots, [length]))
+            middle = 0.5 * (edges[:-1] + edges[1:])
+            positive = np.polyval(segment, middle) > 0
+            column = squared[(slice(None),) + index]
+            integral = CorrectVolumeCalculator._integrate_squared
+            result[index] = sum(integral(column, b) - integral(column, a0)
+                                for a0, b, keep in zip(edges[:-1], edges[1:], positive) if keep)
+        return float(result[0]) if single else result
+    
+    @staticmethod
+    def _integrate_squared(squared, h):
+        """∫₀ʰ r(t)² dt по коэффициентам квадрата (для одного или всех сегментов)"""
+        powers = np.arange(1, 8).reshape((7,) + (1,) * np.ndim(h))
+        return np.sum(squared * np.power(h, powers) / powers, axis=0)
+    
+    def _area(self, y):
+        """Площадь сечения по сплайну (отрицательный радиус - ноль)"""
+        return np.pi * np.maximum(self.spline(y), 0.0)**2
+    
+    def method_adaptive(self, y_max=None, rel_tol=None):
+        """
+        Адаптивный метод Симпсона с относительным допуском rel_tol
+        (по умолчанию self.rel_tol): интервалы между узлами профиля делятся
+        только там, где оценка погрешности больше допуска.
+        Возвращает словарь: volume, error (оценка погрешности, см³),
+        evaluations (вычислений сплайна), converged.
+        """
+        if y_max is None:
+            y_max = self.y[-1]
+        rel_tol = self.rel_tol if rel_tol is None else rel_tol
+        
+        if y_max <= 0:
+            return {'volume': 0.0, 'error': 0.0, 'evaluations': 0, 'converged': True}
+        
+        inside = self.y[(self.y > 0) & (self.y < y_max)]
+        edges = np.unique(np.concatenate(([0.0], inside, [y_max])))
+        result = adaptive_simpson(lambda rows, y: self._area(y),
+                                  np.zeros(len(edges) - 1, dtype=np.intp),
+                                  edges[:-1], edges[1:], 1, rel_tol)
+        if y_max == self.y[-1] and rel_tol == self.rel_tol:
+            self._adaptive_segments = result['segments']
+        return {
+            'volume': float(result['volume'][0]),
+            'error': float(result['error'][0]),
+            'evaluations': int(result['evaluations'][0]),
+            'converged': bool(result['converged'][0]),
+        }
+    
+    def calculate_all_methods(self, y_max=None):
+        """
+        Вычисление объема всеми методами с диагностикой
+        """
+        if y_max is None:
+            y_max = self.y[-1]
+        
+        print(f"\nРАСЧЕТ ОБЪЕМА ДО ВЫСОТЫ {y_max:.2f} см:")
+        print("-" * 60)
+        
+        methods = {
+            'disks': ('Метод дисков (исходные точки)', self.method_disks),
+            'frustums': ('Метод усеченных конусов', self.method_frustums),
+            'trapezoidal': ('Метод трапеций (2000 точек)', 
+                          lambda y: self.method_trapezoidal(y, 2000)),
+            'simpson': ('Метод Симпсона (501 точка)', 
+                       lambda y: self.method_simpson(y, 501)),
+            'spline': ('Интеграл сплайна (1001 точка, рекоменд.)', 
+                      lambda y: self.method_spline_integral(y, 1001)),
+            'spline_exact': ('Точный интеграл сплайна', self.method_spline_exact),
+            'adaptive': (f'Адаптивный Симпсон (допуск {self.rel_tol:g})',
+                         lambda y: self.method_adaptive(y)['volume'])
+        }
+        
+        results = {}
+        
+        # Сначала вычисляем все объемы
+        for name, (description, method) in methods.items():
+            try:
+                results[name] = method(y_max)
+            except Exception as e:
+                results[name] = None
+                print(f"❌ Ошибка в методе '{description}': {e}")
+        
+        # Выводим результаты
+        for name, (description, _) in methods.items():
+            if results[name] is not None:
+                print(f"✅ {description}:")
+                print(f"   Объем: {results[name]/1000:.6f} л")
+                print(f"   Объем: {results[name]:.2f} см³")
+        
+        # Сравниваем с эталонным методом (сплайн)
+        if results['spline'] is not None:
+            print(f"\n📊 СРАВНЕНИЕ С МЕТОДОМ СПЛАЙНА:")
+            print("-" * 40)
+            
+            for name in ['disks', 'frustums', 'trapezoidal', 'simpson', 'spline_exact', 'adaptive']:
+                if results[name] is not None:
+                    diff = results[name] - results['spline']
+                    diff_percent = (diff / results['spline']) * 100
+                    diff_abs = abs(diff_percent)
+                    
+                    if diff_abs < 0.1:
+                        status = "✓ Очень близко"
+                    elif diff_abs < 1.0:
+                        status = "✓ Близко"
+                    elif diff_abs < 5.0:
+                        status = "⚠ Приемлемо"
+                    else:
+                        status = "⚠ Заметная разница"
+                    
+                    print(f"{methods[name][0]}:")
+                    print(f"  Разница: {diff:+.2f} см³ ({diff_percent:+.3f}%)")
+                    print(f"  Статус: {status}")
+        
+        return results
+    
+    def calculate_volume(self, method_name, y_max=None):
+        """Вычисление объема указанным методом с FIX для методов"""
+        if y_max is None:
+            y_max = self.y[-1]
+        
+        # ВАЖНОЕ ИСПРАВЛЕНИЕ: Используем правильные методы
+        if method_name == 'disks':
+            return self.method_disks(y_max)
+        elif method_name == 'frustums':
+            return self.method_frustums(y_max)
+        elif method_name == 'trapezoidal':
+            return self.method_trapezoidal(y_max, n_points=2000)
+        elif method_name == 'simpson':
+            return self.method_simpson(y_max, n_points=501)
+        elif method_name == 'spline':
+            return self.method_spline_integral(y_max, n_points=1001)
+        elif method_name == 'spline_exact':
+            return self.method_spline_exact(y_max)
+        elif method_name == 'adaptive':
+            return self.method_adaptive(y_max)['volume']
+        else:
+            # По умолчанию используем метод дисков
+            return self.method_disks(y_max)
+    
+    def volume_table(self, method_name):
+        """
+        Накопленный объем V(y) выбранным методом (VolumeTable).
+        Строится один раз на метод; дальше объем до уровня, уровень по
+        объему и по проценту заполнения - поиск по таблице.
+        """
+        table = self._tables.get(method_name)
+        if table is None:
+            table = self._build_volume_table(method_name)
+            self._tables[method_name] = table
+        return table
+    
+    def _build_volume_table(self, method_name):
+        """Сетка высот, площади сечений и накопленный объем для метода"""
+        if method_name in ('disks', 'frustums'):
+            # Исходные точки, как в method_disks / method_frustums
+            y_grid = self.y
+            r_grid = self.r
+        elif method_name == 'adaptive':
+            # Принятые интервалы адаптивного метода
+            self.method_adaptive()
+            rows, a, b, volumes = self._adaptive_segments
+            order = np.argsort(a)
+            y_grid = np.append(a[order], b[order][-1])
+            cumulative = np.concatenate(([0.0], np.cumsum(volumes[order])))
+            return VolumeTable(y_grid, self._area(y_grid), cumulative, method_name)
+        elif method_name == 'spline_exact' and isinstance(self.spline, CubicSpline):
+            # Узлы сплайна: накопленный объем по точным интегралам сегментов
+            self.method_spline_exact()
+            y_grid = self.spline.x
+            areas = np.pi * self.spline(y_grid)**2
+            return VolumeTable(y_grid, areas, self._spline_cumulative, method_name)
+        else:
+            n_points = {'trapezoidal': 2000, 'simpson': 501}.get(method_name, 1001)
+            if method_name == 'simpson' and n_points % 2 == 0:
+                n_points += 1
+            y_grid = np.linspace(0, self.y[-1], n_points)
+            r_grid = np.maximum(self.spline(y_grid), 0.0)
+        
+        areas = np.pi * r_grid**2
+        h = np.diff(y_grid)
+        if method_name == 'frustums':
+            r1, r2 = r_grid[:-1], r_grid[1:]
+            segment_volumes = (np.pi / 3.0) * h * (r1**2 + r1 * r2 + r2**2)
+            cumulative = np.concatenate(([0.0], np.cumsum(segment_volumes)))
+        elif method_name in ('simpson', 'spline') and HAVE_CUMULATIVE_SIMPSON:
+            cumulative = cumulative_simpson(areas, x=y_grid, initial=0.0)
+        else:
+            cumulative = cumulative_trapezoid(areas, y_grid, initial=0.0)
+        
+        return VolumeTable(y_grid, areas, cumulative, method_name)
+    
+    @staticmethod
+    def batch_volumes(profiles, method_name):
+        """
+        Объёмы набора профилей [(y, r), ...] методом method_name одним
+        пакетом (ProfileStack); тот же результат, что calculate_volume
+        для каждого профиля
+        """
+        return ProfileStack(profiles).volumes(method_name)
+    
+    def wall_volumes(self, y_inner=None, r_inner=None):
+        """
+        Объёмы двухстенного сосуда: текущий профиль - наружная стенка,
+        (y_inner, r_inner) - внутренняя в той же системе высот
+        """
+        return calculate_wall_volumes(self.y, self.r, y_inner, r_inner)
+
+
+# ============================================================================
+# ТАБЛИЦА НАКОПЛЕННОГО ОБЪЁМА
+# ============================================================================
+
+class VolumeTable:
+    """
+    Накопленный объем V(y) на сетке высот.
+
+    Между узлами площадь сечения считается линейной, а прирост объема
+    сегмента масштабируется к табличному, поэтому V(y) непрерывна и
+    монотонна и в узлах совпадает с выбранным методом. Прямой и обратный
+    поиск - двоичный поиск по сетке и решение квадратного уравнения в сегменте.
+    """
+    
+    def __init__(self, y, areas, cumulative, method=None):
+        self.y = np.asarray(y, dtype=np.float64)
+        self.areas = np.asarray(areas, dtype=np.float64)
+        # Защита от отрицательных приростов (погрешность квадратуры)
+        self.cumulative = np.maximum.accumulate(np.asarray(cumulative, dtype=np.float64))
+        self.method = method
+        self.total = float(self.cumulative[-1])
+    
+    def _segment(self, index):
+        i = np.clip(index, 0, len(self.y) - 2)
+        return i, self.y[i + 1] - self.y[i], self.areas[i], self.areas[i + 1]
+    
+    def volume_at(self, level):
+        """Объем до уровня level (скаляр или массив), см³"""
+        level = np.clip(np.asarray(level, dtype=np.float64), self.y[0], self.y[-1])
+        i, h, a1, a2 = self._segment(np.searchsorted(self.y, level, side='right') - 1)
+        t = np.divide(level - self.y[i], h, out=np.zeros_like(level), where=h > 0)
+        # Доля прироста сегмента при линейной площади: ∫a(t)dt / ∫a(t)dt на [0, 1]
+        mean_area = 0.5 * (a1 + a2)
+        partial = a1 * t + 0.5 * (a2 - a1) * t**2
+        fraction = np.divide(partial, mean_area, out=t.copy(), where=mean_area > 0)
+        volume = self.cumulative[i] + fraction * (self.cumulative[i + 1] - self.cumulative[i])
+        return float(volume) if volume.ndim == 0 else volume
+    
+    def level_for_volume(self, volume):
+        """Уровень, до которого объем равен volume (скаляр или массив), см"""
+        volume = np.clip(np.asarray(volume, dtype=np.float64), 0.0, self.total)
+        i, h, a1, a2 = self._segment(np.searchsorted(self.cumulative, volume, side='left') - 1)
+        delta = self.cumulative[i + 1] - self.cumulative[i]
+        fraction = np.divide(volume - self.cumulative[i], delta,
+                             out=np.zeros_like(volume), where=delta > 0)
+        # a1·t + (a2 - a1)·t²/2 = fraction·(a1 + a2)/2 относительно t
+        c = fraction * 0.5 * (a1 + a2)
+        da = a2 - a1
+        disc = np.sqrt(np.maximum(a1**2 + 2.0 * da * c, 0.0))
+        denom = a1 + disc
+        t = np.divide(2.0 * c, denom, out=fraction.copy(), where=denom > 0)
+        level = self.y[i] + np.clip(t, 0.0, 1.0) * h
+        return float(level) if level.ndim == 0 else level
+    
+    def level_for_percent(self, percent):
+        """Уровень заполнения на percent процентов полного объема, см"""
+        return self.level_for_volume(np.asarray(percent, dtype=np.float64) / 100.0 * self.total)
+    
+    def percent_at(self, level):
+        """Процент заполнения до уровня level"""
+        if self.total <= 0:
+            return 0.0
+        return self.volume_at(level) / self.total * 100.0
+
+
+# ============================================================================
+# ОБЪЁМЫ ДВУХСТЕННОГО ПРОФИЛЯ
+# ============================================================================
+
+def calculate_wall_volumes(y_outer, r_outer, y_inner=None, r_inner=None):
+    """
+    Объём по наружной поверхности (envelope), вместимость по внутренней
+    стенке (capacity) и объём керамического тела (body = envelope - capacity).
+
+    Обе стенки интегрируются одним вызовом trapezoid по массиву (2, n);
+    более короткая сетка дополняется повтором последней точки (сегменты
+    нулевой высоты не меняют интеграл). Без внутренней стенки
+    capacity и body равны None.
+    """
+    y_outer = np.asarray(y_outer, dtype=np.float64)
+    r_outer = np.asarray(r_outer, dtype=np.float64)
+    if y_inner is None or r_inner is None or len(y_inner) < 2:
+        envelope = float(trapezoid(np.pi * r_outer**2, y_outer))
+        return {'envelope': envelope, 'capacity': None, 'body': None}
+    
+    y_inner = np.asarray(y_inner, dtype=np.float64)
+    r_inner = np.asarray(r_inner, dtype=np.float64)
+    n = max(len(y_outer), len(y_inner))
+    heights = np.vstack([np.pad(y, (0, n - len(y)), mode='edge') for y in (y_outer, y_inner)])
+    radii = np.vstack([np.pad(r, (0, n - len(r)), mode='edge') for r in (r_outer, r_inner)])
+    radii = np.maximum(radii, 0.0)
+    envelope, capacity = trapezoid(np.pi * radii**2, heights, axis=1)
+    return {
+        'envelope': float(envelope),
+        'capacity': float(capacity),
+        'body': float(envelope - capacity)
+    }
+
+
+# ============================================================================
+# АДАПТИВНОЕ ИНТЕГРИРОВАНИЕ
+# ============================================================================
+
+def adaptive_simpson(evaluate, rows, a, b, n_rows, rel_tol=ADAPTIVE_REL_TOL,
+                     max_depth=ADAPTIVE_MAX_DEPTH, tags=None):
+    """
+    Адаптивный метод Симпсона сразу для многих интервалов и профилей.
+
+    evaluate(rows, y) - площадь сечения профилей rows на высотах y (массивы).
+    rows, a, b - начальное разбиение: номер профиля и границы интервала.
+    Интервал делится пополам, пока поправка Ричардсона (S₂ - S₁)/15 больше
+    доли допуска rel_tol·|V|, пропорциональной его длине; на каждом проходе
+    все активные интервалы всех профилей вычисляются одним вызовом evaluate.
+    tags - метки интервалов, которые передаются в evaluate вместо rows
+    (например, номер сегмента сплайна); при делении наследуются.
+
+    Возвращает словарь массивов по профилям: volume, error (сумма оценок
+    погрешности принятых интервалов), evaluations (вычислений функции),
+    converged, а также принятые интервалы (segments: rows, a, b, volume).
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    tags = rows if tags is None else np.asarray(tags, dtype=np.intp)
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    m = 0.5 * (a + b)
+    fa, fm, fb = np.split(evaluate(np.tile(tags, 3), np.concatenate((a, m, b))), 3)
+    whole = (b - a) / 6.0 * (fa + 4.0 * fm + fb)
+    
+    evaluations = np.bincount(rows, minlength=n_rows) * 3.0
+    estimate = np.bincount(rows, weights=whole, minlength=n_rows)
+    length = np.bincount(rows, weights=b - a, minlength=n_rows)
+    # Допуск на единицу высоты для каждого профиля
+    density = rel_tol * np.abs(estimate) / np.where(length > 0, length, 1.0)
+    
+    volume = np.zeros(n_rows)
+    error = np.zeros(n_rows)
+    converged = np.ones(n_rows, dtype=bool)
+    accepted = []
+    
+    depth = 0
+    while len(rows):
+        left_mid = 0.5 * (a + m)
+        right_mid = 0.5 * (m + b)
+        fl, fr = np.split(evaluate(np.tile(tags, 2), np.concatenate((left_mid, right_mid))), 2)
+        evaluations += np.bincount(rows, minlength=n_rows) * 2.0
+        
+        left = (m - a) / 6.0 * (fa + 4.0 * fl + fm)
+        right = (b - m) / 6.0 * (fm + 4.0 * fr + fb)
+        correction = (left + right - whole) / 15.0
+        depth += 1
+        done = np.abs(correction) <= density[rows] * (b - a)
+        if depth >= max_depth:
+            converged[rows[~done]] = False
+            done[:] = True
+        
+        refined = left + right + correction
+        volume += np.bincount(rows[done], weights=refined[done], minlength=n_rows)
+        error += np.bincount(rows[done], weights=np.abs(correction[done]), minlength=n_rows)
+        accepted.append((rows[done], a[done], b[done], refined[done]))
+        
+        # Незавершённые интервалы делятся пополам
+        keep = ~done
+        rows = np.concatenate((rows[keep], rows[keep]))
+        tags = np.concatenate((tags[keep], tags[keep]))
+        a, m, b = (np.concatenate((a[keep], m[keep])), np.concatenate((left_mid[keep], right_mid[keep])),
+                   np.concatenate((m[keep], b[keep])))
+        fa, fm, fb = (np.concatenate((fa[keep], fm[keep])), np.concatenate((fl[keep], fr[keep])),
+                      np.concatenate((fm[keep], fb[keep])))
+        whole = np.concatenate((left[keep], right[keep]))
+    
+    segments = tuple(np.concatenate(parts) for parts in zip(*accepted)) if accepted else None
+    return {
+        'volume': volume,
+        'error': error,
+        'evaluations': evaluations.astype(np.int64),
+        'converged': converged,
+        'segments': segments,
+    }
+
+
+# ============================================================================
+# ПАКЕТНЫЙ РАСЧЁТ ОБЪЁМА
+# ============================================================================
+
+# Строк в одном блоке пакетных расчётов (ограничивает память)
+BATCH_CHUNK_ROWS = 512
+# Точек сетки в одном блоке методов на плотной сетке (блок помещается в кэш процессора)
+GRID_CHUNK_POINTS = 1 << 17
+
+# Оценка неопределённости объёма (см. ProfileStack.perturbed_volumes)
+UNCERTAINTY_SAMPLES = 2000          # Реализаций на сосуд
+UNCERTAINTY_RADIUS_SIGMA = 0.05     # Ошибка линии чертежа, см (±0.5 мм)
+UNCERTAINTY_AXIS_SIGMA = 0.05       # Ошибка положения оси, см
+UNCERTAINTY_NODES = 8               # Узлов по высоте для ошибки линии
+UNCERTAINTY_PERCENTILES = (2.5, 97.5)
+
+
+class ProfileStack:
+    """
+    Профили, уложенные в матрицы (N, L) для расчёта объёма всех сосудов
+    сразу. Подготовка точек та же, что в CorrectVolumeCalculator (радиус не
+    меньше 0.001, сортировка, начало с нулевой высоты). Короткие профили
+    дополняются повтором последней точки: сегменты нулевой высоты не дают
+    вклада в интегралы, а mask отмечает настоящие точки.
+
+    volumes(method) возвращает массив объёмов (N,) теми же методами, что
+    CorrectVolumeCalculator.calculate_volume; для методов на сплайне
+    естественные кубические сплайны строятся для всех строк одновременно.
+    Профили, которые не удалось подготовить, получают NaN.
+    """
+    
+    def __init__(self, profiles, rel_tol=ADAPTIVE_REL_TOL):
+        self.rel_tol = rel_tol
+        prepared = [self._prepare(y, r) for y, r in profiles]
+        self.count = len(prepared)
+        self.valid = np.array([p is not None for p in prepared], dtype=bool)
+        lengths = np.array([len(p[0]) if p is not None else 2 for p in prepared], dtype=np.intp)
+        self.lengths = lengths
+        width = int(lengths.max()) if self.count else 2
+        
+        self.y = np.zeros((self.count, width))
+        self.r = np.full((self.count, width), 0.001)
+        self.mask = np.arange(width)[None, :] < lengths[:, None]
+        for row, p in enumerate(prepared):
+            if p is None:
+                continue
+            n = len(p[0])
+            self.y[row, :n] = p[0]
+            self.r[row, :n] = p[1]
+            self.y[row, n:] = p[0][-1]
+            self.r[row, n:] = p[1][-1]
+        
+        self.h = np.diff(self.y, axis=1)
+        self.height = self.y[np.arange(self.count), lengths - 1] if self.count else np.zeros(0)
+        self._coefficients = None
+        self._results = {}
+    
+    @staticmethod
+    def _prepare(y, r):
+        """Точки профиля, как в CorrectVolumeCalculator.__init__ (None - мало точек)"""
+        y = np.asarray(y, dtype=np.float64)
+        r = np.maximum(np.asarray(r, dtype=np.float64), 0.001)
+        if len(y) != len(r):
+            return None
+        if np.any(np.diff(y) <= 0):
+            y, unique_idx = np.unique(y, return_index=True)
+            r = r[unique_idx]
+        if len(y) < 2:
+            return None
+        if y[0] > 0.01:
+            y = np.insert(y, 0, 0.0)
+            r = np.insert(r, 0, r[0])
+        return y, r
+    
+    # --- методы по исходным точкам -------------------------------------------
+    
+    def _disks(self):
+        return trapezoid(np.pi * self.r**2, self.y, axis=1)
+    
+    def _frustums(self):
+        r1 = self.r[:, :-1]
+        r2 = self.r[:, 1:]
+        cones = (np.pi / 3.0) * self.h * (r1**2 + r1 * r2 + r2**2)
+        # Последовательное суммирование, как в method_frustums
+        return np.cumsum(cones, axis=1)[:, -1]
+    
+    # --- естественные кубические сплайны --------------------------------------
+    
+    def _spline_coefficients(self):
+        """
+        Коэффициенты естественных кубических сплайнов всех строк, массив
+        (4, N, L-1): r = c3 + c2·t + c1·t² + c0·t³ (порядок как в CubicSpline.c).
+        Трёхдиагональные системы решаются прогонкой сразу для всех строк;
+        уравнения за концом строки заменяются на M = 0. Строки короче
+        4 точек интерполируются линейно, как в CorrectVolumeCalculator.
+        """
+        if self._coefficients is not None:
+            return self._coefficients
+        
+        n_rows, width = self.y.shape
+        h = self.h
+        safe_h = np.where(h > 0, h, 1.0)
+        slope = np.where(h > 0, np.diff(self.r, axis=1) / safe_h, 0.0)
+        
+        # Вторые производные M во внутренних узлах 1..L-2
+        cubic = self.lengths >= 4
+        inner = np.arange(1, width - 1)[None, :] < (self.lengths[:, None] - 1)
+        inner &= cubic[:, None]
+        a = np.where(inner, h[:, :-1], 0.0)
+        b = np.where(inner, 2.0 * (h[:, :-1] + h[:, 1:]), 1.0)
+        c = np.where(inner, h[:, 1:], 0.0)
+        d = np.where(inner, 6.0 * (slope[:, 1:] - slope[:, :-1]), 0.0)
+        
+        # Прогонка (алгоритм Томаса) по столбцам, векторно по строкам
+        m_inner = np.zeros((n_rows, max(width - 2, 0)))
+        if width > 2:
+            cp = np.zeros_like(b)
+            dp = np.zeros_like(b)
+            cp[:, 0] = c[:, 0] / b[:, 0]
+            dp[:, 0] = d[:, 0] / b[:, 0]
+            for k in range(1, width - 2):
+                denom = b[:, k] - a[:, k] * cp[:, k - 1]
+                cp[:, k] = c[:, k] / denom
+                dp[:, k] = (d[:, k] - a[:, k] * dp[:, k - 1]) / denom
+            m_inner[:, -1] = dp[:, -1]
+            for k in range(width - 4, -1, -1):
+                m_inner[:, k] = dp[:, k] - cp[:, k] * m_inner[:, k + 1]
+        
+        m = np.zeros((n_rows, width))
+        m[:, 1:-1] = m_inner
+        m1 = m[:, :-1]
+        m2 = m[:, 1:]
+        coefficients = np.empty((4, n_rows, width - 1))
+        coefficients[0] = np.where(h > 0, (m2 - m1) / (6.0 * safe_h), 0.0)
+        coefficients[1] = 0.5 * m1
+        coefficients[2] = slope - h * (2.0 * m1 + m2) / 6.0
+        coefficients[3] = self.r[:, :-1]
+        self._coefficients = coefficients
+        return coefficients
+    
+    def _spline_exact(self):
+        """Точный интеграл π·r² по коэффициентам сплайнов (см. method_spline_exact)"""
+        integrals = CorrectVolumeCalculator._positive_square_integral(self._spline_coefficients(), self.h)
+        return np.pi * np.sum(integrals, axis=1)
+    
+    def _grid(self, n_points, integrate):
+        """
+        Метод на равномерной сетке из n_points высот от 0 до высоты профиля:
+        сплайны вычисляются блоками около GRID_CHUNK_POINTS точек.
+        integrate(areas) - квадратура по строкам (rows, n_points) с единичным
+        шагом; результат умножается на шаг сетки строки.
+        """
+        coefficients = self._spline_coefficients()
+        volumes = np.empty(self.count)
+        fractions = np.linspace(0.0, 1.0, n_points)
+        chunk = max(1, GRID_CHUNK_POINTS // n_points)
+        for start in range(0, self.count, chunk):
+            rows = slice(start, min(start + chunk, self.count))
+            knots = self.y[rows]
+            n_rows = knots.shape[0]
+            grid = self.height[rows, None] * fractions[None, :]
+            # Номер сегмента для точки сетки - число внутренних узлов не выше неё:
+            # первая точка сетки не ниже узла отмечается, отметки накапливаются
+            height = np.where(self.height[rows] > 0, self.height[rows], 1.0)[:, None]
+            first = np.ceil(knots[:, 1:-1] / height * (n_points - 1)).astype(np.intp)
+            first = np.clip(first, 0, n_points) + (np.arange(n_rows) * (n_points + 1))[:, None]
+            marks = np.bincount(first.ravel(), minlength=n_rows * (n_points + 1))
+            segment = np.cumsum(marks.reshape(n_rows, n_points + 1)[:, :n_points], axis=1)
+            
+            flat = segment + (np.arange(n_rows) * (knots.shape[1] - 1))[:, None]
+            t = grid
+            t -= np.take(knots[:, :-1], flat)
+            # Схема Горнера на месте: ((c0·t + c1)·t + c2)·t + c3
+            radii = np.take(coefficients[0, rows], flat)
+            for k in range(1, 4):
+                radii *= t
+                radii += np.take(coefficients[k, rows], flat)
+            np.maximum(radii, 0.0, out=radii)
+            radii *= radii
+            step = self.height[rows] / (n_points - 1)
+            volumes[rows] = np.pi * step * integrate(radii)
+        return volumes
+    
+    def _segment_areas(self, segments, y):
+        """
+        Площади сечений на высотах y по сегментам сплайнов segments
+        (номер строки · (L-1) + номер сегмента); поиск сегмента не нужен
+        """
+        coefficients = self._spline_coefficients().reshape(4, -1)
+        t = y - np.take(self.y[:, :-1], segments)
+        radii = np.take(coefficients[0], segments)
+        for k in range(1, 4):
+            radii *= t
+            radii += np.take(coefficients[k], segments)
+        np.maximum(radii, 0.0, out=radii)
+        return np.pi * radii * radii
+    
+    def adaptive_volumes(self, rel_tol=None):
+        """
+        Адаптивный метод Симпсона для всех профилей с одним допуском:
+        словарь массивов (N,) volume, error, evaluations, converged
+        (см. adaptive_simpson)
+        """
+        rel_tol = self.rel_tol if rel_tol is None else rel_tol
+        # Начальные интервалы - сегменты профилей ненулевой высоты, плюс [0, y0]
+        rows, cols = np.nonzero(self.h > 0)
+        a = self.y[rows, cols]
+        b = self.y[rows, cols + 1]
+        lead = np.flatnonzero(self.valid & (self.y[:, 0] > 0))
+        # Интервал [0, y0] - продолжение первого сегмента
+        width = self.y.shape[1] - 1
+        segments = np.concatenate((lead * width, rows * width + cols))
+        rows = np.concatenate((lead, rows))
+        a = np.concatenate((np.zeros(len(lead)), a))
+        b = np.concatenate((self.y[lead, 0], b))
+        # Каждый интервал делится внутри своего сегмента - площади по его коэффициентам
+        result = adaptive_simpson(self._segment_areas, rows, a, b, self.count, rel_tol,
+                                  tags=segments)
+        result.pop('segments')
+        return result
+    
+    def perturbed_volumes(self, n_samples=None, radius_sigma=None, axis_sigma=None,
+                          seed=0, keys=None, nodes=None):
+        """
+        Объёмы n_samples возмущённых реализаций каждого профиля, массив (N, S).
+
+        Реализация: r(y) + e + d(y), где e - смещение оси (нормальное, axis_sigma),
+        d(y) - ошибка линии чертежа: нормальные отклонения radius_sigma в nodes
+        узлах по высоте с линейной интерполяцией между ними. Объём - метод дисков
+        по точкам профиля; интеграл квадрата раскрывается в квадратичную форму
+        от (e, d), поэтому все реализации считаются матричными операциями сразу.
+        Возмущённый радиус не меньше 0: реализации, в которых он может стать
+        отрицательным, пересчитываются по точкам с обрезкой.
+
+        Случайные числа строки зависят только от seed и ключа профиля
+        (keys - числа или строки, по умолчанию номер строки), поэтому
+        результат воспроизводим и не зависит от состава и порядка коллекции.
+        """
+        n_samples = UNCERTAINTY_SAMPLES if n_samples is None else int(n_samples)
+        radius_sigma = UNCERTAINTY_RADIUS_SIGMA if radius_sigma is None else radius_sigma
+        axis_sigma = UNCERTAINTY_AXIS_SIGMA if axis_sigma is None else axis_sigma
+        nodes = UNCERTAINTY_NODES if nodes is None else max(2, int(nodes))
+        keys = range(self.count) if keys is None else keys
+        keys = [zlib.crc32(str(key).encode('utf-8')) if not isinstance(key, (int, np.integer))
+                else int(key) for key in keys]
+        
+        result = np.full((self.count, n_samples), np.nan)
+        for start in range(0, self.count, BATCH_CHUNK_ROWS):
+            rows = slice(start, min(start + BATCH_CHUNK_ROWS, self.count))
+            y, r, h = self.y[rows], self.r[rows], self.h[rows]
+            
+            # Веса трапеций по точкам и базис "шляпок" по узлам высоты
+            weights = np.zeros_like(y)
+            weights[:, :-1] += 0.5 * h
+            weights[:, 1:] += 0.5 * h
+            height = np.where(self.height[rows] > 0, self.height[rows], 1.0)
+            position = (y / height[:, None]) * (nodes - 1)
+            basis = np.maximum(0.0, 1.0 - np.abs(position[:, :, None] - np.arange(nodes)))
+            
+            wr = weights * r
+            weighted = weights[:, :, None] * basis
+            base = np.sum(wr * r, axis=1)                               # ∫r²
+            linear_e = np.sum(wr, axis=1)                               # ∫r
+            square_e = np.sum(weights, axis=1)                          # ∫1
+            linear_d = np.matmul(wr[:, None, :], basis)[:, 0]           # ∫r·φk
+            cross = np.sum(weighted, axis=1)                            # ∫φk
+            gram = np.matmul(weighted.transpose(0, 2, 1), basis)        # ∫φk·φl
+            
+            noise = np.stack([np.random.default_rng([seed, key]).standard_normal((n_samples, nodes + 1))
+                              for key in keys[rows]])
+            e = axis_sigma * noise[:, :, 0]
+            d = radius_sigma * noise[:, :, 1:]
+            
+            volume = (base[:, None]
+                      + 2.0 * e * linear_e[:, None]
+                      + 2.0 * np.matmul(d, linear_d[:, :, None])[:, :, 0]
+                      + e**2 * square_e[:, None]
+                      + 2.0 * e * np.matmul(d, cross[:, :, None])[:, :, 0]
+                      + np.sum(np.matmul(d, gram) * d, axis=2))
+            
+            # Квадратичная форма не обрезает отрицательный радиус (π·r² > 0 и при r < 0).
+            # d·φ(y) - выпуклая комбинация узловых d, поэтому min r + e + min d - оценка
+            # снизу радиуса реализации; только при ней < 0 считаем по точкам явно
+            low = np.min(r, axis=1)[:, None] + e + np.min(d, axis=2)
+            for row in np.flatnonzero(np.any(low < 0, axis=1)):
+                samples = np.flatnonzero(low[row] < 0)
+                radii = r[row] + e[row, samples, None] + np.matmul(d[row, samples], basis[row].T)
+                volume[row, samples] = np.sum(weights[row] * np.maximum(radii, 0.0)**2, axis=1)
+            result[rows] = np.pi * volume
+        
+        result[~self.valid] = np.nan
+        return result
+    
+    # --- доступ --------------------------------------------------------------
+    
+    def volumes(self, method_name):
+        """Объёмы всех профилей методом method_name, массив (N,)"""
+        result = self._results.get(method_name)
+        if result is not None:
+            return result
+        if self.count == 0:
+            return np.zeros(0)
+        
+        if method_name == 'frustums':
+            result = self._frustums()
+        elif method_name == 'trapezoidal':
+            result = self._grid(2000, lambda areas: (np.sum(areas, axis=1)
+                                                     - 0.5 * (areas[:, 0] + areas[:, -1])))
+        elif method_name == 'simpson':
+            result = self._grid(501, lambda areas: simpson(areas, dx=1.0, axis=1))
+        elif method_name == 'spline':
+            result = self._grid(1001, lambda areas: simpson(areas, dx=1.0, axis=1))
+        elif method_name == 'spline_exact':
+            result = self._spline_exact()
+        elif method_name == 'adaptive':
+            result = self.adaptive_volumes()['volume']
+        else:
+            result = self._disks()
+        
+        result = np.where(self.valid, result, np.nan)
+        self._results[method_name] = result
+        return result
+    
+    def all_volumes(self, methods=('disks', 'frustums', 'trapezoidal', 'simpson',
+                                   'spline', 'spline_exact')):
+        """Объёмы всеми методами: {метод: массив (N,)}"""
+        return {method: self.volumes(method) for method in methods}
+
+
+# ============================================================================
+# КЭШ ОБЪЁМОВ
+# ============================================================================
+
+VOLUME_CACHE_SIZE = 100000      # Записей (профиль, версия, метод, уровень)
+CALCULATOR_CACHE_SIZE = 64      # Калькуляторов со сплайнами и таблицами V(y)
+
+_profile_ids = itertools.count(1)
+
+
+def profile_key(profile):
+    """
+    Устойчивый идентификатор профиля и его версия. Идентификатор
+    присваивается при первом обращении; после изменения y или r профиля
+    на месте нужно вызвать bump_profile_version.
+    """
+    if 'profile_id' not in profile:
+        profile['profile_id'] = next(_profile_ids)
+    return profile['profile_id'], profile.get('version', 0)
+
+
+def bump_profile_version(profile):
+    """Отметка изменения геометрии профиля: прежние записи кэша больше не используются"""
+    profile['version'] = profile.get('version', 0) + 1
+
+
+class VolumeCache:
+    """
+    Общий кэш объёмов с вытеснением давно не использованных записей (LRU).
+
+    Ключ - (id профиля, версия, метод, уровень); уровень None - полный объём.
+    Калькуляторы (CorrectVolumeCalculator) хранятся отдельно по (id, версия),
+    чтобы сплайн и таблицы накопленного объёма не строились заново.
+    hits/misses - счётчики обращений к объёмам.
+    rel_tol - допуск адаптивного метода, общий для всех профилей.
+    """
+    
+    def __init__(self, max_entries=VOLUME_CACHE_SIZE, max_calculators=CALCULATOR_CACHE_SIZE,
+                 rel_tol=ADAPTIVE_REL_TOL):
+        self.max_entries = max_entries
+        self.max_calculators = max_calculators
+        self.rel_tol = rel_tol
+        self._volumes = OrderedDict()
+        self._calculators = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _level_key(level):
+        return None if level is None else round(float(level), 9)
+    
+    def calculator(self, profile):
+        """Калькулятор профиля (из кэша или новый)"""
+        key = profile_key(profile)
+        calculator = self._calculators.get(key)
+        if calculator is not None:
+            self._calculators.move_to_end(key)
+            return calculator
+        
+        calculator = CorrectVolumeCalculator(profile['y'], profile['r'], rel_tol=self.rel_tol)
+        self._calculators[key] = calculator
+        while len(self._calculators) > self.max_calculators:
+            self._calculators.popitem(last=False)
+        return calculator
+    
+    def get(self, profile, method_name, level=None):
+        """Объём из кэша или None (учитывается как попадание или промах)"""
+        key = profile_key(profile) + (method_name, self._level_key(level))
+        volume = self._volumes.get(key)
+        if volume is None:
+            self.misses += 1
+            return None
+        self._volumes.move_to_end(key)
+        self.hits += 1
+        return volume
+    
+    def put(self, profile, method_name, level, volume):
+        key = profile_key(profile) + (method_name, self._level_key(level))
+        self._volumes[key] = float(volume)
+        self._volumes.move_to_end(key)
+        while len(self._volumes) > self.max_entries:
+            self._volumes.popitem(last=False)
+    
+    def volume(self, profile, method_name, level=None):
+        """
+        Объём профиля методом method_name до уровня level (None - полный).
+        Полный объём - calculate_volume, объём до уровня - по таблице V(y).
+        """
+        volume = self.get(profile, method_name, level)
+        if volume is None:
+            calculator = self.calculator(profile)
+            if level is None:
+                volume = calculator.calculate_volume(method_name)
+            else:
+                volume = calculator.volume_table(method_name).volume_at(level)
+            self.put(profile, method_name, level, volume)
+        return volume
+    
+    def volumes(self, profiles, method_name):
+        """
+        Полные объёмы списка профилей (массив). Промахи считаются одним
+        пакетом через ProfileStack и сохраняются в кэше.
+        """
+        result = np.empty(len(profiles))
+        missing = []
+        for i, profile in enumerate(profiles):
+            volume = self.get(profile, method_name)
+            if volume is None:
+                missing.append(i)
+            else:
+                result[i] = volume
+        
+        if missing:
+            stack = ProfileStack([(profiles[i]['y'], profiles[i]['r']) for i in missing],
+                                 rel_tol=self.rel_tol)
+            computed = stack.volumes(method_name)
+            result[missing] = computed
+            for i, volume in zip(missing, computed):
+                self.put(profiles[i], method_name, None, volume)
+        return result
+    
+    def set_rel_tol(self, rel_tol):
+        """Новый допуск адаптивного метода; при изменении кэш очищается"""
+        if rel_tol != self.rel_tol:
+            self.rel_tol = rel_tol
+            self.clear()
+    
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._volumes),
+            'calculators': len(self._calculators),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+    
+    def clear(self):
+        self._volumes.clear()
+        self._calculators.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# ============================================================================
+# НЕОПРЕДЕЛЁННОСТЬ ОБЪЁМА
+# ============================================================================
+
+def volume_uncertainty(profiles, method_name='spline', n_samples=None, radius_sigma=None,
+                       axis_sigma=None, seed=0, keys=None, percentiles=UNCERTAINTY_PERCENTILES,
+                       return_samples=False):
+    """
+    Неопределённость объёма сосудов из-за ошибок оцифровки (метод Монте-Карло).
+
+    profiles - пары (y, r). Возмущённые объёмы считаются методом дисков
+    (ProfileStack.perturbed_volumes) и сдвигаются на разницу между объёмом
+    выбранного метода и методом дисков для исходного профиля, т.е. разброс
+    относится к номинальному объёму method_name.
+
+    Возвращает словарь массивов (N,): nominal, mean, std, low, high
+    (процентили percentiles), а также samples (N, S) при return_samples.
+    """
+    stack = ProfileStack(profiles)
+    nominal = stack.volumes(method_name)
+    samples = stack.perturbed_volumes(n_samples, radius_sigma, axis_sigma, seed, keys)
+    samples += (nominal - stack.volumes('disks'))[:, None]
+    
+    result = {'nominal': nominal, 'mean': np.full(stack.count, np.nan),
+              'std': np.full(stack.count, np.nan), 'low': np.full(stack.count, np.nan),
+              'high': np.full(stack.count, np.nan)}
+    valid = np.isfinite(nominal)
+    if np.any(valid):
+        result['mean'][valid] = samples[valid].mean(axis=1)
+        result['std'][valid] = samples[valid].std(axis=1, ddof=1)
+        low, high = np.percentile(samples[valid], percentiles, axis=1)
+        result['low'][valid] = low
+        result['high'][valid] = high
+    if return_samples:
+        result['samples'] = samples
+    return result
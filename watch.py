@@ -0,0 +1,214 @@
+"""watch.py
+Наблюдение за папкой с новыми DXF чертежами (без зависимостей от GUI).
+
+Файл считается готовым, когда его размер и mtime не меняются в течение
+settle_s секунд - так не захватываются чертежи, которые ещё копируются.
+Изменённый файл с прежним хэшем содержимого повторно не обрабатывается.
+Если установлен watchdog, после первого обхода проверяются только файлы
+из событий файловой системы; иначе каталог опрашивается по stat.
+"""
+
+import os
+import threading
+import time
+
+from profile_cache import file_content_hash
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    HAVE_WATCHDOG = True
+except ImportError:
+    HAVE_WATCHDOG = False
+
+DEFAULT_SETTLE_S = 2.0
+DEFAULT_POLL_S = 5.0
+
+# ============================================================================
+# НАБЛЮДЕНИЕ ЗА ПАПКОЙ
+# ============================================================================
+
+def _is_dxf(path):
+    return path.lower().endswith('.dxf')
+
+
+def _signature(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+if HAVE_WATCHDOG:
+    class _DirtyHandler(FileSystemEventHandler):
+        """Собирает пути изменённых DXF файлов из событий watchdog"""
+
+        def __init__(self, watcher):
+            self.watcher = watcher
+
+        def on_any_event(self, event):
+            if event.is_directory:
+                return
+            for path in (getattr(event, 'src_path', None), getattr(event, 'dest_path', None)):
+                if path and _is_dxf(path):
+                    self.watcher.mark_dirty(path)
+
+
+class FolderWatcher:
+    """
+    Отслеживает новые и изменённые DXF файлы в папке.
+
+    poll() возвращает список путей, готовых к обработке. После обработки
+    вызывающая сторона подтверждает их через mark_ingested(), иначе файлы
+    будут предложены снова. Подтверждённый файл (в том числе с ошибкой
+    извлечения) не предлагается, пока не изменится его содержимое.
+
+    hasher(path) - функция хэша содержимого; по умолчанию используется
+    ProfileCache.content_hash, если передан кэш (хэши запоминаются на диске).
+    """
+
+    def __init__(self, folder, recursive=True, settle_s=DEFAULT_SETTLE_S,
+                 cache=None, include_existing=False, use_events=True):
+        self.folder = os.path.normpath(os.path.abspath(folder))
+        self.recursive = recursive
+        self.settle_s = settle_s
+        self.hasher = cache.content_hash if cache is not None else file_content_hash
+        self.include_existing = include_existing
+
+        self._ingested = {}     # path -> (signature, content_hash) обработанных файлов
+        self._pending = {}      # path -> (signature, время последнего изменения)
+        self._offered = {}      # path -> (signature, content_hash) из последнего poll()
+        self._dirty = set()     # пути из событий watchdog
+        self._dirty_lock = threading.Lock()
+        self._scanned = False
+        self._observer = None
+
+        if use_events and HAVE_WATCHDOG:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_DirtyHandler(self), self.folder, recursive=recursive)
+                self._observer.start()
+            except Exception as e:
+                print(f"События файловой системы недоступны ({e}), используется опрос")
+                self._observer = None
+
+    # --- обход ---------------------------------------------------------------
+
+    def _scan(self):
+        """Все DXF файлы папки (os.scandir, без чтения содержимого)"""
+        stack = [self.folder]
+        while stack:
+            folder = stack.pop()
+            try:
+                entries = list(os.scandir(folder))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if self.recursive:
+                        stack.append(entry.path)
+                elif _is_dxf(entry.name):
+                    yield os.path.normpath(entry.path)
+
+    def mark_dirty(self, path):
+        with self._dirty_lock:
+            self._dirty.add(os.path.normpath(os.path.abspath(path)))
+
+    def _candidates(self):
+        if self._observer is None or not self._scanned:
+            return list(self._scan())
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        return list(dirty | set(self._pending))
+
+    # --- опрос ---------------------------------------------------------------
+
+    def poll(self, now=None):
+        """Файлы, готовые к обработке (новые или с изменённым содержимым)"""
+        now = time.monotonic() if now is None else now
+        first_scan = not self._scanned
+        candidates = self._candidates()
+        self._scanned = True
+
+        ready = []
+        for path in candidates:
+            try:
+                signature = _signature(path)
+            except OSError:
+                # Файл удалён или переименован
+                self._pending.pop(path, None)
+                continue
+
+            ingested = self._ingested.get(path)
+            if ingested and ingested[0] == signature:
+                continue
+
+            if first_scan and not self.include_existing:
+                # Уже лежавшие в папке файлы считаем обработанными
+                self._ingested[path] = (signature, None)
+                continue
+
+            pending = self._pending.get(path)
+            if pending is None or pending[0] != signature:
+                # Файл ещё пишется - ждём, пока размер и mtime перестанут меняться
+                self._pending[path] = (signature, now)
+                continue
+            if now - pending[1] < self.settle_s:
+                continue
+
+            del self._pending[path]
+            try:
+                content_hash = self.hasher(path)
+            except OSError:
+                continue
+            if ingested and ingested[1] == content_hash:
+                # Время изменения новое, содержимое прежнее
+                self._ingested[path] = (signature, content_hash)
+                continue
+            ready.append((path, signature, content_hash))
+
+        self._offered = {path: (signature, content_hash) for path, signature, content_hash in ready}
+        return [path for path, _, _ in ready]
+
+    def mark_ingested(self, paths):
+        """Подтверждение обработки файлов, возвращённых poll()"""
+        for path in paths:
+            if path in self._offered:
+                self._ingested[path] = self._offered[path]
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def close(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+            self._observer = None
+
+
+def watch_loop(watchers, on_ready, interval=DEFAULT_POLL_S, stop_event=None):
+    """
+    Цикл опроса одной или нескольких папок: on_ready(paths) получает готовые
+    файлы; после возврата они больше не предлагаются, пока не изменятся.
+    Завершается по stop_event или KeyboardInterrupt.
+    """
+    if isinstance(watchers, FolderWatcher):
+        watchers = [watchers]
+    stop_event = stop_event or threading.Event()
+    try:
+        while not stop_event.is_set():
+            for watcher in watchers:
+                ready = watcher.poll()
+                if ready:
+                    on_ready(ready)
+                    watcher.mark_ingested(ready)
+            # Пока есть недописанные файлы, проверяем чаще
+            wait = interval
+            for watcher in watchers:
+                if watcher.pending_count:
+                    wait = min(wait, watcher.settle_s / 2)
+            stop_event.wait(wait)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for watcher in watchers:
+            watcher.close()